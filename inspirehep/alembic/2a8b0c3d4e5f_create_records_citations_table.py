@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Create the ``records_citations`` table."""
+
+from __future__ import absolute_import, division, print_function
+
+import sqlalchemy as sa
+from alembic import op
+from six import string_types
+from sqlalchemy_utils.types import JSONType, UUIDType
+
+
+revision = '2a8b0c3d4e5f'
+down_revision = 'cb5153afd839'
+branch_labels = ()
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'records_citations',
+        sa.Column('citer_recid', sa.Integer, autoincrement=False, nullable=False),
+        sa.Column('cited_recid', sa.Integer, autoincrement=False, nullable=False),
+        sa.PrimaryKeyConstraint('citer_recid', 'cited_recid'),
+    )
+    op.create_index(
+        'idx_citations_cited_recid',
+        'records_citations',
+        ['cited_recid'],
+    )
+
+    records = sa.table(
+        'records_metadata',
+        sa.column('id', UUIDType),
+        sa.column('json', JSONType),
+    )
+    citations = sa.table(
+        'records_citations',
+        sa.column('citer_recid', sa.Integer),
+        sa.column('cited_recid', sa.Integer),
+    )
+
+    connection = op.get_bind()
+    last_uuid = None
+    while True:
+        query = sa.select([records.c.id, records.c.json]).order_by(
+            records.c.id).limit(BATCH_SIZE)
+        if last_uuid is not None:
+            query = query.where(records.c.id > last_uuid)
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            break
+
+        values = [
+            {'citer_recid': json['control_number'], 'cited_recid': cited_recid}
+            for _, json in rows
+            for cited_recid in _get_references_recids(json)
+        ]
+        if values:
+            connection.execute(citations.insert(), values)
+        last_uuid = rows[-1][0]
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('idx_citations_cited_recid', table_name='records_citations')
+    op.drop_table('records_citations')
+
+
+def _get_recid_from_ref(ref):
+    if not isinstance(ref, dict) or not isinstance(ref.get('$ref'), string_types):
+        return None
+    try:
+        return int(ref['$ref'].rstrip('/').split('/')[-1])
+    except ValueError:
+        return None
+
+
+def _get_references_recids(json):
+    """Return the recids cited by a record, as ``get_references_recids``."""
+    if not json or json.get('deleted') or 'control_number' not in json:
+        return set()
+    if 'hep.json' not in json.get('$schema', ''):
+        return set()
+
+    refs = [reference.get('record') for reference in json.get('references', [])]
+    return set(recid for recid in map(_get_recid_from_ref, refs) if recid)
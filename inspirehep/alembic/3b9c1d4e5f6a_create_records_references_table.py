@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Create the ``records_references`` table."""
+
+from __future__ import absolute_import, division, print_function
+
+import sqlalchemy as sa
+from alembic import op
+from six import string_types
+from six.moves.urllib.parse import urlsplit
+from sqlalchemy_utils.types import JSONType, UUIDType
+
+
+revision = '3b9c1d4e5f6a'
+down_revision = '2a8b0c3d4e5f'
+branch_labels = ()
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# ``INSPIRE_REF_UPDATER_WHITELISTS`` at this revision, by schema name.
+WHITELISTS = {
+    'authors': [
+        'advisors.record',
+        'conferences',
+        'experiments.record',
+        'posititions.institutions.record',
+    ],
+    'experiments': [
+        'affiliation.record',
+        'related_records.record',
+        'spokespersons.record',
+    ],
+    'hep': [
+        'accelerator_experiments.record',
+        'authors.affiliations.record',
+        'authors.record',
+        'collaboration.record',
+        'publication_info.conference_record',
+        'publication_info.journal_record',
+        'publication_info.parent_record',
+        'references.record',
+        'related_records.record',
+        'thesis.institutions.record',
+        'thesis_supervisors.affiliations.record',
+    ],
+    'institutions': [
+        'related_records.record',
+    ],
+    'jobs': [
+        'experiments.record',
+        'institutions.record',
+    ],
+    'journals': [
+        'related_records.record',
+    ],
+}
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'records_references',
+        sa.Column('ref', sa.Text, nullable=False),
+        sa.Column('record_uuid', UUIDType, nullable=False),
+        sa.Column('path', sa.Text, nullable=False),
+        sa.PrimaryKeyConstraint('ref', 'record_uuid', 'path'),
+    )
+    op.create_index(
+        'idx_references_record_uuid',
+        'records_references',
+        ['record_uuid'],
+    )
+
+    records = sa.table(
+        'records_metadata',
+        sa.column('id', UUIDType),
+        sa.column('json', JSONType),
+    )
+    references = sa.table(
+        'records_references',
+        sa.column('ref', sa.Text),
+        sa.column('record_uuid', UUIDType),
+        sa.column('path', sa.Text),
+    )
+
+    connection = op.get_bind()
+    last_uuid = None
+    while True:
+        query = sa.select([records.c.id, records.c.json]).order_by(
+            records.c.id).limit(BATCH_SIZE)
+        if last_uuid is not None:
+            query = query.where(records.c.id > last_uuid)
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            break
+
+        values = [
+            {'ref': ref, 'record_uuid': uuid, 'path': path}
+            for uuid, json in rows
+            for ref, path in _get_ref_paths(json)
+        ]
+        if values:
+            connection.execute(references.insert(), values)
+        last_uuid = rows[-1][0]
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('idx_references_record_uuid', table_name='records_references')
+    op.drop_table('records_references')
+
+
+def _iter_refs(obj, parts):
+    if isinstance(obj, list):
+        for el in obj:
+            for ref in _iter_refs(el, parts):
+                yield ref
+    elif isinstance(obj, dict):
+        if not parts:
+            if isinstance(obj.get('$ref'), string_types):
+                yield obj['$ref']
+        elif parts[0] in obj:
+            for ref in _iter_refs(obj[parts[0]], parts[1:]):
+                yield ref
+
+
+def _get_ref_paths(json):
+    if not json or not isinstance(json.get('$schema'), string_types):
+        return set()
+
+    schema_name = urlsplit(json['$schema']).path.split('/')[-1].split('.')[0]
+
+    return set(
+        (ref, path)
+        for path in WHITELISTS.get(schema_name, [])
+        for ref in _iter_refs(json, path.split('.'))
+    )
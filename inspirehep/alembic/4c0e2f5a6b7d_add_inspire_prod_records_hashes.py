@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Add the MARCXML hashes and dictionaries of ``inspire_prod_records``."""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import zlib
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = '4c0e2f5a6b7d'
+down_revision = '3b9c1d4e5f6a'
+branch_labels = ()
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    """Upgrade database."""
+    op.add_column(
+        'inspire_prod_records',
+        sa.Column('marcxml_hash', sa.String(40), nullable=True),
+    )
+    # Left empty, as the versions which converted the existing records are
+    # unknown: they are all converted again the next time they are migrated.
+    op.add_column(
+        'inspire_prod_records',
+        sa.Column('converter_version', sa.String(255), nullable=True),
+    )
+    op.create_table(
+        'inspire_prod_records_dictionaries',
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('created', sa.DateTime, default=datetime.utcnow, nullable=False),
+        sa.Column('data', sa.LargeBinary, nullable=False),
+    )
+
+    # Only zlib-compressed or uncompressed MARCXML exists at this revision.
+    records = sa.table(
+        'inspire_prod_records',
+        sa.column('recid', sa.Integer),
+        sa.column('marcxml', sa.LargeBinary),
+        sa.column('marcxml_hash', sa.String(40)),
+    )
+    update = records.update().where(
+        records.c.recid == sa.bindparam('_recid')
+    ).values(marcxml_hash=sa.bindparam('_hash'))
+
+    connection = op.get_bind()
+    last_recid = None
+    while True:
+        query = sa.select([records.c.recid, records.c.marcxml]).order_by(
+            records.c.recid).limit(BATCH_SIZE)
+        if last_recid is not None:
+            query = query.where(records.c.recid > last_recid)
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            break
+
+        connection.execute(update, [
+            {'_recid': recid, '_hash': hashlib.sha1(_decompress(marcxml)).hexdigest()}
+            for recid, marcxml in rows
+        ])
+        last_recid = rows[-1][0]
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('inspire_prod_records_dictionaries')
+    op.drop_column('inspire_prod_records', 'converter_version')
+    op.drop_column('inspire_prod_records', 'marcxml_hash')
+
+
+def _decompress(marcxml):
+    marcxml = bytes(marcxml)
+    try:
+        return zlib.decompress(marcxml)
+    except zlib.error:
+        return marcxml
@@ -74,7 +74,11 @@ CELERYBEAT_SCHEDULE = {
     'journal_kb_builder': {
         'task': 'inspirehep.modules.refextract.tasks.create_journal_kb_file',
         'schedule': crontab(minute='0', hour='*/1'),
-    }
+    },
+    'citation_counts_reconciliation': {
+        'task': 'inspirehep.modules.records.tasks.reconcile_citation_counts',
+        'schedule': crontab(minute='30', hour='3'),
+    },
 }
 # Cache
 # =====
@@ -289,6 +293,30 @@ SEARCH_TYPEAHEAD_HINT_URL = '/search/suggest?field=%TYPE&query=%QUERY'
 SEARCH_TYPEAHEAD_DEFAULT_SET = 'invenio'
 
 SEARCH_ELASTIC_HOSTS = ['localhost']
+SEARCH_MGET_CHUNK_SIZE = 500
+"""Number of documents fetched by each request of ``SearchMixin.mget``."""
+SEARCH_MGET_CONCURRENCY = 4
+"""Number of requests of ``SearchMixin.mget`` sent to ElasticSearch at once.
+
+Note:
+
+  The requests share the connection pool of the ElasticSearch client, so
+  this should stay below its size (10 connections per node by default).
+"""
+SEARCH_EXPORT_FORMATS = {
+    'bibtex': 'inspirehep.modules.records.serializers:bibtex_v1_stream',
+    'latexeu': 'inspirehep.modules.records.serializers:latexeu_v1_stream',
+    'latexus': 'inspirehep.modules.records.serializers:latexus_v1_stream',
+    'cvformatlatex': (
+        'inspirehep.modules.records.serializers:cvformatlatex_v1_stream'),
+    'cvformathtml': (
+        'inspirehep.modules.records.serializers:cvformathtml_v1_stream'),
+    'cvformattext': (
+        'inspirehep.modules.records.serializers:cvformattext_v1_stream'),
+}
+"""Streaming responses of ``/search/export``, by name of the format."""
+SEARCH_EXPORT_CHUNK_SIZE = 100
+"""Number of records fetched and serialized at once by ``/search/export``."""
 SEARCH_UI_BASE_TEMPLATE = BASE_TEMPLATE
 SEARCH_UI_SEARCH_TEMPLATE = 'search/search.html'
 SEARCH_UI_SEARCH_API = '/api/literature/'
@@ -491,6 +519,30 @@ RECORDS_REST_ENDPOINTS = dict(
         max_result_window=10000,
         search_factory_imp='inspirehep.modules.search.search_factory:inspire_search_factory',
     ),
+    authors_profile=dict(
+        pid_type='aut',
+        pid_minter='inspire_recid_minter',
+        pid_fetcher='inspire_recid_fetcher',
+        search_class='inspirehep.modules.search:AuthorsSearch',
+        record_serializers={
+            'application/json': ('inspirehep.modules.authors.rest'
+                                 ':profile_v1_response'),
+        },
+        record_class='inspirehep.modules.records.api:InspireRecord',
+        search_serializers={
+            'application/json': ('invenio_records_rest.serializers'
+                                 ':json_v1_search'),
+            'application/vnd+inspire.brief+json': (
+                'invenio_records_rest.serializers'
+                ':json_v1_search'
+            ),
+        },
+        list_route='/authors/profile',
+        item_route='/authors/<pid(aut,record_class="inspirehep.modules.records.api:InspireRecord"):pid_value>/profile',
+        default_media_type='application/json',
+        max_result_window=10000,
+        search_factory_imp='inspirehep.modules.search.search_factory:inspire_search_factory',
+    ),
     authors_publications=dict(
         pid_type='aut',
         pid_minter='inspire_recid_minter',
@@ -1158,6 +1210,51 @@ Note:
   ``migrate`` and ``continuous_migration`` from the
   ``inspirehep.modules.migrator.tasks`` module.
 """
+MIGRATOR_MAX_IN_FLIGHT_CHUNKS = 32
+"""Maximum number of chunks queued by a migration at any given time.
+
+Note:
+
+  The migration waits for the oldest chunk to be migrated before
+  submitting a new one, which bounds the memory needed by the broker.
+"""
+MIGRATOR_CHUNK_MAX_BYTES = 10 * 1024 * 1024
+"""Maximum size in bytes of the MARCXML in a chunk of a migration."""
+MIGRATOR_CHUNK_TARGET_DURATION = 30
+"""Time in seconds that migrating a chunk should take.
+
+Note:
+
+  The number of records in each chunk is adjusted while the migration
+  runs, based on the time taken by the chunks already migrated.
+"""
+MIGRATOR_SKIP_UNCHANGED_RECORDS = True
+"""Whether the migrator skips the records whose MARCXML did not change.
+
+Note:
+
+  A record is skipped only if it was migrated successfully from MARCXML with
+  the same hash, by the same versions of ``inspire-dojson`` and
+  ``inspire-schemas``, so neither the conversion nor the DB are touched for
+  it. ``remigrate_records`` never skips records.
+"""
+MIGRATOR_MARCXML_DICTIONARY_COMPRESSION = False
+"""Whether the MARCXML of the migrated records is compressed with a dictionary.
+
+Note:
+
+  Requires the ``zstd`` extra, and a dictionary trained with
+  ``inspirehep migrator train_dictionary``. Records are compressed with
+  zlib until then, and both formats can be read in any case.
+"""
+MIGRATOR_CONTINUOUS_BATCH_SIZE = 1000
+"""Maximum number of records read at once by the continuous migration.
+
+Note:
+
+  A batch is committed, and removed from the queue of Legacy, as a whole:
+  a crash during a batch makes the next run migrate all of it again.
+"""
 
 JSONSCHEMAS_HOST = "localhost:5000"
 JSONSCHEMAS_REPLACE_REFS = True
@@ -1168,6 +1265,80 @@ INDEXER_DEFAULT_DOC_TYPE = "hep"
 INDEXER_REPLACE_REFS = False
 INDEXER_BULK_REQUEST_TIMEOUT = float(120)
 
+CITATION_COUNTS_RECONCILIATION_SAMPLE_SIZE = 1000
+"""Number of records whose citation count is verified every night.
+
+Note:
+
+  Citation counts are updated incrementally when the references of a
+  Literature record change. The ``reconcile_citation_counts`` task
+  recounts the citations of a random sample of this many records, and
+  fixes the counts that drifted.
+"""
+
+AUTHORS_CITATIONS_CACHE_TIMEOUT = 24 * 60 * 60
+"""Time in seconds for which the citations of an author are cached.
+
+Note:
+
+  The cached citations of an author are also invalidated when one of
+  their publications is updated or gains or loses a citer.
+"""
+
+RECORDS_RENDERINGS_CACHE_TIMEOUT = 24 * 60 * 60
+"""Time in seconds for which the renderings of a record are cached.
+
+Note:
+
+  The renderings of a record in export formats like BibTeX or LaTeX are
+  cached by revision and version of the code, and dropped when the record
+  or its citation count changes. Formats showing the date of the export
+  can be this much out of date.
+"""
+
+IMPACT_GRAPH_CACHE_TIMEOUT = 24 * 60 * 60
+"""Time in seconds for which the impact graph of a record is cached.
+
+Note:
+
+  The impact graph of a record is computed again after the record is
+  updated, gains or loses a citer, or the citation count of one of its
+  citers changes.
+"""
+IMPACT_GRAPH_MAX_CITATIONS = 1000
+"""Maximum number of citers in the impact graph of a record.
+
+Note:
+
+  Only the most cited citers are included. The number of citers per year
+  is always computed over all of them.
+"""
+
+AUTHORS_NAMES_SHARED_CACHE = False
+"""Whether to share the phonetic blocks and name variations of authors.
+
+Note:
+
+  These values are always cached in each process. When this is set, they
+  are also stored in the Redis cache, so that all the workers benefit
+  from the names already seen by any of them.
+"""
+AUTHORS_NAMES_SHARED_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+"""Time in seconds for which an author name is kept in the shared cache."""
+
+PIDSTORE_SHARED_CACHE = True
+"""Whether to share the lookups of persistent identifiers between processes.
+
+Note:
+
+  The records corresponding to persistent identifiers are always cached
+  in each process for up to a minute. When this is set, they are also
+  stored in the Redis cache, from which they are dropped whenever the
+  persistent identifiers are created, redirected or deleted.
+"""
+PIDSTORE_SHARED_CACHE_TIMEOUT = 24 * 60 * 60
+"""Time in seconds for which a persistent identifier is kept in the shared cache."""
+
 # OAuthclient
 # ===========
 orcid.REMOTE_MEMBER_APP['params']['request_token_params'] = {
@@ -1617,3 +1788,11 @@ INSPIRE_REF_UPDATER_WHITELISTS = {
     ],
 }
 """Controls which fields are updated when the referred record is updated."""
+
+INSPIRE_REF_UPDATER_BATCH_SIZE = 500
+"""Number of records updated in each transaction when updating references.
+
+Note:
+    Each batch is committed, and then reindexed, on its own, so that an
+    interrupted update does not lose the batches already done.
+"""
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Manage authors."""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+import click
+from flask_cli import with_appcontext
+
+from .rest.citations import CITERS_BATCH_SIZE, get_author_citations
+
+
+@click.group()
+def authors():
+    """Command related to authors in INSPIRE."""
+
+
+@authors.command()
+@click.option('--author-recid', '-a', required=True,
+              help='Recid of the author whose citations are computed.')
+@click.option('--batch-size', '-b', default=CITERS_BATCH_SIZE, type=int,
+              help='Number of publications whose citers are fetched at once.')
+@with_appcontext
+def benchmark_citations(author_recid, batch_size):
+    """Time the computation of the citations of an author.
+
+    The citations are computed once fetching the citers of a publication
+    at a time, as in the original implementation, and once fetching them
+    in batches.
+    """
+    for name, size in (('one per publication', 1), ('batched', batch_size)):
+        start = time.time()
+        citations = get_author_citations(author_recid, batch_size=size)
+        duration = time.time() - start
+
+        citers = sum(len(citation['citers']) for citation in citations)
+        click.echo(
+            '{0}: {1} publications, {2} citers in {3:.2f}s'.format(
+                name, len(citations), citers, duration))
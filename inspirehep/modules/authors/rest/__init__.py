@@ -26,6 +26,7 @@ from __future__ import absolute_import, division, print_function
 
 from inspirehep.modules.authors.rest.citations import AuthorAPICitations
 from inspirehep.modules.authors.rest.coauthors import AuthorAPICoauthors
+from inspirehep.modules.authors.rest.profile import AuthorAPIProfile
 from inspirehep.modules.authors.rest.publications import AuthorAPIPublications
 from inspirehep.modules.authors.rest.stats import AuthorAPIStats
 from inspirehep.modules.records.serializers.response import (
@@ -40,6 +41,10 @@ coauthors_v1 = AuthorAPICoauthors()
 coauthors_v1_response = record_responsify_nocache(coauthors_v1,
                                                   'application/json')
 
+profile_v1 = AuthorAPIProfile()
+profile_v1_response = record_responsify_nocache(profile_v1,
+                                                'application/json')
+
 publications_v1 = AuthorAPIPublications()
 publications_v1_response = record_responsify_nocache(publications_v1,
                                                      'application/json')
@@ -24,8 +24,117 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
+from flask import current_app
+
+from invenio_cache import current_cache
+
+from inspire_utils.helpers import force_list
+from inspire_utils.record import get_value
+from inspirehep.modules.authors.utils import get_author_citations_cache_key
 from inspirehep.modules.search import LiteratureSearch
 
+CITERS_BATCH_SIZE = 500
+
+
+def _get_authors_recids(source):
+    # Not every signature has a recid (at least for demo records).
+    return set(force_list(get_value(source, 'authors.recid', default=[])))
+
+
+def _get_citation(citer_source, citer_authors, authors):
+    citation = dict(
+        citer=dict(
+            id=int(citer_source['control_number']),
+            record=citer_source['self']
+        ),
+        # If at least one author is shared, it's a self-citation.
+        self_citation=len(authors & citer_authors) > 0,
+    )
+
+    # Get the earliest date of a citer.
+    try:
+        citation['date'] = citer_source['earliest_date']
+    except KeyError:
+        pass
+
+    # Get status if a citer is published.
+    # FIXME: As discussed with Sam, we should have a boolean flag
+    #        for this type of information.
+    try:
+        citation['published_paper'] = "Published" in [
+            i['primary'] for i in citer_source['collections']]
+    except KeyError:
+        citation['published_paper'] = False
+
+    return citation
+
+
+def get_author_citations(author_pid, batch_size=CITERS_BATCH_SIZE):
+    """Return the citations of every publication of an author.
+
+    The citers are fetched with one ``terms`` query for every
+    ``batch_size`` publications, and then grouped by cited publication.
+    """
+    citations = {}
+    authors = {}
+
+    search = LiteratureSearch().query({
+        "match": {
+            "authors.recid": author_pid
+        }
+    }).params(
+        _source=[
+            "authors.recid",
+            "control_number",
+            "self",
+        ]
+    )
+
+    # For each publication co-authored by a given author...
+    for result in search.scan():
+        result_source = result.to_dict()
+
+        recid = result_source['control_number']
+        authors[recid] = _get_authors_recids(result_source)
+
+        # The source record that is being cited.
+        citations[recid] = {}
+        citations[recid]['citee'] = dict(
+            id=recid,
+            record=result_source['self'],
+        )
+        citations[recid]['citers'] = []
+
+    recids = list(citations)
+    for i in range(0, len(recids), batch_size):
+        batch = set(recids[i:i + batch_size])
+
+        citers_search = LiteratureSearch().filter(
+            'terms', references__recid=list(batch),
+        ).params(
+            _source=[
+                "authors.recid",
+                "collections",
+                "control_number",
+                "earliest_date",
+                "references.recid",
+                "self",
+            ]
+        )
+
+        # Check all publications, which cite the records of the batch.
+        for citer in citers_search.scan():
+            citer_source = citer.to_dict()
+            citer_authors = _get_authors_recids(citer_source)
+
+            cited = batch.intersection(force_list(
+                get_value(citer_source, 'references.recid', default=[])))
+            for recid in cited:
+                citations[recid]['citers'].append(
+                    _get_citation(citer_source, citer_authors, authors[recid]))
+
+    return list(citations.values())
+
 
 class AuthorAPICitations(object):
     """API endpoint for author collection returning citations."""
@@ -33,6 +142,9 @@ class AuthorAPICitations(object):
     def serialize(self, pid, record, links_factory=None):
         """Return a list of citations for a given author recid.
 
+        The result is cached until one of the publications of the author
+        changes or gains a citer.
+
         :param pid:
             Persistent identifier instance.
 
@@ -43,87 +155,15 @@ class AuthorAPICitations(object):
             Factory function for the link generation, which are added to
             the response.
         """
-        author_pid = pid.pid_value
-        citations = {}
-
-        search = LiteratureSearch().query({
-            "match": {
-                "authors.recid": author_pid
-            }
-        }).params(
-            _source=[
-                "authors.recid",
-                "control_number",
-                "self",
-            ]
-        )
-
-        # For each publication co-authored by a given author...
-        for result in search.scan():
-            result_source = result.to_dict()
-
-            recid = result_source['control_number']
-            authors = set([i['recid'] for i in result_source['authors']])
-            citations[recid] = {}
-
-            nested_search = LiteratureSearch().query({
-                "match": {
-                    "references.recid": recid
-                }
-            }).params(
-                _source=[
-                    "authors.recid",
-                    "collections",
-                    "control_number",
-                    "earliest_date",
-                    "self",
-                ]
+        cache_key = get_author_citations_cache_key(pid.pid_value)
+
+        citations = current_cache.get(cache_key)
+        if citations is None:
+            citations = json.dumps(get_author_citations(pid.pid_value))
+            current_cache.set(
+                cache_key,
+                citations,
+                timeout=current_app.config['AUTHORS_CITATIONS_CACHE_TIMEOUT'],
             )
 
-            # The source record that is being cited.
-            citations[recid]['citee'] = dict(
-                id=recid,
-                record=result_source['self'],
-            )
-            citations[recid]['citers'] = []
-
-            # Check all publications, which cite the parent record.
-            for nested_result in nested_search.scan():
-                nested_result_source = nested_result.to_dict()
-
-                # Not every signature has a recid (at least for demo records).
-                try:
-                    nested_authors = set(
-                        [i['recid'] for i in nested_result_source['authors']]
-                    )
-                except KeyError:
-                    nested_authors = set()
-
-                citation = dict(
-                    citer=dict(
-                        id=int(nested_result_source['control_number']),
-                        record=nested_result_source['self']
-                    ),
-                    # If at least one author is shared, it's a self-citation.
-                    self_citation=len(authors & nested_authors) > 0,
-                )
-
-                # Get the earliest date of a citer.
-                try:
-                    citation['date'] = nested_result_source['earliest_date']
-                except KeyError:
-                    pass
-
-                # Get status if a citer is published.
-                # FIXME: As discussed with Sam, we should have a boolean flag
-                #        for this type of information.
-                try:
-                    citation['published_paper'] = "Published" in [
-                        i['primary'] for i in nested_result_source[
-                            'collections']]
-                except KeyError:
-                    citation['published_paper'] = False
-
-                citations[recid]['citers'].append(citation)
-
-        return json.dumps(citations.values())
+        return citations
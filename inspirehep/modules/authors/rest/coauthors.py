@@ -24,7 +24,106 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
-from inspirehep.modules.search import LiteratureSearch
+from inspire_utils.record import get_value
+from inspirehep.modules.search import AuthorsSearch, LiteratureSearch
+
+from .stats import get_author_publications_search
+
+
+def add_coauthors_aggregation(search):
+    """Add to ``search`` the aggregation needed by ``get_coauthors``."""
+    search.aggs.bucket('coauthors', 'terms', field='authors.recid', size=0)
+
+    return search
+
+
+def get_signatures(recids):
+    """Return a signature of each of the given authors in Literature records.
+
+    Only as many papers are fetched as needed to find one signature of
+    every author.
+
+    Returns:
+        dict: mapping the recids of the authors found to their signatures.
+    """
+    missing = set(recids)
+    search = LiteratureSearch().filter(
+        'terms', **{'authors.recid': list(missing)}
+    ).params(
+        _source=[
+            "authors.full_name",
+            "authors.recid",
+            "authors.record",
+        ]
+    )
+
+    signatures = {}
+    for result in search.scan():
+        for author in result.to_dict().get('authors', []):
+            if author.get('recid') in missing and 'record' in author:
+                missing.discard(author['recid'])
+                signatures[author['recid']] = author
+        if not missing:
+            break
+
+    return signatures
+
+
+def get_coauthors(response, author_pid):
+    """Return the co-authors of an author.
+
+    The number of papers shared with each co-author is aggregated by ES,
+    while their names come from their author records, or from one of their
+    signatures for the co-authors without an author record.
+
+    :param response:
+        Response of a search of the publications of the author, with the
+        aggregation added by ``add_coauthors_aggregation``.
+
+    :param author_pid:
+        Persistent identifier value of the author.
+    """
+    counts = {
+        bucket.key: bucket.doc_count
+        for bucket in response.aggregations.coauthors.buckets
+        # Don't add the reference author.
+        if bucket.key != int(author_pid)
+    }
+    if not counts:
+        return []
+
+    authors = AuthorsSearch().filter(
+        'terms', control_number=list(counts),
+    ).params(
+        _source=[
+            "control_number",
+            "name.value",
+            "self",
+        ]
+    )
+
+    coauthors = []
+    for result in authors.scan():
+        result_source = result.to_dict()
+        recid = result_source['control_number']
+        coauthors.append(dict(
+            count=counts[recid],
+            full_name=get_value(result_source, 'name.value'),
+            id=recid,
+            record=result_source['self'],
+        ))
+
+    missing = set(counts) - set(coauthor['id'] for coauthor in coauthors)
+    if missing:
+        for recid, signature in get_signatures(missing).items():
+            coauthors.append(dict(
+                count=counts[recid],
+                full_name=signature.get('full_name'),
+                id=recid,
+                record=signature['record'],
+            ))
+
+    return coauthors
 
 
 class AuthorAPICoauthors(object):
@@ -44,37 +143,8 @@ class AuthorAPICoauthors(object):
             the response.
         """
         author_pid = pid.pid_value
-        coauthors = {}
-
-        search = LiteratureSearch().query({
-            "match": {
-                "authors.recid": author_pid
-            }
-        }).params(
-            _source=[
-                "authors.full_name",
-                "authors.recid",
-                "authors.record",
-            ]
-        )
-
-        for result in search.scan():
-            result_source = result.to_dict()['authors']
-
-            for author in result_source:
-                try:
-                    # Don't add the reference author.
-                    if author['recid'] != author_pid:
-                        if author['recid'] in coauthors:
-                            coauthors[author['recid']]['count'] += 1
-                        else:
-                            coauthors[author['recid']] = dict(
-                                count=1,
-                                full_name=author['full_name'],
-                                id=author['recid'],
-                                record=author['record'],
-                            )
-                except KeyError:
-                    pass
-
-        return json.dumps(coauthors.values())
+
+        search = get_author_publications_search(author_pid)
+        response = add_coauthors_aggregation(search[0:0]).execute()
+
+        return json.dumps(get_coauthors(response, author_pid))
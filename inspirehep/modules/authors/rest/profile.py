@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import json
+from itertools import chain
+
+from .coauthors import add_coauthors_aggregation, get_coauthors
+from .publications import PUBLICATION_FIELDS, get_publication
+from .stats import (
+    add_statistics_aggregations,
+    get_author_publications_search,
+    get_statistics,
+    iter_sorted_citation_counts,
+)
+
+PROFILE_MAX_PUBLICATIONS = 10000
+
+
+class AuthorAPIProfile(object):
+    """API endpoint for author collection returning the whole profile."""
+
+    def serialize(self, pid, record, links_factory=None):
+        """Return statistics, co-authors and publications of an author.
+
+        The publications, sorted by citations, and the aggregations behind
+        the statistics and the co-authors are fetched with a single search.
+        Only the ``PROFILE_MAX_PUBLICATIONS`` most cited publications are
+        returned.
+
+        :param pid:
+            Persistent identifier instance.
+
+        :param record:
+            Record instance.
+
+        :param links_factory:
+            Factory function for the link generation, which are added to
+            the response.
+        """
+        author_pid = pid.pid_value
+
+        search = get_author_publications_search(author_pid)
+        add_statistics_aggregations(search)
+        add_coauthors_aggregation(search)
+        search = search.sort('-citation_count').params(
+            _source=PUBLICATION_FIELDS,
+        )[0:PROFILE_MAX_PUBLICATIONS]
+
+        response = search.execute()
+        sources = [hit.to_dict() for hit in response.hits]
+
+        citation_counts = (source.get('citation_count', 0) for source in sources)
+        if response.hits.total > len(sources):
+            citation_counts = chain(citation_counts, iter_sorted_citation_counts(
+                get_author_publications_search(author_pid), start=len(sources)))
+
+        return json.dumps({
+            'coauthors': get_coauthors(response, author_pid),
+            'publications': [get_publication(source) for source in sources],
+            'stats': get_statistics(response, citation_counts),
+        })
@@ -24,9 +24,78 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
-from inspirehep.modules.search import LiteratureSearch
 from inspirehep.utils.record import get_title
 
+from .stats import get_author_publications_search
+
+
+PUBLICATION_FIELDS = [
+    "accelerator_experiments",
+    "earliest_date",
+    "citation_count",
+    "control_number",
+    "facet_inspire_doc_type",
+    "publication_info",
+    "self",
+    "keywords",
+    "titles",
+]
+
+
+def get_publication(result_source):
+    """Return the summary of a publication of an author."""
+    publication = {}
+    publication['id'] = int(result_source['control_number'])
+    publication['record'] = result_source['self']
+    publication['title'] = get_title(result_source)
+
+    # Get the earliest date.
+    try:
+        publication['date'] = result_source['earliest_date']
+    except KeyError:
+        pass
+
+    # Get publication type.
+    try:
+        publication['type'] = result_source.get(
+            'facet_inspire_doc_type', [])[0]
+    except IndexError:
+        pass
+
+    # Get citation count.
+    try:
+        publication['citations'] = result_source['citation_count']
+    except KeyError:
+        pass
+
+    # Get journal.
+    try:
+        publication['journal'] = {}
+        publication['journal']['title'] = result_source.get(
+            'publication_info', [])[0]['journal_title']
+
+        # Get journal id and $self.
+        try:
+            publication['journal']['id'] = result_source.get(
+                'publication_info', [])[0]['journal_recid']
+            publication['journal']['record'] = result_source.get(
+                'publication_info', [])[0]['journal_record']
+        except KeyError:
+            pass
+    except (IndexError, KeyError):
+        del publication['journal']
+
+    # Get collaborations.
+    collaborations = set()
+
+    for experiment in result_source.get('accelerator_experiments', []):
+        collaborations.add(experiment.get('experiment'))
+
+    if collaborations:
+        publication['collaborations'] = list(collaborations)
+
+    return publication
+
 
 class AuthorAPIPublications(object):
     """API endpoint for author collection returning publications."""
@@ -44,80 +113,12 @@ class AuthorAPIPublications(object):
             Factory function for the link generation, which are added to
             the response.
         """
-        author_pid = pid.pid_value
-        publications = []
-
-        search = LiteratureSearch().query({
-            "match": {
-                "authors.recid": author_pid
-            }
-        }).params(
-            _source=[
-                "accelerator_experiments",
-                "earliest_date",
-                "citation_count",
-                "control_number",
-                "facet_inspire_doc_type",
-                "publication_info",
-                "self",
-                "keywords",
-                "titles",
-            ]
+        search = get_author_publications_search(pid.pid_value).params(
+            _source=PUBLICATION_FIELDS,
         )
 
-        for result in search.scan():
-            result_source = result.to_dict()
-
-            publication = {}
-            publication['id'] = int(result_source['control_number'])
-            publication['record'] = result_source['self']
-            publication['title'] = get_title(result_source)
-
-            # Get the earliest date.
-            try:
-                publication['date'] = result_source['earliest_date']
-            except KeyError:
-                pass
-
-            # Get publication type.
-            try:
-                publication['type'] = result_source.get(
-                    'facet_inspire_doc_type', [])[0]
-            except IndexError:
-                pass
-
-            # Get citation count.
-            try:
-                publication['citations'] = result_source['citation_count']
-            except KeyError:
-                pass
-
-            # Get journal.
-            try:
-                publication['journal'] = {}
-                publication['journal']['title'] = result_source.get(
-                    'publication_info', [])[0]['journal_title']
-
-                # Get journal id and $self.
-                try:
-                    publication['journal']['id'] = result_source.get(
-                        'publication_info', [])[0]['journal_recid']
-                    publication['journal']['record'] = result_source.get(
-                        'publication_info', [])[0]['journal_record']
-                except KeyError:
-                    pass
-            except (IndexError, KeyError):
-                del publication['journal']
-
-            # Get collaborations.
-            collaborations = set()
-
-            for experiment in result_source.get('accelerator_experiments', []):
-                collaborations.add(experiment.get('experiment'))
-
-            if collaborations:
-                publication['collaborations'] = list(collaborations)
-
-            publications.append(publication)
+        publications = [
+            get_publication(result.to_dict()) for result in search.scan()
+        ]
 
         return json.dumps(publications)
@@ -23,12 +23,96 @@
 from __future__ import absolute_import, division, print_function
 
 import json
-from collections import Counter
 
-from inspire_utils.helpers import force_list
-from inspire_utils.record import get_value
+from elasticsearch_dsl.query import Q
+
 from inspirehep.modules.search import LiteratureSearch
-from inspirehep.utils.stats import calculate_h_index, calculate_i10_index
+from inspirehep.utils.stats import calculate_h_index_from_sorted
+
+AUTOMATIC_KEYWORDS = '* Automatic Keywords *'
+
+
+def get_author_publications_search(author_pid):
+    """Return a search for all the publications of an author."""
+    return LiteratureSearch().query({
+        "match": {
+            "authors.recid": author_pid
+        }
+    })
+
+
+def add_statistics_aggregations(search):
+    """Add to ``search`` the aggregations needed by ``get_statistics``."""
+    search.aggs.metric('citations', 'sum', field='citation_count')
+    search.aggs.bucket(
+        'i10index', 'filter', filter=Q('range', citation_count={'gte': 10}))
+    search.aggs.bucket(
+        'types', 'terms', field='facet_inspire_primary_doc_type', size=0)
+    search.aggs.bucket(
+        'fields', 'terms', field='facet_inspire_categories', size=0)
+    search.aggs.bucket(
+        'keywords', 'terms', field='keywords.value.raw', size=25,
+        exclude=[AUTOMATIC_KEYWORDS])
+
+    return search
+
+
+def iter_sorted_citation_counts(search, start=0, page_size=100):
+    """Yield the citation counts of the hits of ``search``, highest first.
+
+    Pages are only fetched when needed, so that computing an h-index
+    does not require fetching all the hits.
+    """
+    search = search.sort('-citation_count').params(
+        _source=['citation_count'])
+
+    while True:
+        hits = search[start:start + page_size].execute().hits
+        for hit in hits:
+            yield getattr(hit, 'citation_count', 0)
+
+        if len(hits) < page_size:
+            return
+        start += page_size
+
+
+def get_statistics(response, citation_counts):
+    """Return the statistics of an author.
+
+    :param response:
+        Response of a search of the publications of the author, with the
+        aggregations added by ``add_statistics_aggregations``.
+
+    :param citation_counts:
+        Citation counts of the publications of the author, highest first.
+    """
+    aggregations = response.aggregations
+
+    statistics = {}
+    statistics['citations'] = int(aggregations.citations.value or 0)
+    statistics['publications'] = response.hits.total
+    statistics['types'] = {
+        bucket.key: bucket.doc_count
+        for bucket in aggregations.types.buckets
+    }
+
+    # Calculate h-index together with i10-index.
+    statistics['hindex'] = calculate_h_index_from_sorted(citation_counts)
+    statistics['i10index'] = aggregations.i10index.doc_count
+
+    fields = [bucket.key for bucket in aggregations.fields.buckets]
+    if fields:
+        statistics['fields'] = fields
+
+    # Return the top 25 keywords.
+    keywords = aggregations.keywords.buckets
+    if keywords:
+        statistics['keywords'] = [{
+            'count': bucket.doc_count,
+            'keyword': bucket.key,
+        } for bucket in keywords]
+
+    return statistics
 
 
 class AuthorAPIStats(object):
@@ -47,81 +131,10 @@ class AuthorAPIStats(object):
             Factory function for the link generation, which are added to
             the response.
         """
-        author_pid = pid.pid_value
-
-        fields = set()
-        keywords = []
-
-        statistics = {}
-        statistics['citations'] = 0
-        statistics['publications'] = 0
-        statistics['types'] = {}
-
-        statistics_citations = {}
-
-        search = LiteratureSearch().query({
-            "match": {
-                "authors.recid": author_pid
-            }
-        }).params(
-            _source=[
-                "citation_count",
-                "control_number",
-                "facet_inspire_doc_type",
-                "facet_inspire_categories",
-                "keywords",
-            ]
-        )
-
-        for result in search.scan():
-            result_source = result.to_dict()
-
-            # Increment the count of the total number of publications.
-            statistics['publications'] += 1
-
-            # Increment the count of citations.
-            citation_count = result_source.get('citation_count', 0)
-
-            statistics['citations'] += citation_count
-            statistics_citations[result_source['control_number']] = \
-                citation_count
-
-            # Count how many times certain type of publication was published.
-            try:
-                publication_type = result_source.get(
-                    'facet_inspire_doc_type', [])[0]
-            except IndexError:
-                pass
-
-            if publication_type:
-                if publication_type in statistics['types']:
-                    statistics['types'][publication_type] += 1
-                else:
-                    statistics['types'][publication_type] = 1
-
-            # Get fields.
-            for field in result_source.get('facet_inspire_categories', []):
-                fields.add(field)
-
-            # Get keywords.
-            keywords.extend([
-                k for k in force_list(
-                    get_value(result_source, 'keywords.value'))
-                if k != '* Automatic Keywords *'])
-
-        # Calculate h-index together with i10-index.
-        statistics['hindex'] = calculate_h_index(statistics_citations)
-        statistics['i10index'] = calculate_i10_index(statistics_citations)
-
-        if fields:
-            statistics['fields'] = list(fields)
-
-        # Return the top 25 keywords.
-        if keywords:
-            counter = Counter(keywords)
-            statistics['keywords'] = [{
-                'count': i[1],
-                'keyword': i[0]
-            } for i in counter.most_common(25)]
+        search = get_author_publications_search(pid.pid_value)
+
+        response = add_statistics_aggregations(search[0:0]).execute()
+        statistics = get_statistics(
+            response, iter_sorted_citation_counts(search))
 
         return json.dumps(statistics)
@@ -26,11 +26,16 @@ from __future__ import absolute_import, division, print_function
 
 import re
 
-
 import numpy as np
+import six
 from beard.utils.strings import asciify
 from beard.clustering import block_phonetic
 
+from invenio_cache import current_cache
+
+from inspire_utils.name import generate_name_variations
+from inspirehep.utils.cache import TwoLevelCache
+
 
 _bai_parentheses_cleaner = \
     re.compile(r"(\([^)]*\))|(\[[^\]]*\])|(\{[^\}]*\})", re.UNICODE)
@@ -108,15 +113,18 @@ def bai(name):
     return bai
 
 
-def phonetic_blocks(full_names, phonetic_algorithm='nysiis'):
-    """Create a dictionary of phonetic blocks for a given list of names."""
+def normalize_name(full_name):
+    """Return ``full_name`` with its whitespace collapsed."""
+    return u' '.join(full_name.split())
+
 
+def _compute_phonetic_blocks(full_names, phonetic_algorithm='nysiis'):
     # The method requires a list of dictionaries with full_name as keys.
     full_names_formatted = [
         {"author_name": i} for i in full_names]
 
     # Create a list of phonetic blocks.
-    phonetic_blocks = list(
+    return list(
         block_phonetic(np.array(
             full_names_formatted,
             dtype=np.object).reshape(-1, 1),
@@ -125,4 +133,78 @@ def phonetic_blocks(full_names, phonetic_algorithm='nysiis'):
         )
     )
 
-    return dict(zip(full_names, phonetic_blocks))
+
+def _compute_name_variations(full_names):
+    return dict(
+        (full_name, generate_name_variations(full_name))
+        for full_name in full_names
+    )
+
+
+NAMES_CACHE_SIZE = 100000
+
+# The names of the authors of large collaborations appear in thousands of
+# records, so the values computed from them are cached.
+PHONETIC_BLOCKS_CACHE = TwoLevelCache(
+    'nysiis',
+    lambda full_names: dict(zip(full_names, _compute_phonetic_blocks(full_names))),
+    NAMES_CACHE_SIZE,
+    shared_config='AUTHORS_NAMES_SHARED_CACHE',
+    shared_timeout_config='AUTHORS_NAMES_SHARED_CACHE_TIMEOUT',
+)
+NAME_VARIATIONS_CACHE = TwoLevelCache(
+    'name_variations',
+    _compute_name_variations,
+    NAMES_CACHE_SIZE,
+    shared_config='AUTHORS_NAMES_SHARED_CACHE',
+    shared_timeout_config='AUTHORS_NAMES_SHARED_CACHE_TIMEOUT',
+)
+
+
+def _get_cached(cache, full_names):
+    normalized_names = dict(
+        (full_name, normalize_name(full_name)) for full_name in full_names)
+    values = cache.get_many(normalized_names.values())
+
+    return dict(
+        (full_name, values[normalized_name])
+        for full_name, normalized_name in normalized_names.items()
+    )
+
+
+def phonetic_blocks(full_names, phonetic_algorithm='nysiis'):
+    """Create a dictionary of phonetic blocks for a given list of names.
+
+    Only the NYSIIS blocks are cached, as they are the ones assigned to
+    the signatures of the records.
+    """
+    if phonetic_algorithm != 'nysiis':
+        return dict(zip(
+            full_names,
+            _compute_phonetic_blocks(full_names, phonetic_algorithm),
+        ))
+
+    return _get_cached(PHONETIC_BLOCKS_CACHE, full_names)
+
+
+def name_variations(full_names):
+    """Create a dictionary of name variations for a given list of names."""
+    return dict(
+        (full_name, list(variations)) for full_name, variations
+        in six.iteritems(_get_cached(NAME_VARIATIONS_CACHE, full_names))
+    )
+
+
+def get_author_citations_cache_key(author_recid):
+    """Return the cache key of the citations of an author."""
+    return 'author_citations::{0}'.format(author_recid)
+
+
+def invalidate_author_citations(authors_recids):
+    """Drop the cached citations of the given authors."""
+    keys = [
+        get_author_citations_cache_key(author_recid)
+        for author_recid in set(authors_recids)
+    ]
+    if keys:
+        current_cache.delete_many(*keys)
@@ -26,7 +26,6 @@ from __future__ import absolute_import, division, print_function
 
 from itertools import chain
 
-from elasticsearch import RequestError
 from flask import current_app
 from six import text_type
 
@@ -566,12 +565,9 @@ def _get_hal_id_map(record):
         record, 'authors.affiliations.record', default=[]))
     affiliation_recids = [get_recid_from_ref(el) for el in affiliation_records]
 
-    try:
-        institutions = get_es_records('ins', affiliation_recids)
-    except RequestError:
-        institutions = []
+    institutions = get_es_records('ins', affiliation_recids)
 
-    return {el['control_number']: _get_hal_id(el) for el in institutions}
+    return {el['control_number']: _get_hal_id(el) for el in institutions if el}
 
 
 def _get_hal_id(record):
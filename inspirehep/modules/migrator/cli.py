@@ -25,9 +25,16 @@
 from __future__ import absolute_import, division, print_function
 
 import csv
+import gzip
+import json
+import multiprocessing
 import os
+import re
+import resource
 import sys
+import time
 import traceback
+import zlib
 from itertools import dropwhile
 
 import click
@@ -35,21 +42,36 @@ import jsonschema
 import requests
 from flask_cli import with_appcontext
 
-from dojson.contrib.marc21.utils import create_record
+from invenio_db import db
 
 from inspire_dojson import marcxml2record
 from inspire_schemas.api import validate
-from inspire_utils.helpers import force_list
+from inspirehep.modules.records.citations import build_citation_graph
+from inspirehep.modules.records.references import build_references_index
+from inspirehep.utils.helpers import chunker
+from six import iteritems, text_type
+from six.moves import map
 
-from .models import InspireProdRecords
+from .models import InspireProdRecords, InspireProdRecordsDictionary
 from .tasks import (
     add_citation_counts,
+    get_changed_records,
+    get_continuous_migration_stats,
+    get_shards_progress,
     migrate,
     migrate_chunk,
+    migrate_sharded,
     remigrate_records,
     split_blob,
+    split_dump,
+    split_stream,
 )
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 REAL_COLLECTIONS = (
     'INSTITUTION',
     'EXPERIMENT',
@@ -62,6 +84,14 @@ REAL_COLLECTIONS = (
     'DATA',
 )
 
+REPORTERRORS_CHUNK_SIZE = 1000
+
+MARCXML_DICTIONARY_SIZE = 112640
+
+COLLECTION_FIELD = re.compile(
+    br'<datafield[^>]*\stag="980"[^>]*>(.*?)</datafield>', re.DOTALL)
+SUBFIELD_VALUE = re.compile(br'<subfield[^>]*>([^<]*)</subfield>')
+
 
 @click.group()
 def migrator():
@@ -77,26 +107,199 @@ def migrator():
               default=False, help='Remigrate all records')
 @click.option('--wait', '-w', type=bool, default=False,
               help='Wait for migrator to complete.')
+@click.option('--shards', '-s', type=int, default=None,
+              help='Migrate the file in parallel, split in this many shards.')
+@click.option('--reset-checkpoints', is_flag=True, default=False,
+              help='Ignore the progress of a previous sharded migration.')
+@click.option('--max-in-flight', type=int, default=None,
+              help='Maximum number of chunks queued at any time.')
+@click.option('--include-unchanged', is_flag=True, default=False,
+              help='Also migrate the records whose MARCXML did not change.')
 def populate(file_input=None,
              remigrate_broken=False,
              remigrate_all=False,
-             wait=False):
+             wait=False,
+             shards=None,
+             reset_checkpoints=False,
+             max_in_flight=None,
+             include_unchanged=False):
     """Populates the system with records from migrator files.
 
     Usage: inveniomanage migrator populate -f prodsync20151117173222.xml.gz
+
+    With ``--shards`` the file is split in byte ranges that are migrated
+    in parallel, and an interrupted migration of the same file resumes
+    from where each shard stopped.
+
+    Records migrated successfully from the same MARCXML are skipped, unless
+    ``--include-unchanged`` is given.
+
+    The chunks are produced by this process, and migrated by the workers
+    of the ``migrator`` queue.
     """
+    skip_unchanged = False if include_unchanged else None
+
     if remigrate_broken:
         click.echo("Remigrate broken records...")
-        remigrate_records.delay(only_broken=True)
+        remigrate_records(only_broken=True, max_in_flight=max_in_flight)
     elif remigrate_all:
         click.echo("Remigrate all records...")
-        remigrate_records.delay(only_broken=False)
+        remigrate_records(only_broken=False, max_in_flight=max_in_flight)
     elif file_input and not os.path.isfile(file_input):
         click.echo("{0} is not a file!".format(file_input), err=True)
+    elif file_input and shards:
+        click.echo("Migrating records from file: {0} in {1} shards".format(
+            file_input, shards))
+
+        migrate_sharded(
+            os.path.abspath(file_input),
+            shards,
+            wait_for_results=wait,
+            reset_checkpoints=reset_checkpoints,
+            skip_unchanged=skip_unchanged,
+        )
     elif file_input:
         click.echo("Migrating records from file: {0}".format(file_input))
 
-        migrate(os.path.abspath(file_input), wait_for_results=wait)
+        migrate(
+            os.path.abspath(file_input),
+            wait_for_results=wait,
+            max_in_flight=max_in_flight,
+            skip_unchanged=skip_unchanged,
+        )
+
+
+@migrator.command()
+@click.option('--file-input', '-f', required=True,
+              help='File being migrated in shards.')
+@with_appcontext
+def progress(file_input):
+    """Show how far each shard of a sharded migration got."""
+    checkpoints = get_shards_progress(os.path.abspath(file_input))
+    if not checkpoints:
+        click.echo("No sharded migration of {0} was started.".format(file_input))
+        return
+
+    done = 0
+    total = 0
+    for (start, end), offset in sorted(checkpoints.items()):
+        done += offset - start
+        total += end - start
+        click.echo("Shard {0}-{1}: {2:.1f}%".format(
+            start, end, 100.0 * (offset - start) / (end - start)))
+    click.echo("Total: {0:.1f}%".format(100.0 * done / total))
+
+
+@migrator.command()
+@with_appcontext
+def lag():
+    """Show how far behind Legacy the continuous migration is."""
+    stats = get_continuous_migration_stats()
+    if not stats:
+        click.echo("The continuous migration did not run yet.")
+        return
+
+    click.echo("Records in the queue: {0:.0f}".format(stats['queue_length']))
+    if stats.get('oldest_record_age') is not None:
+        click.echo("Age of the oldest record: {0:.0f}s".format(
+            stats['oldest_record_age']))
+    if stats.get('batch_size'):
+        click.echo("Last batch: {0:.0f} records in {1:.1f}s".format(
+            stats['batch_size'], stats['batch_duration']))
+    click.echo("Updated {0:.0f}s ago".format(time.time() - stats['updated']))
+
+
+def _regex_split_stream(stream):
+    """Split MARCXML the way the migrator did before ``split_stream``.
+
+    Only kept as a baseline for ``benchmark_split``.
+    """
+    split_marc = re.compile('<record.*?>.*?</record>', re.DOTALL)
+
+    buf = []
+    for row in stream:
+        row = text_type(row, 'utf8')
+        index = row.rfind('</record>')
+        if index >= 0:
+            buf.append(row[:index + 9])
+            for match in split_marc.finditer(''.join(buf)):
+                yield match.group().encode('utf8')
+            buf = [row[index + 9:]]
+        else:
+            buf.append(row)
+
+
+def _open_dump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _run_splitter(splitter, path, queue):
+    start = time.time()
+    records = 0
+    size = 0
+    for record in splitter(path):
+        records += 1
+        size += len(record)
+    elapsed = time.time() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((records, size, elapsed, max_rss))
+
+
+def _split_with_regex(path):
+    return _regex_split_stream(_open_dump(path))
+
+
+def _split_with_stream(path):
+    return split_stream(_open_dump(path))
+
+
+def _split_with_mmap(path):
+    return (record for record, _ in split_dump(path, zero_copy=True))
+
+
+@migrator.command()
+@click.option('--file-input', '-f', required=True,
+              help='Dump to split.')
+def benchmark_split(file_input):
+    """Compare the speed and memory usage of the MARCXML splitters.
+
+    Every splitter runs in a separate process on the whole file, so that
+    the peak resident memory reported belongs to it alone. Note that for
+    the mmap splitter it includes the pages of the file mapped in memory,
+    which are shared with the page cache.
+    """
+    splitters = [
+        ('regex', file_input, _split_with_regex),
+        ('stream', file_input, _split_with_stream),
+    ]
+
+    uncompressed = file_input[:-len('.gz')] if file_input.endswith('.gz') else file_input
+    if os.path.exists(uncompressed):
+        splitters.append(('mmap', uncompressed, _split_with_mmap))
+    else:
+        click.echo('Skipping the mmap splitter: {0} is not decompressed.'.format(file_input))
+
+    for name, path, splitter in splitters:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_run_splitter, args=(splitter, path, queue))
+        process.start()
+        records, size, elapsed, max_rss = queue.get()
+        process.join()
+
+        click.echo(
+            '{0}: {1} records ({2:.1f} MiB) in {3:.2f}s, {4:.0f} records/s, '
+            'peak RSS {5:.1f} MiB'.format(
+                name,
+                records,
+                size / 1024.0 / 1024,
+                elapsed,
+                records / elapsed if elapsed else 0,
+                max_rss / 1024.0,
+            )
+        )
 
 
 @migrator.command()
@@ -115,82 +318,319 @@ def count_citations():
     add_citation_counts()
 
 
+@migrator.command()
+@with_appcontext
+def build_citations():
+    """Builds the citation graph from all the records in the DB."""
+    click.echo("Building the citation graph")
+    count = build_citation_graph()
+    click.echo("... DONE: {0} citations.".format(count))
+
+
+@migrator.command()
+@with_appcontext
+def build_references():
+    """Builds the index of references from all the records in the DB."""
+    click.echo("Building the index of references")
+    count = build_references_index()
+    click.echo("... DONE: {0} references.".format(count))
+
+
+def _get_marcxml_sample(size):
+    records = InspireProdRecords.query.order_by(db.func.random()).limit(size)
+    return [record.marcxml for record in records]
+
+
+@migrator.command()
+@click.option('--sample-size', '-n', type=int, default=10000,
+              help='Number of records to train the dictionary on.')
+@click.option('--dict-size', type=int, default=MARCXML_DICTIONARY_SIZE,
+              help='Size in bytes of the dictionary.')
+@with_appcontext
+def train_dictionary(sample_size, dict_size):
+    """Train a Zstandard dictionary on a random sample of the migrated records.
+
+    When ``MIGRATOR_MARCXML_DICTIONARY_COMPRESSION`` is set, the MARCXML of
+    the records written from then on is compressed with this dictionary.
+    """
+    if zstandard is None:
+        click.echo("Training a dictionary requires the zstd extra.", err=True)
+        return
+
+    click.echo("Training a dictionary on {0} records".format(sample_size))
+    dictionary = zstandard.train_dictionary(dict_size, _get_marcxml_sample(sample_size))
+    db.session.add(InspireProdRecordsDictionary(
+        id=dictionary.dict_id(),
+        data=dictionary.as_bytes(),
+    ))
+    db.session.commit()
+    click.echo("... DONE: dictionary {0}.".format(dictionary.dict_id()))
+
+
+@migrator.command()
+@click.option('--batch-size', type=int, default=1000,
+              help='Number of records rewritten in each transaction.')
+@with_appcontext
+def recompress(batch_size):
+    """Compress again the MARCXML of all the migrated records.
+
+    Moves the records migrated before a dictionary was trained to the
+    current storage format, and fills in the missing hashes.
+    """
+    query = InspireProdRecords.query.order_by(InspireProdRecords.recid)
+    before = 0
+    after = 0
+    last_recid = None
+
+    with click.progressbar(length=query.count()) as bar:
+        while True:
+            batch_query = query
+            if last_recid is not None:
+                batch_query = query.filter(InspireProdRecords.recid > last_recid)
+            batch = batch_query.limit(batch_size).all()
+            if not batch:
+                break
+
+            for prod_record in batch:
+                before += len(prod_record._marcxml)
+                prod_record.marcxml = prod_record.marcxml
+                after += len(prod_record._marcxml)
+            last_recid = batch[-1].recid
+            db.session.commit()
+            bar.update(len(batch))
+
+    click.echo("... DONE: {0} bytes rewritten as {1} bytes.".format(before, after))
+
+
+@migrator.command()
+@click.option('--sample-size', '-n', type=int, default=1000,
+              help='Number of records to benchmark.')
+@with_appcontext
+def benchmark_storage(sample_size):
+    """Compare the storage formats of the MARCXML, and the cost of remigrations.
+
+    A random sample of the migrated records is compressed with zlib, and
+    with Zstandard with and without a dictionary trained on another sample.
+    Then the time taken to detect which records of the sample are unchanged
+    is compared with the time taken to convert them, which is what
+    remigrating them would cost.
+    """
+    records = _get_marcxml_sample(2 * sample_size)
+    training, sample = records[:len(records) // 2], records[len(records) // 2:]
+    if not sample:
+        click.echo("There are no migrated records.", err=True)
+        return
+
+    codecs = [('zlib', zlib.compress, zlib.decompress)]
+    if zstandard is None:
+        click.echo('Skipping Zstandard: the zstd extra is not installed.')
+    else:
+        compressor = zstandard.ZstdCompressor(write_content_size=True)
+        decompressor = zstandard.ZstdDecompressor()
+        codecs.append(('zstd', compressor.compress, decompressor.decompress))
+
+        dictionary = zstandard.train_dictionary(MARCXML_DICTIONARY_SIZE, training)
+        compressor = zstandard.ZstdCompressor(
+            dict_data=dictionary, write_content_size=True)
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        codecs.append(('zstd with dictionary', compressor.compress, decompressor.decompress))
+
+    size = sum(len(record) for record in sample)
+    click.echo('MARCXML: {0} records, {1} bytes'.format(len(sample), size))
+
+    for name, compress, decompress in codecs:
+        start = time.time()
+        compressed = [compress(record) for record in sample]
+        compression = time.time() - start
+
+        start = time.time()
+        for data in compressed:
+            decompress(data)
+        decompression = time.time() - start
+
+        compressed_size = sum(len(data) for data in compressed)
+        click.echo(
+            '{0}: {1} bytes ({2:.1%}), compression {3:.0f} records/s, '
+            'decompression {4:.0f} records/s'.format(
+                name,
+                compressed_size,
+                compressed_size / size,
+                len(sample) / compression if compression else float('inf'),
+                len(sample) / decompression if decompression else float('inf'),
+            )
+        )
+
+    start = time.time()
+    unchanged = len(sample) - len(get_changed_records(sample))
+    detection = time.time() - start
+
+    start = time.time()
+    for record in sample:
+        try:
+            marcxml2record(record)
+        except Exception:
+            pass
+    conversion = time.time() - start
+
+    click.echo(
+        'Remigration: {0} unchanged records detected in {1:.3f}s, '
+        'converting the sample takes {2:.3f}s'.format(
+            unchanged, detection, conversion))
+
+
+def _get_collection(marcxml):
+    """Return the collection of a record from the ``980`` fields of its MARCXML.
+
+    The fields are looked up with regular expressions, which spares a parse
+    of the whole record on top of the one done by ``marcxml2record``.
+    """
+    collections = set(
+        value.decode('utf8').upper().strip()
+        for field in COLLECTION_FIELD.findall(marcxml)
+        for value in SUBFIELD_VALUE.findall(field)
+    )
+    if 'DELETED' in collections:
+        return 'DELETED'
+    for collection in collections:
+        if collection in REAL_COLLECTIONS:
+            return collection
+    return 'HEP'
+
+
+def _check_record(args):
+    """Convert and validate a record, returning its error if any.
+
+    Runs in the worker processes of ``reporterrors``, so everything it
+    returns is made of plain strings.
+
+    Returns:
+        Optional[tuple]: the ``(collection, stage, error, recid, details,
+        schema_path)`` of the error, or ``None`` if the record is valid or
+        deleted.
+    """
+    recid, marcxml = args
+
+    collection = _get_collection(marcxml)
+    if collection == 'DELETED':
+        return None
+
+    try:
+        json_record = marcxml2record(marcxml)
+    except Exception:
+        tb = u''.join(traceback.format_tb(sys.exc_info()[2]))
+        return collection, 'dojson', tb, recid, None, None
+
+    try:
+        validate(json_record)
+    except jsonschema.exceptions.ValidationError as err:
+        exc = [
+            row
+            for row in str(err).splitlines()
+            if row.startswith('Failed validating')
+        ][0]
+        details = u'\n'.join(
+            dropwhile(
+                lambda x: not x.startswith('On instance'),
+                str(err).splitlines()
+            )
+        )
+        schema_path = u'.'.join(text_type(part) for part in err.schema_path)
+        return collection, 'validation', exc, recid, details, schema_path
+
+    return None
+
+
 @migrator.command()
 @click.option('--output', '-o', default="/tmp/broken-records.csv",
               help='Specifiy where to report errors.')
+@click.option('--summary', '-s', default=None,
+              help='Also write a JSON summary of the errors by schema path.')
+@click.option('--workers', '-w', type=int, default=multiprocessing.cpu_count(),
+              help='Number of processes checking the records.')
 @with_appcontext
-def reporterrors(output):
-    """Reports in a friendly way all failed records and corresponding motivation."""
-    def get_collection(marc_record):
-        collections = set()
-        for field in force_list(marc_record.get('980__')):
-            for v in field.values():
-                for e in force_list(v):
-                    collections.add(e.upper().strip())
-        if 'DELETED' in collections:
-            return 'DELETED'
-        for collection in collections:
-            if collection in REAL_COLLECTIONS:
-                return collection
-        return 'HEP'
+def reporterrors(output, summary, workers):
+    """Reports in a friendly way all failed records and corresponding motivation.
 
+    The records are checked by a pool of ``workers`` processes, and the
+    validation errors are written as soon as they are found. The conversion
+    errors are grouped by traceback, and written at the end.
+    """
     click.echo("Reporting broken records into {0}".format(output))
-    errors = {}
-    results = InspireProdRecords.query.filter(InspireProdRecords.valid == False) # noqa: ignore=F712
-    results_length = results.count()
-    with click.progressbar(results.yield_per(100), length=results_length) as bar:
-        for obj in bar:
-            marc_record = create_record(obj.marcxml, keep_singletons=False)
-            collection = get_collection(marc_record)
-            if 'DELETED' in collection:
-                continue
-            recid = int(marc_record['001'])
-            try:
-                json_record = marcxml2record(obj.marcxml)
-            except Exception as err:
-                tb = u''.join(traceback.format_tb(sys.exc_info()[2]))
-                errors.setdefault((collection, 'dojson', tb), []).append(recid)
-                continue
-
-            try:
-                validate(json_record)
-            except jsonschema.exceptions.ValidationError as err:
-                exc = [
-                    row
-                    for row in str(err).splitlines()
-                    if row.startswith('Failed validating')
-                ][0]
-                details = u'\n'.join(
-                    dropwhile(
-                        lambda x: not x.startswith('On instance'),
-                        str(err).splitlines()
-                    )
-                )
-                errors.setdefault(
-                    (collection, 'validation', exc), []
-                ).append((recid, details))
-                continue
-
-    with open(output, "w") as out:
-        csv_writer = csv.writer(out)
-        for (collection, stage, error), elements in errors.iteritems():
-            if stage == 'dojson':
-                csv_writer.writerow((
-                    collection,
-                    stage,
-                    error,
-                    '\n'.join(
-                        'http://inspirehep.net/record/{}'.format(recid)
-                        for recid in elements
-                    )
-                ))
-            else:
-                for recid, details in elements:
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+
+    dojson_errors = {}
+    validation_errors = {}
+    checked = 0
+    try:
+        results = InspireProdRecords.query.filter(InspireProdRecords.valid == False) # noqa: ignore=F712
+        results_length = results.count()
+        records = ((obj.recid, obj.marcxml) for obj in results.yield_per(100))
+
+        with open(output, "w") as out, \
+                click.progressbar(length=results_length) as bar:
+            csv_writer = csv.writer(out)
+            # Chunks bound the records read ahead of the workers.
+            for chunk in chunker(records, REPORTERRORS_CHUNK_SIZE):
+                if pool:
+                    errors = pool.imap_unordered(_check_record, chunk, 10)
+                else:
+                    errors = map(_check_record, chunk)
+
+                for error in errors:
+                    checked += 1
+                    bar.update(1)
+                    if error is None:
+                        continue
+
+                    collection, stage, exc, recid, details, schema_path = error
+                    if stage == 'dojson':
+                        dojson_errors.setdefault((collection, exc), []).append(recid)
+                        continue
+
                     csv_writer.writerow((
                         collection,
                         stage,
-                        error,
+                        exc,
                         'http://inspirehep.net/record/{}'.format(recid),
                         details
                     ))
+                    validation_errors.setdefault(schema_path, []).append(recid)
+
+            for (collection, exc), recids in iteritems(dojson_errors):
+                csv_writer.writerow((
+                    collection,
+                    'dojson',
+                    exc,
+                    '\n'.join(
+                        'http://inspirehep.net/record/{}'.format(recid)
+                        for recid in recids
+                    )
+                ))
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
     click.echo("Dumped errors into {}".format(output))
+
+    if summary:
+        with open(summary, "w") as out:
+            json.dump({
+                'checked': checked,
+                'dojson': [
+                    {
+                        'collection': collection,
+                        'traceback': exc,
+                        'count': len(recids),
+                        'recids': sorted(recids),
+                    }
+                    for (collection, exc), recids in iteritems(dojson_errors)
+                ],
+                'validation': {
+                    schema_path: {
+                        'count': len(recids),
+                        'recids': sorted(recids),
+                    }
+                    for schema_path, recids in iteritems(validation_errors)
+                },
+            }, out, indent=2, sort_keys=True)
+        click.echo("Dumped summary into {}".format(summary))
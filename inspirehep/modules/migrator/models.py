@@ -24,12 +24,114 @@
 
 from __future__ import absolute_import, division, print_function
 
+import hashlib
+import time
+import zlib
 from datetime import datetime
-from zlib import compress, decompress, error
 
+import pkg_resources
+from flask import current_app
 from invenio_db import db
 from sqlalchemy.ext.hybrid import hybrid_property
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+DICTIONARY_CHECK_INTERVAL = 600
+
+# The Zstandard dictionaries by ID, and the current one with the time it
+# was looked up.
+_dictionaries = {}
+_current_dictionary = (None, 0)
+
+# The packages whose upgrade can change the record converted from the same
+# MARCXML.
+CONVERTER_PACKAGES = ('inspire-dojson', 'inspire-schemas')
+
+
+def get_marcxml_hash(marcxml):
+    """Return the digest identifying the content of a MARCXML record."""
+    return hashlib.sha1(marcxml).hexdigest()
+
+
+def get_converter_version():
+    """Return the versions of the packages converting MARCXML records."""
+    return ' '.join(
+        '{}=={}'.format(package, pkg_resources.get_distribution(package).version)
+        for package in CONVERTER_PACKAGES
+    )
+
+
+def _get_dictionary(dict_id):
+    if dict_id not in _dictionaries:
+        dictionary = InspireProdRecordsDictionary.query.get(dict_id)
+        if dictionary is None:
+            raise ValueError('Unknown MARCXML dictionary {}'.format(dict_id))
+        _dictionaries[dict_id] = zstandard.ZstdCompressionDict(dictionary.data)
+
+    return _dictionaries[dict_id]
+
+
+def _get_current_dictionary():
+    """Return the latest dictionary trained, or ``None`` if there is none.
+
+    The latest dictionary is looked up again every
+    ``DICTIONARY_CHECK_INTERVAL`` seconds, so that running processes start
+    using a new one without being restarted.
+    """
+    global _current_dictionary
+
+    dict_id, checked = _current_dictionary
+    if time.time() - checked > DICTIONARY_CHECK_INTERVAL:
+        dictionary = InspireProdRecordsDictionary.query.order_by(
+            InspireProdRecordsDictionary.created.desc()).first()
+        dict_id = dictionary.id if dictionary else None
+        _current_dictionary = dict_id, time.time()
+
+    return _get_dictionary(dict_id) if dict_id is not None else None
+
+
+def compress_marcxml(marcxml):
+    """Compress a MARCXML record for storage.
+
+    Uses the latest Zstandard dictionary when
+    ``MIGRATOR_MARCXML_DICTIONARY_COMPRESSION`` is set and a dictionary was
+    trained, and zlib otherwise.
+    """
+    dictionary = None
+    if zstandard and current_app.config.get('MIGRATOR_MARCXML_DICTIONARY_COMPRESSION'):
+        dictionary = _get_current_dictionary()
+
+    if dictionary is None:
+        return zlib.compress(marcxml)
+
+    compressor = zstandard.ZstdCompressor(
+        dict_data=dictionary, write_content_size=True, write_dict_id=True)
+    return compressor.compress(marcxml)
+
+
+def decompress_marcxml(data):
+    """Decompress a MARCXML record compressed by ``compress_marcxml``."""
+    if data[:len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError(
+                'MARCXML record compressed with Zstandard, which needs the '
+                '"zstd" extra: pip install Inspirehep[zstd]')
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        decompressor = zstandard.ZstdDecompressor(dict_data=_get_dictionary(dict_id))
+        return decompressor.decompress(data)
+
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        # Legacy uncompress data?
+        return data
+
 
 class InspireProdRecords(db.Model):
     __tablename__ = 'inspire_prod_records'
@@ -37,18 +139,27 @@ class InspireProdRecords(db.Model):
     recid = db.Column(db.Integer, primary_key=True, index=True)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     _marcxml = db.Column('marcxml', db.LargeBinary, nullable=False)
+    marcxml_hash = db.Column(db.String(40), nullable=True)
+    converter_version = db.Column(db.String(255), nullable=True)
     valid = db.Column(db.Boolean, default=None, nullable=True, index=True)
     errors = db.Column(db.Text(), nullable=True)
 
     @hybrid_property
     def marcxml(self):
         """marcxml column wrapper to compress/decompress on the fly."""
-        try:
-            return decompress(self._marcxml)
-        except error:
-            # Legacy uncompress data?
-            return self._marcxml
+        return decompress_marcxml(self._marcxml)
 
     @marcxml.setter
     def marcxml(self, value):
-        self._marcxml = compress(value)
+        self._marcxml = compress_marcxml(value)
+        self.marcxml_hash = get_marcxml_hash(value)
+
+
+class InspireProdRecordsDictionary(db.Model):
+    """Zstandard dictionary trained on a sample of the MARCXML records."""
+
+    __tablename__ = 'inspire_prod_records_dictionaries'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    created = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
@@ -25,10 +25,16 @@
 from __future__ import absolute_import, division, print_function
 
 import gzip
+import hashlib
 import logging
+import mmap
+import os
 import re
+import shutil
+import time
 import zlib
-from collections import Counter
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
 from itertools import chain
 
@@ -41,7 +47,7 @@ from flask_sqlalchemy import models_committed
 from jsonschema import ValidationError
 from redis import StrictRedis
 from redis_lock import Lock
-from six import text_type
+from sqlalchemy import tuple_
 
 from invenio_db import db
 from invenio_indexer.api import RecordIndexer, current_record_to_index
@@ -59,8 +65,9 @@ from inspirehep.modules.pidstore.minters import inspire_recid_minter
 from inspirehep.modules.pidstore.utils import get_pid_type_from_schema
 from inspirehep.modules.records.api import InspireRecord
 from inspirehep.modules.records.receivers import index_after_commit
+from inspirehep.utils.helpers import chunker
 
-from .models import InspireProdRecords
+from .models import InspireProdRecords, get_converter_version, get_marcxml_hash
 
 
 LOGGER = logging.getLogger(__name__)
@@ -68,47 +75,509 @@ LOGGER = logging.getLogger(__name__)
 CHUNK_SIZE = 100
 LARGE_CHUNK_SIZE = 2000
 
-split_marc = re.compile('<record.*?>.*?</record>', re.DOTALL)
+SHARD_READ_BLOCK_SIZE = 1024 * 1024
 
+RECORD_START_TAG = b'<record'
+RECORD_END_TAG = b'</record>'
 
-def chunker(iterable, chunksize=CHUNK_SIZE):
-    buf = []
-    for elem in iterable:
-        buf.append(elem)
-        if len(buf) == chunksize:
+RECORD_CONTROL_NUMBER = re.compile(br'<controlfield tag="001">\s*(\d+)\s*<')
+RECORD_TIMESTAMP = re.compile(br'<controlfield tag="005">\s*(\d{14})')
+
+CONTINUOUS_MIGRATION_QUEUE = 'legacy_records'
+CONTINUOUS_MIGRATION_STATS = 'continuous_migration:stats'
+
+
+class MigrationStats(object):
+    """Time spent and records processed in each stage of a migration."""
+
+    STAGES = ('split', 'unchanged', 'dojson', 'insert', 'index')
+
+    def __init__(self, elapsed=None, records=None):
+        self.elapsed = Counter(elapsed or {})
+        self.records = Counter(records or {})
+
+    def add(self, stage, elapsed, records=1):
+        self.elapsed[stage] += elapsed
+        self.records[stage] += records
+
+    @contextmanager
+    def measure(self, stage, records=1):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.time() - start, records)
+
+    def measure_iter(self, stage, iterable):
+        """Yield from ``iterable``, accounting the time spent in producing it."""
+        iterator = iter(iterable)
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add(stage, time.time() - start)
+            yield item
+
+    def update(self, other):
+        self.elapsed.update(other.elapsed)
+        self.records.update(other.records)
+
+    def rates(self):
+        """Return the records per second achieved in each stage."""
+        return {
+            stage: self.records[stage] / self.elapsed[stage]
+            for stage in self.STAGES if self.elapsed[stage]
+        }
+
+    def to_dict(self):
+        return {
+            'elapsed': dict(self.elapsed),
+            'records': dict(self.records),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(elapsed=data['elapsed'], records=data['records'])
+
+    def __str__(self):
+        rates = self.rates()
+        return ', '.join(
+            '{}: {} records, {:.1f} records/s'.format(
+                stage, self.records[stage], rates[stage])
+            for stage in self.STAGES if stage in rates
+        )
+
+
+class AdaptiveChunker(object):
+    """Group records in chunks sized to take a given time to migrate.
+
+    Chunks are closed when they reach either the current number of records
+    or ``max_bytes``. The number of records is adjusted after every
+    completed chunk, through ``feedback``, towards what is expected to take
+    ``target_duration`` seconds at the migration rate observed so far.
+    """
+
+    def __init__(self, target_duration, max_bytes, size=CHUNK_SIZE,
+                 min_size=1, max_size=LARGE_CHUNK_SIZE):
+        self.target_duration = target_duration
+        self.max_bytes = max_bytes
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def feedback(self, records, duration):
+        """Account for a chunk of ``records`` migrated in ``duration``."""
+        if not records or duration <= 0:
+            return
+
+        wanted = records / duration * self.target_duration
+        # Move only halfway towards the new estimate, and never more than
+        # double, so that a single outlier does not swing the size.
+        size = min((self.size + wanted) / 2, self.size * 2)
+        self.size = int(max(self.min_size, min(self.max_size, size)))
+
+    def chunks(self, iterable):
+        buf = []
+        buf_bytes = 0
+        for elem in iterable:
+            buf.append(elem)
+            buf_bytes += len(elem)
+            if len(buf) >= self.size or buf_bytes >= self.max_bytes:
+                yield buf
+                buf = []
+                buf_bytes = 0
+        if buf:
             yield buf
-            buf = []
-    if buf:
-        yield buf
 
 
-def split_blob(blob):
-    """Split the blob using <record.*?>.*?</record> as pattern."""
-    for match in split_marc.finditer(blob):
-        yield match.group()
+def get_queue_depth(queue='migrator'):
+    """Return the number of messages waiting in ``queue``, if known."""
+    try:
+        with migrate_chunk.app.connection_or_acquire() as conn:
+            return conn.default_channel.queue_declare(
+                queue=queue, passive=True).message_count
+    except Exception:
+        LOGGER.debug('Cannot get the depth of queue %s', queue, exc_info=True)
+
+
+class ChunkProducer(object):
+    """Submit ``migrate_chunk`` tasks keeping a bounded number in flight.
+
+    Before submitting a chunk when ``max_in_flight`` of them are not yet
+    completed, the producer waits for the oldest one, so that the broker
+    never holds more than that many chunks of the migration. The durations
+    reported by the completed tasks drive the ``AdaptiveChunker``.
+    """
+
+    def __init__(self, chunker, max_in_flight, skip_files=False,
+                 skip_unchanged=None, report_interval=60):
+        self.chunker = chunker
+        self.max_in_flight = max_in_flight
+        self.skip_files = skip_files
+        self.skip_unchanged = skip_unchanged
+        self.report_interval = report_interval
+
+        self.in_flight = deque()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.stats = MigrationStats()
+        self.start = self.last_report = time.time()
+
+    def migrate(self, records):
+        """Migrate all ``records``, then wait for the chunks in flight."""
+        for chunk in self.chunker.chunks(records):
+            self.submit(chunk)
+        self.join()
+
+    def submit(self, chunk):
+        while len(self.in_flight) >= self.max_in_flight:
+            self._wait_oldest()
+
+        result = migrate_chunk.delay(
+            chunk,
+            skip_files=self.skip_files,
+            skip_unchanged=self.skip_unchanged,
+        )
+        self.in_flight.append((result, len(chunk)))
+        self.submitted += len(chunk)
+
+        if time.time() - self.last_report >= self.report_interval:
+            self.report()
+
+    def join(self):
+        while self.in_flight:
+            self._wait_oldest()
+        self.report()
+
+    def _wait_oldest(self):
+        result, records = self.in_flight.popleft()
+        try:
+            chunk_stats = MigrationStats.from_dict(result.get())
+        except Exception:
+            LOGGER.exception('Migrator chunk %s failed', result.id)
+            self.failed += records
+            return
+
+        self.completed += records
+        self.stats.update(chunk_stats)
+        self.chunker.feedback(
+            records, sum(chunk_stats.elapsed.values()))
+
+    def report(self):
+        self.last_report = time.time()
+        elapsed = self.last_report - self.start
+        print(
+            'Submitted {} records, completed {} ({:.1f} records/s), '
+            'failed {}, {} chunks in flight, {} messages queued, '
+            'chunk size {}'.format(
+                self.submitted,
+                self.completed,
+                self.completed / elapsed if elapsed else 0,
+                self.failed,
+                len(self.in_flight),
+                get_queue_depth(),
+                self.chunker.size,
+            )
+        )
+
+
+def get_chunk_producer(skip_files=False, max_in_flight=None,
+                       skip_unchanged=None):
+    config = current_app.config
+    chunker = AdaptiveChunker(
+        target_duration=config['MIGRATOR_CHUNK_TARGET_DURATION'],
+        max_bytes=config['MIGRATOR_CHUNK_MAX_BYTES'],
+    )
+    return ChunkProducer(
+        chunker,
+        max_in_flight or config['MIGRATOR_MAX_IN_FLIGHT_CHUNKS'],
+        skip_files=skip_files,
+        skip_unchanged=skip_unchanged,
+    )
+
+
+def _is_record_start(data, index):
+    """Tell whether the ``<record`` found at ``index`` opens a record tag.
+
+    Returns ``None`` when the following byte is not available yet.
+    """
+    follower = data[index + len(RECORD_START_TAG):index + len(RECORD_START_TAG) + 1]
+    if not follower:
+        return None
+    return follower in (b'>', b' ', b'\t', b'\r', b'\n')
+
 
+def _find_record_start(data, start=0):
+    """Return the index of the first complete ``<record`` tag, or -1."""
+    index = data.find(RECORD_START_TAG, start)
+    while index >= 0:
+        is_start = _is_record_start(data, index)
+        if is_start is None:
+            return -1
+        if is_start:
+            return index
+        index = data.find(RECORD_START_TAG, index + 1)
+    return -1
+
+
+def _get_slicer(data, zero_copy=False):
+    """Return a function extracting ``data[head:tail]``.
+
+    With ``zero_copy`` the slices are views on ``data`` instead of copies,
+    which stay valid only as long as ``data`` does.
+    """
+    if not zero_copy:
+        return lambda head, tail: data[head:tail]
+
+    try:
+        view = memoryview(data)
+    except TypeError:
+        # Python 2 ``mmap`` objects only support the old buffer protocol.
+        return lambda head, tail: buffer(data, head, tail - head)  # noqa: F821
+
+    return lambda head, tail: view[head:tail]
+
+
+def iter_record_spans(data, start=0, end=None):
+    """Yield the boundaries of the MARCXML records in a buffer.
+
+    The raw bytes are scanned for the ``<record`` and ``</record>`` tags,
+    without decoding them or running a regular expression over them.
+
+    Args:
+        data: a ``bytes`` or ``mmap`` object containing MARCXML.
+        start(int): offset from which to look for records.
+        end(int): if passed, records starting at or after this offset are
+            not considered.
+
+    Yields:
+        tuple: the ``(head, tail)`` offsets of each record, such that
+        ``data[head:tail]`` is the record.
+    """
+    head = _find_record_start(data, start)
+    while head >= 0 and (end is None or head < end):
+        tail = data.find(RECORD_END_TAG, head)
+        if tail < 0:
+            LOGGER.warning('Truncated record at offset %d', head)
+            return
+        tail += len(RECORD_END_TAG)
+        yield head, tail
+        head = _find_record_start(data, tail)
+
+
+def split_blob(blob, zero_copy=False):
+    """Split a MARCXML blob in records.
+
+    Args:
+        blob(bytes): the MARCXML, encoded in UTF-8.
+        zero_copy(bool): yield ``memoryview`` slices of ``blob`` instead of
+            copies.
+    """
+    slicer = _get_slicer(blob, zero_copy=zero_copy)
+    for head, tail in iter_record_spans(blob):
+        yield slicer(head, tail)
 
-def split_stream(stream):
-    """Split the stream using <record.*?>.*?</record> as pattern."""
-    buf = []
-    for row in stream:
-        row = text_type(row, 'utf8')
-        index = row.rfind('</record>')
-        if index >= 0:
-            buf.append(row[:index + 9])
-            for blob in split_blob(''.join(buf)):
-                yield blob.encode('utf8')
-            buf = [row[index + 9:]]
-        else:
-            buf.append(row)
+
+def _split_blocks(blocks, offset=0, end=None):
+    """Split MARCXML in records as it is produced in blocks of bytes.
+
+    Only the record being currently assembled is kept in memory.
+
+    Args:
+        blocks(iterable): blocks of bytes.
+        offset(int): offset of the first block in the whole input.
+        end(int): if passed, stop at the first record starting at or after
+            this offset.
+
+    Yields:
+        tuple: the record as bytes and the offset right after its end.
+    """
+    buf = b''
+    pos = 0
+    # Where to resume looking for the closing tag of the current record.
+    scanned = 0
+
+    for block in chain(blocks, [None]):
+        if block is not None:
+            buf = buf[pos:] + block
+            offset += pos
+            scanned = max(scanned - pos, 0)
+            pos = 0
+
+        while True:
+            head = _find_record_start(buf, pos)
+            if head < 0:
+                # Keep the tail, as it might contain the beginning of a tag.
+                pos = max(len(buf) - len(RECORD_START_TAG), pos)
+                scanned = pos
+                if end is not None and offset + pos >= end:
+                    return
+                break
+            if end is not None and offset + head >= end:
+                return
+
+            tail = buf.find(RECORD_END_TAG, max(head, scanned))
+            if tail < 0:
+                pos = head
+                scanned = max(len(buf) - len(RECORD_END_TAG), head)
+                break
+
+            pos = tail + len(RECORD_END_TAG)
+            scanned = pos
+            yield buf[head:pos], offset + pos
+
+    if _find_record_start(buf, pos) >= 0:
+        LOGGER.warning('Truncated record at offset %d', offset + pos)
+
+
+def _read_blocks(fd, block_size=SHARD_READ_BLOCK_SIZE):
+    return iter(lambda: fd.read(block_size), b'')
+
+
+def split_stream(stream, block_size=SHARD_READ_BLOCK_SIZE):
+    """Split a file-like object containing MARCXML in records.
+
+    Works on the raw bytes read from ``stream``, so it also supports
+    streams that are not seekable, such as gzipped files.
+    """
+    for record, _ in _split_blocks(_read_blocks(stream, block_size)):
+        yield record
+
+
+def split_dump(path, start=0, end=None, zero_copy=False):
+    """Split an uncompressed MARCXML dump in records through ``mmap``.
+
+    The file is never read in userspace buffers: records are found by
+    scanning the mapping, and only copied when yielded.
+
+    Args:
+        path(str): path of the dump.
+        start(int): offset from which to look for records.
+        end(int): if passed, records starting at or after this offset are
+            not considered.
+        zero_copy(bool): yield views on the mapping instead of copies.
+            They become invalid when the iteration is over.
+
+    Yields:
+        tuple: the record and the offset right after its end.
+    """
+    with open(path, 'rb') as fd:
+        if not os.fstat(fd.fileno()).st_size:
+            return
+        mapping = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            slicer = _get_slicer(mapping, zero_copy=zero_copy)
+            for head, tail in iter_record_spans(mapping, start, end):
+                yield slicer(head, tail), tail
+        finally:
+            try:
+                mapping.close()
+            except BufferError:
+                # Some views are still referenced by the caller, the mapping
+                # will be closed when they are garbage collected.
+                pass
+
+
+def get_shard_boundaries(path, shards):
+    """Split a MARCXML dump in byte ranges that start at record boundaries.
+
+    Args:
+        path(str): path of the uncompressed dump.
+        shards(int): desired number of shards.
+
+    Returns:
+        list(tuple): the ``(start, end)`` offsets of every shard. Fewer than
+        ``shards`` ranges might be returned for small files.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+
+    for i in range(1, shards):
+        guess = max(size * i // shards, boundaries[-1])
+        first_record = next(split_dump(path, guess), None)
+        if first_record is None:
+            break
+        blob, offset = first_record
+        record_start = offset - len(blob)
+        if record_start > boundaries[-1]:
+            boundaries.append(record_start)
+
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _get_redis():
+    return StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+
+
+def get_checkpoints_key(path):
+    """Return the Redis key holding the shard checkpoints of a dump.
+
+    The key depends on the size and modification time of the file, so that
+    a new dump at the same path does not resume from stale checkpoints.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1('{}:{}:{}'.format(
+        os.path.abspath(path), stat.st_size, int(stat.st_mtime)).encode('utf8'))
+    return 'migrator:checkpoints:{}'.format(digest.hexdigest())
+
+
+def get_shards_progress(path):
+    """Return the checkpoint of every shard of a dump.
+
+    Returns:
+        dict: mapping ``(start, end)`` shard boundaries to the offset up to
+        which the shard has been migrated.
+    """
+    if path.endswith('.gz'):
+        path = path[:-len('.gz')]
+    if not os.path.exists(path):
+        return {}
+
+    checkpoints = _get_redis().hgetall(get_checkpoints_key(path))
+
+    result = {}
+    for shard, offset in checkpoints.items():
+        start, end = shard.decode('utf8').split('-')
+        result[(int(start), int(end))] = int(offset)
+
+    return result
+
+
+def decompress_dump(source):
+    """Return the path of an uncompressed copy of ``source``.
+
+    Shards are addressed by byte offsets, so they need a seekable file:
+    gzipped dumps are decompressed once next to the original.
+    """
+    if not source.endswith('.gz'):
+        return source
+
+    destination = source[:-len('.gz')]
+    if not os.path.exists(destination):
+        partial = '{}.partial'.format(destination)
+        with gzip.open(source, 'rb') as src, open(partial, 'wb') as dst:
+            shutil.copyfileobj(src, dst, SHARD_READ_BLOCK_SIZE)
+        os.rename(partial, destination)
+
+    return destination
 
 
 @shared_task(ignore_result=True, queue='migrator')
-def remigrate_records(only_broken=True, skip_files=None):
+def remigrate_records(only_broken=True, skip_files=None, max_in_flight=None):
     """Remigrate records.
 
     Directly migrates the records (declared as broken), e.g. if the dojson
-    conversion script have been corrected.
+    conversion script have been corrected. The MARCXML comes from the
+    records already migrated, so it is never skipped as unchanged.
+
+    It waits for the chunks it queues on the ``migrator`` queue, so it must
+    not be run by a worker of that queue, which could end up waiting for
+    itself: ``inspirehep migrator populate`` runs it in its own process.
     """
     if skip_files is None:
         skip_files = current_app.config.get(
@@ -120,15 +589,19 @@ def remigrate_records(only_broken=True, skip_files=None):
     if only_broken:
         query = query.filter_by(valid=False)
 
-    for i, chunk in enumerate(chunker(query.yield_per(CHUNK_SIZE))):
-        records = [record.marcxml for record in chunk]
-        LOGGER.info("Processed {} records".format(i * CHUNK_SIZE))
-        migrate_chunk.delay(records, skip_files=skip_files)
+    producer = get_chunk_producer(skip_files, max_in_flight, skip_unchanged=False)
+    producer.migrate(record.marcxml for record in query.yield_per(CHUNK_SIZE))
 
 
 @shared_task(ignore_result=True, queue='migrator')
-def migrate(source, wait_for_results=False, skip_files=None):
-    """Main migration function."""
+def migrate(source, wait_for_results=False, skip_files=None,
+            max_in_flight=None, skip_unchanged=None):
+    """Main migration function.
+
+    At most ``max_in_flight`` chunks (by default
+    ``MIGRATOR_MAX_IN_FLIGHT_CHUNKS``) are queued at any time: the dump is
+    read only as fast as the workers migrate it.
+    """
     if skip_files is None:
         skip_files = current_app.config.get(
              'RECORDS_MIGRATION_SKIP_FILES',
@@ -136,60 +609,228 @@ def migrate(source, wait_for_results=False, skip_files=None):
         )
 
     if source.endswith('.gz'):
-        fd = gzip.open(source)
+        fd = gzip.open(source, 'rb')
     else:
-        fd = open(source)
+        fd = open(source, 'rb')
+
+    producer = get_chunk_producer(skip_files, max_in_flight, skip_unchanged)
+    with fd:
+        for chunk in producer.chunker.chunks(split_stream(fd)):
+            producer.submit(chunk)
 
     if wait_for_results:
-        # if the wait_for_results is true we enable returning results from migrate_chunk task
-        # so that we could use them to synchronize migrate task (which in that case waits for
-        # the migrate_chunk tasks to complete before it finishes).
-        tasks = []
-        migrate_chunk.ignore_result = False
-
-    for i, chunk in enumerate(chunker(split_stream(fd), CHUNK_SIZE)):
-        print("Processed {} records".format(i * CHUNK_SIZE))
-        if wait_for_results:
-            tasks.append(migrate_chunk.s(chunk, skip_files=skip_files))
-        else:
-            migrate_chunk.delay(chunk, skip_files=skip_files)
+        producer.join()
+        print('All migration tasks have been completed: {}'.format(
+            producer.stats))
+
+
+@shared_task(ignore_result=True, queue='migrator')
+def migrate_sharded(source, shards, wait_for_results=False, skip_files=None,
+                    reset_checkpoints=False, skip_unchanged=None):
+    """Migrate a dump in parallel, splitting it in independent shards.
+
+    Each shard is a byte range of the (uncompressed) dump starting at a
+    record boundary, and is migrated by a separate ``migrate_shard`` task.
+    Shards record how far they got, so running this again on the same dump
+    only migrates what was left over by a previous run.
+    """
+    if skip_files is None:
+        skip_files = current_app.config.get(
+             'RECORDS_MIGRATION_SKIP_FILES',
+             False,
+        )
+
+    source = decompress_dump(source)
+    if reset_checkpoints:
+        _get_redis().delete(get_checkpoints_key(source))
+
+    boundaries = get_shard_boundaries(source, shards)
+    print('Migrating {} in {} shards'.format(source, len(boundaries)))
+
+    job = group(
+        migrate_shard.s(
+            source,
+            start,
+            end,
+            skip_files=skip_files,
+            skip_unchanged=skip_unchanged,
+        )
+        for start, end in boundaries
+    )
+    result = job.apply_async()
 
     if wait_for_results:
-        job = group(tasks)
-        result = job.apply_async()
-        result.join()
-        migrate_chunk.ignore_result = True
-        print('All migration tasks have been completed.')
+        stats = MigrationStats()
+        for shard_stats in result.join():
+            stats.update(MigrationStats.from_dict(shard_stats))
+        print('All migration shards have been completed: {}'.format(stats))
+
+
+@shared_task(ignore_result=False, acks_late=True, queue='migrator')
+def migrate_shard(source, start, end, skip_files=False, skip_unchanged=None):
+    """Migrate the records of ``source`` that start in ``[start, end)``.
+
+    The shard is migrated one chunk at a time, and after every chunk the
+    offset reached is stored as a checkpoint, from which the shard resumes
+    if the task is run again.
+
+    Returns:
+        dict: the ``MigrationStats`` of the shard.
+    """
+    redis = _get_redis()
+    checkpoints_key = get_checkpoints_key(source)
+    shard = '{}-{}'.format(start, end)
+
+    offset = int(redis.hget(checkpoints_key, shard) or start)
+    stats = MigrationStats()
+
+    if offset < end:
+        LOGGER.info('Migrating shard %s of %s from offset %d', shard, source, offset)
+        records = stats.measure_iter('split', split_dump(source, offset, end))
+        for chunk in chunker(records, CHUNK_SIZE):
+            _migrate_chunk(
+                [raw_record for raw_record, _ in chunk],
+                skip_files=skip_files,
+                stats=stats,
+                skip_unchanged=skip_unchanged,
+            )
+            redis.hset(checkpoints_key, shard, chunk[-1][1])
+        redis.hset(checkpoints_key, shard, end)
+
+    LOGGER.info('Migrated shard %s of %s: %s', shard, source, stats)
+
+    return stats.to_dict()
 
 
 @shared_task(ignore_result=True)
-def continuous_migration(skip_files=None):
-    """Task to continuously migrate what is pushed up by Legacy."""
+def continuous_migration(skip_files=None, batch_size=None):
+    """Task to continuously migrate what is pushed up by Legacy.
+
+    The records are consumed from the ``legacy_records`` list in batches of
+    ``MIGRATOR_CONTINUOUS_BATCH_SIZE``, each read in a single round trip and
+    migrated by ``migrate_continuous_batch``. A batch is removed from the
+    list only once it has been committed, so the records of a batch that
+    was interrupted are migrated again by the next run.
+
+    After every batch, the lag of the migration is stored in
+    ``continuous_migration:stats``, see ``get_continuous_migration_stats``.
+    """
     if skip_files is None:
         skip_files = current_app.config.get(
              'RECORDS_MIGRATION_SKIP_FILES',
              False,
         )
-    redis_url = current_app.config.get('CACHE_REDIS_URL')
-    r = StrictRedis.from_url(redis_url)
+    if batch_size is None:
+        batch_size = current_app.config['MIGRATOR_CONTINUOUS_BATCH_SIZE']
+
+    r = _get_redis()
     lock = Lock(r, 'continuous_migration', expire=120, auto_renewal=True)
     if lock.acquire(blocking=False):
         try:
-            while r.llen('legacy_records'):
-                raw_record = r.lrange('legacy_records', 0, 0)
-                if raw_record:
-                    migrate_and_insert_record(
-                        zlib.decompress(raw_record[0]),
-                        skip_files=skip_files,
-                    )
-                    db.session.commit()
-                r.lpop('legacy_records')
+            while True:
+                pipeline = r.pipeline()
+                pipeline.llen(CONTINUOUS_MIGRATION_QUEUE)
+                pipeline.lrange(CONTINUOUS_MIGRATION_QUEUE, 0, batch_size - 1)
+                queue_length, compressed_records = pipeline.execute()
+
+                raw_records = [zlib.decompress(raw) for raw in compressed_records]
+                lag = {
+                    'queue_length': queue_length,
+                    'oldest_record_age': (
+                        get_record_age(raw_records[0]) if raw_records else 0),
+                    'updated': time.time(),
+                }
+                if not raw_records:
+                    r.hmset(CONTINUOUS_MIGRATION_STATS, lag)
+                    break
+
+                start = time.time()
+                stats = migrate_continuous_batch(raw_records, skip_files=skip_files)
+                lag['batch_size'] = len(raw_records)
+                lag['batch_duration'] = time.time() - start
+                LOGGER.info(
+                    'Continuous migration: %d records in the queue, '
+                    'migrated a batch of %d: %s',
+                    queue_length, len(raw_records), stats)
+
+                pipeline = r.pipeline()
+                pipeline.ltrim(CONTINUOUS_MIGRATION_QUEUE, len(raw_records), -1)
+                pipeline.hmset(CONTINUOUS_MIGRATION_STATS, lag)
+                pipeline.execute()
         finally:
             lock.release()
     else:
         LOGGER.info("Continuous_migration already executed. Skipping.")
 
 
+def migrate_continuous_batch(raw_records, skip_files=False):
+    """Migrate a batch of records pushed up by Legacy.
+
+    Only the latest version of every record is migrated. The batch is
+    migrated by this process, one chunk per transaction, and the records
+    are indexed by ``index_after_commit`` like any other change, so that
+    their citation counts and the caches depending on them are updated.
+
+    Returns:
+        MigrationStats: the statistics of the batch.
+    """
+    stats = MigrationStats()
+    for chunk in chunker(get_latest_versions(raw_records), CHUNK_SIZE):
+        _migrate_chunk(chunk, skip_files=skip_files, stats=stats, index_on_commit=True)
+
+    return stats
+
+
+def get_latest_versions(raw_records):
+    """Return the last occurrence of every record, in the order of the last ones.
+
+    Records are identified by their control number; the ones without it
+    are all kept.
+    """
+    latest = OrderedDict()
+    for index, raw_record in enumerate(raw_records):
+        match = RECORD_CONTROL_NUMBER.search(raw_record)
+        key = match.group(1) if match else index
+        latest.pop(key, None)
+        latest[key] = raw_record
+
+    return list(latest.values())
+
+
+def get_record_age(raw_record, now=None):
+    """Return the seconds elapsed since the last modification of a record.
+
+    The modification date is read from the ``005`` field of the MARCXML, as
+    written by Legacy. Returns ``None`` for records without it.
+    """
+    match = RECORD_TIMESTAMP.search(raw_record)
+    if not match:
+        return None
+
+    modified = datetime.strptime(match.group(1).decode('ascii'), '%Y%m%d%H%M%S')
+    return ((now or datetime.now()) - modified).total_seconds()
+
+
+def get_continuous_migration_stats():
+    """Return the lag of the continuous migration, as of its last batch.
+
+    Returns:
+        dict: with the ``queue_length`` and the ``oldest_record_age`` in
+        seconds when the last batch was read, the ``batch_size`` and
+        ``batch_duration`` of that batch, and the time it was ``updated``.
+    """
+    stats = _get_redis().hgetall(CONTINUOUS_MIGRATION_STATS)
+
+    result = {}
+    for key, value in stats.items():
+        try:
+            result[key.decode('utf8')] = float(value)
+        except ValueError:
+            result[key.decode('utf8')] = None
+
+    return result
+
+
 def create_index_op(record):
     index, doc_type = current_record_to_index(record)
 
@@ -210,34 +851,265 @@ def create_index_op(record):
     acks_late=True,
     queue='migrator',
 )
-def migrate_chunk(chunk, skip_files=False):
-    models_committed.disconnect(index_after_commit)
+def migrate_chunk(chunk, skip_files=False, skip_unchanged=None):
+    """Migrate a list of MARCXML records.
+
+    Returns:
+        dict: the ``MigrationStats`` of the chunk.
+    """
+    return _migrate_chunk(
+        chunk,
+        skip_files=skip_files,
+        skip_unchanged=skip_unchanged,
+    ).to_dict()
+
+
+def _migrate_chunk(chunk, skip_files=False, stats=None, skip_unchanged=None,
+                   index_on_commit=False):
+    """Migrate a list of MARCXML records in a single transaction.
+
+    The records that are already in the DB are looked up with one query
+    for their PIDs and one for their metadata, and all records are written
+    inside a single savepoint. Only if that fails the chunk is bisected,
+    so that just the broken records end up in a savepoint of their own.
+
+    Unless ``skip_unchanged`` is false (by default it is
+    ``MIGRATOR_SKIP_UNCHANGED_RECORDS``), the records that were migrated
+    successfully from the same MARCXML are skipped.
+
+    With ``index_on_commit``, the records are indexed by
+    ``index_after_commit`` when the transaction is committed, which keeps
+    their citation counts up to date. Otherwise they are bulk indexed right
+    after it without citation counts, as in a full migration, which is
+    followed by ``add_citation_counts``.
+    """
+    if stats is None:
+        stats = MigrationStats()
+    if skip_unchanged is None:
+        skip_unchanged = current_app.config.get(
+            'MIGRATOR_SKIP_UNCHANGED_RECORDS', False)
+
+    if skip_unchanged:
+        with stats.measure('unchanged', records=len(chunk)):
+            chunk = get_changed_records(chunk)
+        if not chunk:
+            return stats
+
+    if not index_on_commit:
+        models_committed.disconnect(index_after_commit)
 
     index_queue = []
 
     try:
+        converter_version = get_converter_version()
+        prod_records = []
+        json_records = []
         for raw_record in chunk:
-            with db.session.begin_nested():
-                record = migrate_and_insert_record(
-                    raw_record,
-                    skip_files=skip_files,
-                )
-                if record:
-                    index_queue.append(create_index_op(record))
-        db.session.commit()
+            try:
+                with stats.measure('dojson'):
+                    json_record = _marcxml2json(raw_record)
+            except Exception:
+                LOGGER.exception('Migrator DoJSON Error')
+                continue
+
+            prod_record = InspireProdRecords(recid=json_record['control_number'])
+            prod_record.marcxml = raw_record
+            prod_record.converter_version = converter_version
+            prod_records.append(prod_record)
+            json_records.append(json_record)
+
+        with stats.measure('insert', records=len(json_records)):
+            existing_records = get_existing_records(json_records)
+            records, errors = _insert_or_replace_batch(
+                json_records,
+                existing_records,
+                skip_files=skip_files,
+            )
+
+            for prod_record in prod_records:
+                error = errors.get(prod_record.recid)
+                if error:
+                    # Invalid record, will not get indexed.
+                    prod_record.valid = False
+                    prod_record.errors = _format_error(error, prod_record.recid)
+                else:
+                    prod_record.valid = True
+            merge_prod_records(prod_records)
+
+            if not index_on_commit:
+                index_queue.extend(create_index_op(record) for record in records)
+            db.session.commit()
     finally:
         db.session.close()
 
+    if index_on_commit:
+        return stats
+
     req_timeout = current_app.config['INDEXER_BULK_REQUEST_TIMEOUT']
-    es_bulk(
-        es,
-        index_queue,
-        stats_only=True,
-        request_timeout=req_timeout,
-    )
+    with stats.measure('index', records=len(index_queue)):
+        es_bulk(
+            es,
+            index_queue,
+            stats_only=True,
+            request_timeout=req_timeout,
+        )
 
     models_committed.connect(index_after_commit)
 
+    return stats
+
+
+def _get_record_key(json):
+    return get_pid_type_from_schema(json['$schema']), str(json['control_number'])
+
+
+def get_existing_records(json_records):
+    """Load the records that are going to be replaced by ``json_records``.
+
+    Costs one query to resolve all the control numbers to PIDs, and one to
+    load the metadata of all the records found.
+
+    Returns:
+        dict: mapping ``(pid_type, pid_value)`` to the ``InspireRecord``
+        currently identified by that PID.
+    """
+    keys = set(_get_record_key(json) for json in json_records)
+    if not keys:
+        return {}
+
+    pids = PersistentIdentifier.query.filter(
+        tuple_(
+            PersistentIdentifier.pid_type,
+            PersistentIdentifier.pid_value,
+        ).in_(list(keys))
+    ).all()
+    uuid_to_key = {pid.object_uuid: (pid.pid_type, pid.pid_value) for pid in pids}
+
+    records = InspireRecord.get_records(list(uuid_to_key))
+    result = {uuid_to_key[record.id]: record for record in records}
+
+    # A PID whose record could not be loaded makes the insertion fail as
+    # it would have done by looking it up individually.
+    for uuid, key in uuid_to_key.items():
+        if key not in result:
+            result[key] = uuid
+
+    return result
+
+
+def _insert_or_replace_batch(json_records, existing_records, skip_files=False):
+    """Insert or replace records, isolating the failures in savepoints.
+
+    All records are first written inside one savepoint. If any of them
+    fails, the savepoint is rolled back and both halves of the batch are
+    retried separately, down to single records.
+
+    Returns:
+        tuple: the list of records written and a dict mapping the control
+        numbers of the failed records to the exception raised.
+    """
+    if not json_records:
+        return [], {}
+
+    records = []
+    batch_existing_records = dict(existing_records)
+
+    try:
+        with db.session.begin_nested():
+            for json in json_records:
+                key = _get_record_key(json)
+                record = _insert_or_replace(
+                    json,
+                    batch_existing_records.get(key),
+                    skip_files=skip_files,
+                )
+                batch_existing_records[key] = record
+                records.append(record)
+    except Exception as e:
+        if len(json_records) == 1:
+            _log_insert_error(e, json_records[0]['control_number'])
+            return [], {json_records[0]['control_number']: e}
+
+        half = len(json_records) // 2
+        first_records, first_errors = _insert_or_replace_batch(
+            json_records[:half], existing_records, skip_files=skip_files)
+        existing_records.update(
+            (_get_record_key(record), record) for record in first_records)
+        second_records, second_errors = _insert_or_replace_batch(
+            json_records[half:], existing_records, skip_files=skip_files)
+
+        first_errors.update(second_errors)
+        return first_records + second_records, first_errors
+
+    existing_records.update(batch_existing_records)
+    return records, {}
+
+
+def get_changed_records(raw_records):
+    """Return the MARCXML records that differ from the ones last migrated.
+
+    A record is unchanged if it was migrated successfully from MARCXML with
+    the same hash, by the same versions of the converter packages. All
+    hashes are looked up with a single query.
+    """
+    recids = {}
+    for raw_record in raw_records:
+        match = RECORD_CONTROL_NUMBER.search(raw_record)
+        if match:
+            recids[raw_record] = int(match.group(1))
+    if not recids:
+        return list(raw_records)
+
+    hashes = dict(
+        InspireProdRecords.query.filter(
+            InspireProdRecords.recid.in_(set(recids.values())),
+            InspireProdRecords.valid == True,  # noqa: ignore=E712
+            InspireProdRecords.converter_version == get_converter_version(),
+        ).with_entities(
+            InspireProdRecords.recid,
+            InspireProdRecords.marcxml_hash,
+        )
+    )
+
+    return [
+        raw_record for raw_record in raw_records
+        if raw_record not in recids or
+        hashes.get(recids[raw_record]) != get_marcxml_hash(raw_record)
+    ]
+
+
+def merge_prod_records(prod_records):
+    """Merge ``InspireProdRecords`` in the session with a single query.
+
+    Equivalent to calling ``db.session.merge`` on each of them, without
+    loading the rows one at a time. The MARCXML of the rows is rewritten
+    only if its hash changed.
+    """
+    recids = [prod_record.recid for prod_record in prod_records]
+    if not recids:
+        return
+
+    current = {
+        prod_record.recid: prod_record
+        for prod_record in InspireProdRecords.query.filter(
+            InspireProdRecords.recid.in_(recids))
+    }
+
+    for prod_record in prod_records:
+        current_prod_record = current.get(prod_record.recid)
+        if current_prod_record is None:
+            db.session.add(prod_record)
+            current[prod_record.recid] = prod_record
+            continue
+
+        if current_prod_record.marcxml_hash != prod_record.marcxml_hash:
+            current_prod_record._marcxml = prod_record._marcxml
+            current_prod_record.marcxml_hash = prod_record.marcxml_hash
+        current_prod_record.converter_version = prod_record.converter_version
+        current_prod_record.valid = prod_record.valid
+        if prod_record.errors is not None:
+            current_prod_record.errors = prod_record.errors
+
 
 @shared_task()
 def add_citation_counts(chunk_size=500, request_timeout=120):
@@ -270,10 +1142,19 @@ def add_citation_counts(chunk_size=500, request_timeout=120):
             es,
             query={
                 '_source': 'references.recid',
-                'filter': {
-                    'exists': {
-                        'field': 'references.recid'
-                    }
+                'query': {
+                    'bool': {
+                        'filter': {
+                            'exists': {
+                                'field': 'references.recid'
+                            }
+                        },
+                        'must_not': {
+                            'term': {
+                                'deleted': True
+                            }
+                        },
+                    },
                 },
                 'size': LARGE_CHUNK_SIZE
             },
@@ -314,12 +1195,30 @@ def record_insert_or_replace(json, skip_files=False):
     try:
         pid = PersistentIdentifier.get(pid_type, control_number)
         record = InspireRecord.get_record(pid.object_uuid)
+    except PIDDoesNotExistError:
+        record = None
+
+    return _insert_or_replace(json, record, skip_files=skip_files)
+
+
+def _insert_or_replace(json, record, skip_files=False):
+    """Replace the content of ``record`` with ``json``, or create it.
+
+    Args:
+        json(dict): the new content of the record.
+        record: the ``InspireRecord`` to replace, its UUID if it still has
+            to be loaded, or ``None`` if it has to be created.
+        skip_files(bool): whether to skip the retrieval of files.
+    """
+    if record is not None:
+        if not isinstance(record, InspireRecord):
+            record = InspireRecord.get_record(record)
         record.clear()
         record.update(json, skip_files=skip_files)
         if json.get('legacy_creation_date'):
             record.model.created = datetime.strptime(json['legacy_creation_date'], '%Y-%m-%d')
         record.commit()
-    except PIDDoesNotExistError:
+    else:
         record = InspireRecord.create(json, id_=None, skip_files=skip_files)
         if json.get('legacy_creation_date'):
             record.model.created = datetime.strptime(json['legacy_creation_date'], '%Y-%m-%d')
@@ -333,17 +1232,42 @@ def record_insert_or_replace(json, skip_files=False):
     return record
 
 
-def migrate_and_insert_record(raw_record, skip_files=False):
+def _marcxml2json(raw_record):
+    json_record = marcxml2record(raw_record)
+    if '$schema' in json_record:
+        json_record['$schema'] = url_for(
+            'invenio_jsonschemas.get_schema',
+            schema_path='records/{0}'.format(json_record['$schema']),
+        )
+
+    return json_record
+
+
+def _log_insert_error(error, recid):
+    if isinstance(error, ValidationError):
+        # Aggregate logs by part of schema being validated.
+        pattern = u'Migrator Validator Error: {}, Value: %r, Record: %r'
+        LOGGER.error(pattern.format('.'.join(error.schema_path)), error.instance, recid)
+    else:
+        # Receivers can always cause exceptions and we could dump the entire
+        # chunk because of a single broken record.
+        LOGGER.exception('Migrator Record Insert Error')
+
+
+def _format_error(error, recid):
+    return u'{0}: Record {1}: {2}'.format(type(error), recid, error)
+
+
+def migrate_and_insert_record(raw_record, skip_files=False, stats=None):
     """Convert a marc21 record to JSON and insert it into the DB."""
+    if stats is None:
+        stats = MigrationStats()
+
     error = None
 
     try:
-        json_record = marcxml2record(raw_record)
-        if '$schema' in json_record:
-            json_record['$schema'] = url_for(
-                'invenio_jsonschemas.get_schema',
-                schema_path='records/{0}'.format(json_record['$schema']),
-            )
+        with stats.measure('dojson'):
+            json_record = _marcxml2json(raw_record)
     except Exception as e:
         LOGGER.exception('Migrator DoJSON Error')
         error = e
@@ -351,26 +1275,20 @@ def migrate_and_insert_record(raw_record, skip_files=False):
         recid = json_record['control_number']
         prod_record = InspireProdRecords(recid=recid)
         prod_record.marcxml = raw_record
+        prod_record.converter_version = get_converter_version()
 
     try:
         if not error:
-            record = record_insert_or_replace(json_record, skip_files=skip_files)
-    except ValidationError as e:
-        # Aggregate logs by part of schema being validated.
-        pattern = u'Migrator Validator Error: {}, Value: %r, Record: %r'
-        LOGGER.error(pattern.format('.'.join(e.schema_path)), e.instance, recid)
-        error = e
+            with stats.measure('insert'):
+                record = record_insert_or_replace(json_record, skip_files=skip_files)
     except Exception as e:
-        # Receivers can always cause exceptions and we could dump the entire
-        # chunk because of a single broken record.
-        LOGGER.exception('Migrator Record Insert Error')
+        _log_insert_error(e, recid)
         error = e
 
     if error:
         # Invalid record, will not get indexed.
-        error_str = u'{0}: Record {1}: {2}'.format(type(error), recid, e)
         prod_record.valid = False
-        prod_record.errors = error_str
+        prod_record.errors = _format_error(error, recid)
         db.session.merge(prod_record)
         return None
     else:
@@ -25,7 +25,7 @@
 from __future__ import absolute_import, division, print_function
 
 from .providers import InspireRecordIdProvider
-from .utils import get_pid_type_from_schema
+from .utils import get_pid_type_from_schema, invalidate_pids
 
 
 def inspire_recid_minter(record_uuid, data):
@@ -40,4 +40,5 @@ def inspire_recid_minter(record_uuid, data):
         args['pid_value'] = data['control_number']
     provider = InspireRecordIdProvider.create(**args)
     data['control_number'] = provider.pid.pid_value
+    invalidate_pids([provider.pid])
     return provider.pid
@@ -24,17 +24,43 @@
 
 from __future__ import absolute_import, division, print_function
 
+from uuid import UUID
+
 from flask import current_app
-from six import iteritems
+from six import iteritems, text_type
 from six.moves.urllib.parse import urlsplit
+from sqlalchemy import event
+
+from invenio_db import db
+from invenio_pidstore.errors import PIDDoesNotExistError
+from invenio_pidstore.models import PersistentIdentifier
+
+from inspirehep.utils.cache import TwoLevelCache
+
+PIDS_CACHE_SIZE = 100000
+PIDS_CACHE_LOCAL_TIMEOUT = 60
+
+# Key of the session info holding the PIDs to invalidate on commit.
+INVALIDATED_PIDS = 'inspirehep_invalidated_pids'
+
+# The last endpoints configuration seen, and the map built from it.
+_pid_type_endpoint_map = (None, None)
 
 
 def _get_pid_type_endpoint_map():
+    global _pid_type_endpoint_map
+
+    endpoints, pid_type_endpoint_map = _pid_type_endpoint_map
+    if endpoints is current_app.config['RECORDS_REST_ENDPOINTS']:
+        return pid_type_endpoint_map
+
+    endpoints = current_app.config['RECORDS_REST_ENDPOINTS']
     pid_type_endpoint_map = {}
-    for key, value in iteritems(current_app.config['RECORDS_REST_ENDPOINTS']):
+    for key, value in iteritems(endpoints):
         if value.get('default_endpoint_prefix'):
             pid_type_endpoint_map[value['pid_type']] = key
 
+    _pid_type_endpoint_map = endpoints, pid_type_endpoint_map
     return pid_type_endpoint_map
 
 
@@ -68,3 +94,128 @@ def get_pid_type_from_schema(schema):
         return 'lit'
 
     return get_pid_type_from_endpoint(schema_name)
+
+
+def _get_pids(keys):
+    pid_types = set(pid_type for pid_type, _ in keys)
+    pid_values = set(pid_value for _, pid_value in keys)
+    pids = PersistentIdentifier.query.filter(
+        PersistentIdentifier.pid_type.in_(pid_types),
+        PersistentIdentifier.pid_value.in_(pid_values),
+        PersistentIdentifier.object_uuid.isnot(None),
+    ).with_entities(
+        PersistentIdentifier.pid_type,
+        PersistentIdentifier.pid_value,
+        PersistentIdentifier.object_uuid,
+        PersistentIdentifier.status,
+    )
+
+    keys = set(keys)
+    return dict(
+        ((pid_type, pid_value), (object_uuid, status))
+        for pid_type, pid_value, object_uuid, status in pids
+        if (pid_type, pid_value) in keys
+    )
+
+
+def _get_pids_by_uuid(uuids):
+    pids = PersistentIdentifier.query.filter(
+        PersistentIdentifier.object_uuid.in_(uuids),
+    ).with_entities(
+        PersistentIdentifier.object_uuid,
+        PersistentIdentifier.pid_type,
+        PersistentIdentifier.pid_value,
+    )
+
+    result = {}
+    ambiguous = set()
+    for object_uuid, pid_type, pid_value in pids:
+        if object_uuid in result:
+            ambiguous.add(object_uuid)
+        result[object_uuid] = pid_type, pid_value
+
+    # Only records with a single PID can be identified by their UUID.
+    return dict(
+        (uuid, pid) for uuid, pid in result.items() if uuid not in ambiguous)
+
+
+PIDS_CACHE = TwoLevelCache(
+    'pid',
+    _get_pids,
+    PIDS_CACHE_SIZE,
+    shared_config='PIDSTORE_SHARED_CACHE',
+    shared_timeout_config='PIDSTORE_SHARED_CACHE_TIMEOUT',
+    local_timeout=PIDS_CACHE_LOCAL_TIMEOUT,
+)
+PIDS_BY_UUID_CACHE = TwoLevelCache(
+    'pid_by_uuid',
+    _get_pids_by_uuid,
+    PIDS_CACHE_SIZE,
+    shared_config='PIDSTORE_SHARED_CACHE',
+    shared_timeout_config='PIDSTORE_SHARED_CACHE_TIMEOUT',
+    local_timeout=PIDS_CACHE_LOCAL_TIMEOUT,
+)
+
+
+def get_pids(pid_type, pid_values):
+    """Return the UUIDs and statuses of the records with the given PIDs.
+
+    Returns:
+        dict: mapping each PID value, as a string, to a tuple with the UUID
+        of its record and its status. Values without a record are missing.
+    """
+    keys = [(pid_type, text_type(pid_value)) for pid_value in pid_values]
+    return dict(
+        (pid_value, value) for (_, pid_value), value
+        in iteritems(PIDS_CACHE.get_many(keys))
+    )
+
+
+def get_uuid_from_pid(pid_type, pid_value):
+    """Return the UUID of the record with the given PID.
+
+    Raises:
+        PIDDoesNotExistError: if no record has this PID.
+    """
+    pid = PIDS_CACHE.get((pid_type, text_type(pid_value)))
+    if pid is None:
+        raise PIDDoesNotExistError(pid_type, pid_value)
+
+    object_uuid, _ = pid
+    return object_uuid
+
+
+def get_pid_from_uuid(uuid):
+    """Return the PID type and value of the record with the given UUID.
+
+    Raises:
+        PIDDoesNotExistError: if the record does not have exactly one PID.
+    """
+    pid = PIDS_BY_UUID_CACHE.get(UUID(str(uuid)))
+    if pid is None:
+        raise PIDDoesNotExistError(None, None)
+
+    return pid
+
+
+def invalidate_pids(pids):
+    """Drop the given PIDs from the caches of PIDs when the session commits.
+
+    Must be called whenever PIDs are created, or their status changes, in
+    the transaction doing it. They are dropped only once it is committed, as
+    another process could otherwise cache them again from the DB before.
+    """
+    keys, uuids = db.session.info.setdefault(INVALIDATED_PIDS, (set(), set()))
+    for pid in pids:
+        keys.add((pid.pid_type, text_type(pid.pid_value)))
+        if pid.object_uuid:
+            uuids.add(UUID(str(pid.object_uuid)))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_pids_after_commit(session):
+    # Not discarded on rollback, which could be the one of a savepoint: at
+    # worst the next commit invalidates a few PIDs for nothing.
+    keys, uuids = session.info.pop(INVALIDATED_PIDS, (set(), set()))
+    PIDS_CACHE.delete_many(keys)
+    PIDS_BY_UUID_CACHE.delete_many(uuids)
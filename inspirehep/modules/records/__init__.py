@@ -25,3 +25,4 @@
 from __future__ import absolute_import, division, print_function
 
 from .receivers import *  # noqa: F401,F403
+from .ext import InspireRecords  # noqa: F401
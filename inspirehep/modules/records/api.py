@@ -40,6 +40,7 @@ from invenio_pidstore.models import PersistentIdentifier
 from invenio_records_files.api import Record
 from invenio_db import db
 
+from inspirehep.modules.pidstore.utils import invalidate_pids
 from inspirehep.utils.record_getter import (
     RecordGetterError,
     get_es_record_by_uuid
@@ -140,6 +141,7 @@ class InspireRecord(Record):
             for pid in pids_deleted:
                 pid.redirect(pid_merged)
                 db.session.add(pid)
+        invalidate_pids(pids_deleted)
 
     def delete(self):
         """Mark as deleted all pidstores for a specific record."""
@@ -150,6 +152,7 @@ class InspireRecord(Record):
             for pid in pids:
                 pid.delete()
                 db.session.add(pid)
+        invalidate_pids(pids)
 
         self['deleted'] = True
         self.commit()
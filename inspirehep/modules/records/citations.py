@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Citation graph and citation counts of Literature records."""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from itertools import chain
+
+from elasticsearch.helpers import bulk as es_bulk
+from flask import current_app
+from redis import StrictRedis
+from redis_lock import Lock
+from sqlalchemy import and_, select
+
+from invenio_cache import current_cache
+from invenio_db import db
+from invenio_pidstore.models import PersistentIdentifier
+from invenio_records.models import RecordMetadata
+from invenio_search import current_search_client as es
+from invenio_search.utils import schema_to_index
+
+from inspire_dojson.utils import get_recid_from_ref
+from inspire_utils.helpers import force_list
+from inspire_utils.record import get_value
+from inspirehep.modules.authors.utils import invalidate_author_citations
+from inspirehep.utils.helpers import chunker
+
+from .models import RecordCitations
+from .renderings import invalidate_renderings
+
+
+LOGGER = logging.getLogger(__name__)
+
+CITATION_COUNTS_LOCK = 'citation_counts'
+CITATION_COUNTS_LOCK_EXPIRE = 60
+CITATION_COUNTS_CHUNK_SIZE = 500
+
+
+def get_impact_graph_cache_key(recid):
+    """Return the cache key of the impact graph of a record."""
+    return 'impact_graph::{0}'.format(recid)
+
+
+def invalidate_impact_graphs(recids):
+    """Drop the cached impact graphs of the given records."""
+    keys = [get_impact_graph_cache_key(recid) for recid in set(recids)]
+    if keys:
+        current_cache.delete_many(*keys)
+
+
+def get_hep_index():
+    return schema_to_index('records/hep.json')
+
+
+def get_references_recids(json):
+    """Return the recids cited by the record ``json`` in the DB.
+
+    Records that are not Literature, or are deleted, cite nothing.
+    """
+    if not json or json.get('deleted'):
+        return set()
+    if 'hep.json' not in json.get('$schema', ''):
+        return set()
+
+    refs = force_list(get_value(json, 'references.record', default=[]))
+    return set(recid for recid in map(get_recid_from_ref, refs) if recid)
+
+
+def get_indexed_references_recids(source):
+    """Return the recids cited by the record ``source`` in ES."""
+    if not source or source.get('deleted'):
+        return set()
+
+    return set(chain.from_iterable(map(
+        force_list, get_value(source, 'references.recid', default=[]))))
+
+
+def get_citation_deltas(old_recids, new_recids):
+    """Return the changes in citation counts caused by a change of references.
+
+    Returns:
+        Counter: mapping each recid to ``1`` if it started being cited, and
+        to ``-1`` if it stopped.
+    """
+    deltas = Counter()
+    for recid in new_recids - old_recids:
+        deltas[recid] += 1
+    for recid in old_recids - new_recids:
+        deltas[recid] -= 1
+    return deltas
+
+
+@contextmanager
+def citation_counts_lock():
+    """Serialize the changes to citation counts across processes.
+
+    Counts are written by reindexing the whole document with the version
+    it already has, so that the record revisions used as external versions
+    by the indexer stay valid. This read-modify-write is only safe while
+    holding this lock, which should not be held for anything else.
+
+    The lock is renewed for as long as it is held, so that a slow bulk
+    request cannot make it expire while the counts are written.
+    """
+    redis = StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
+    with Lock(redis, CITATION_COUNTS_LOCK, expire=CITATION_COUNTS_LOCK_EXPIRE,
+              auto_renewal=True):
+        yield
+
+
+def get_indexed_sources(uuids, fields=None):
+    """Fetch the current ES documents of the Literature records ``uuids``.
+
+    Returns:
+        dict: mapping the UUIDs found to their documents.
+    """
+    index, doc_type = get_hep_index()
+    uuids = [str(uuid) for uuid in uuids]
+
+    result = {}
+    for i in range(0, len(uuids), CITATION_COUNTS_CHUNK_SIZE):
+        kwargs = {}
+        if fields is not None:
+            kwargs['_source'] = fields
+        docs = es.mget(
+            index=index,
+            doc_type=doc_type,
+            body={'ids': uuids[i:i + CITATION_COUNTS_CHUNK_SIZE]},
+            **kwargs
+        )['docs']
+        result.update((doc['_id'], doc) for doc in docs if doc.get('found'))
+
+    return result
+
+
+def get_literature_uuids(recids):
+    """Map the recids of Literature records to their UUIDs.
+
+    Uses its own connection, as it is called after a commit, when the
+    session cannot emit SQL anymore.
+    """
+    table = PersistentIdentifier.__table__
+    recids = [str(recid) for recid in recids]
+
+    result = {}
+    with db.engine.connect() as conn:
+        for i in range(0, len(recids), CITATION_COUNTS_CHUNK_SIZE):
+            rows = conn.execute(select([
+                table.c.pid_value,
+                table.c.object_uuid,
+            ]).where(and_(
+                table.c.pid_type == 'lit',
+                table.c.pid_value.in_(recids[i:i + CITATION_COUNTS_CHUNK_SIZE]),
+            )))
+            result.update((int(pid_value), object_uuid) for pid_value, object_uuid in rows)
+
+    return result
+
+
+def _get_set_citation_count_op(doc, citation_count):
+    source = doc['_source']
+    source['citation_count'] = citation_count
+    return {
+        '_op_type': 'index',
+        '_index': doc['_index'],
+        '_type': doc['_type'],
+        '_id': doc['_id'],
+        '_version': doc['_version'],
+        '_version_type': 'external_gte',
+        '_source': source,
+    }
+
+
+def set_citation_counts(counts):
+    """Write absolute citation counts of Literature records to ES.
+
+    Must be called while holding ``citation_counts_lock``.
+
+    Args:
+        counts(dict): mapping UUIDs to citation counts.
+    """
+    docs = get_indexed_sources(list(counts))
+    actions = (
+        _get_set_citation_count_op(doc, counts[uuid])
+        for uuid, doc in docs.items()
+    )
+    return _bulk(actions)
+
+
+def apply_citation_deltas(deltas):
+    """Add ``deltas`` to the citation counts of Literature records in ES.
+
+    Must be called while holding ``citation_counts_lock``.
+
+    Args:
+        deltas(dict): mapping recids to the change of their citation count.
+    """
+    deltas = {recid: delta for recid, delta in deltas.items() if delta}
+    if not deltas:
+        return 0, 0
+
+    uuids = get_literature_uuids(deltas)
+    docs = get_indexed_sources(uuids.values())
+
+    actions = []
+    authors_recids = []
+    for recid, uuid in uuids.items():
+        doc = docs.get(str(uuid))
+        if doc is None:
+            continue
+        citation_count = doc['_source'].get('citation_count', 0) + deltas[recid]
+        actions.append(_get_set_citation_count_op(doc, max(citation_count, 0)))
+        authors_recids.extend(
+            force_list(get_value(doc['_source'], 'authors.recid', default=[])))
+
+    result = _bulk(actions)
+
+    # The citations of the authors of these records have changed.
+    invalidate_author_citations(authors_recids)
+    # So have the citers in the impact graphs of these records.
+    invalidate_impact_graphs(deltas)
+    # And the citation counts in their renderings.
+    invalidate_renderings(uuids.values())
+
+    return result
+
+
+def _bulk(actions):
+    success, errors = es_bulk(
+        es,
+        actions,
+        chunk_size=CITATION_COUNTS_CHUNK_SIZE,
+        raise_on_error=False,
+        raise_on_exception=False,
+        request_timeout=current_app.config['INDEXER_BULK_REQUEST_TIMEOUT'],
+    )
+    for error in errors:
+        LOGGER.error('Cannot update citation count: %r', error)
+
+    return success, len(errors)
+
+
+def count_citations(recids):
+    """Count the Literature records citing each of ``recids`` in ES.
+
+    Returns:
+        dict: mapping each recid to its number of citations.
+    """
+    index, doc_type = get_hep_index()
+    recids = list(recids)
+
+    result = {}
+    for i in range(0, len(recids), CITATION_COUNTS_CHUNK_SIZE):
+        chunk = recids[i:i + CITATION_COUNTS_CHUNK_SIZE]
+        body = []
+        for recid in chunk:
+            body.append({'index': index, 'type': doc_type})
+            body.append({
+                'size': 0,
+                'query': {
+                    'bool': {
+                        'must': {'term': {'references.recid': recid}},
+                        'must_not': {'term': {'deleted': True}},
+                    },
+                },
+            })
+        responses = es.msearch(body=body)['responses']
+        result.update(
+            (recid, response['hits']['total'])
+            for recid, response in zip(chunk, responses)
+        )
+
+    return result
+
+
+def sample_citation_counts(sample_size, seed=None):
+    """Return the indexed citation counts of a random sample of records.
+
+    Returns:
+        dict: mapping UUIDs to ``(recid, citation_count)``.
+    """
+    index, doc_type = get_hep_index()
+    random_score = {'seed': seed} if seed is not None else {}
+    hits = es.search(
+        index=index,
+        doc_type=doc_type,
+        body={
+            'size': sample_size,
+            '_source': ['control_number', 'citation_count'],
+            'query': {
+                'function_score': {
+                    'query': {'match_all': {}},
+                    'random_score': random_score,
+                },
+            },
+        },
+    )['hits']['hits']
+
+    return {
+        hit['_id']: (
+            hit['_source']['control_number'],
+            hit['_source'].get('citation_count', 0),
+        )
+        for hit in hits if 'control_number' in hit['_source']
+    }
+
+
+def is_literature(json):
+    return 'hep.json' in (json or {}).get('$schema', '')
+
+
+def citers_of(recid):
+    """Return the recids of the records citing the record ``recid``."""
+    query = RecordCitations.query.filter_by(
+        cited_recid=recid).with_entities(RecordCitations.citer_recid)
+    return [citer_recid for citer_recid, in query]
+
+
+def references_of(recid):
+    """Return the recids of the records cited by the record ``recid``."""
+    query = RecordCitations.query.filter_by(
+        citer_recid=recid).with_entities(RecordCitations.cited_recid)
+    return [cited_recid for cited_recid, in query]
+
+
+def citation_count(recid):
+    """Return the number of records citing the record ``recid``."""
+    return RecordCitations.query.filter_by(cited_recid=recid).count()
+
+
+def replace_citations(citations):
+    """Replace the outgoing edges of some records in the citation graph.
+
+    Args:
+        citations(dict): mapping the recids of the citing records to the
+            sets of recids they cite.
+    """
+    table = RecordCitations.__table__
+    citer_recids = list(citations)
+
+    for i in range(0, len(citer_recids), CITATION_COUNTS_CHUNK_SIZE):
+        db.session.execute(table.delete().where(table.c.citer_recid.in_(
+            citer_recids[i:i + CITATION_COUNTS_CHUNK_SIZE])))
+
+    _insert_citations(
+        (citer_recid, cited_recid)
+        for citer_recid, cited_recids in citations.items()
+        for cited_recid in cited_recids
+    )
+
+
+def _insert_citations(edges):
+    table = RecordCitations.__table__
+    rows = (
+        {'citer_recid': citer_recid, 'cited_recid': cited_recid}
+        for citer_recid, cited_recid in edges
+    )
+    count = 0
+    for chunk in chunker(rows, CITATION_COUNTS_CHUNK_SIZE):
+        db.session.execute(table.insert(), chunk)
+        count += len(chunk)
+
+    return count
+
+
+def build_citation_graph():
+    """Build the citation graph from scratch out of the records in the DB.
+
+    Only the few fields needed are extracted from the records, which are
+    streamed from the DB. The graph is replaced in a single transaction,
+    so that the old one is served until the new one is complete.
+
+    Returns:
+        int: the number of citations in the graph.
+    """
+    query = db.session.query(
+        RecordMetadata.json['$schema'],
+        RecordMetadata.json['control_number'],
+        RecordMetadata.json['deleted'],
+        RecordMetadata.json['references'],
+    ).execution_options(stream_results=True).yield_per(1000)
+
+    def _get_edges():
+        for schema, control_number, deleted, references in query:
+            if control_number is None:
+                continue
+            json = {
+                '$schema': schema or '',
+                'deleted': deleted,
+                'references': references or [],
+            }
+            for cited_recid in get_references_recids(json):
+                yield control_number, cited_recid
+
+    db.session.execute(RecordCitations.__table__.delete())
+    count = _insert_citations(_get_edges())
+    db.session.commit()
+
+    return count
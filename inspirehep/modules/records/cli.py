@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Manage INSPIRE records."""
+
+from __future__ import absolute_import, division, print_function
+
+import gzip
+import time
+from copy import deepcopy
+
+import click
+from flask_cli import with_appcontext
+
+from inspire_dojson import marcxml2record
+from inspirehep.modules.authors.utils import NAME_VARIATIONS_CACHE
+from inspirehep.modules.migrator.tasks import split_stream
+
+from .receivers import enhance_after_index, get_schema_name
+
+
+@click.group()
+def records():
+    """Command related to the records of INSPIRE.
+
+    Registered as ``inspire_records``, not to replace the ``records``
+    commands of Invenio-Records.
+    """
+
+
+@records.command()
+@click.option('--file-input', '-f', required=True,
+              help='MARCXML dump, optionally gzipped, with the sample records.')
+@click.option('--repeat', '-r', type=int, default=10,
+              help='Number of times each record is enhanced.')
+@click.option('--slowest', '-s', type=int, default=10,
+              help='Number of slowest records to report.')
+@with_appcontext
+def benchmark_enhancement(file_input, repeat, slowest):
+    """Time the enhancement of the records of a dump before indexing.
+
+    Usage: inspirehep inspire_records benchmark_enhancement -f demo-records.xml.gz
+    """
+    opener = gzip.open if file_input.endswith('.gz') else open
+    with opener(file_input, 'rb') as stream:
+        json_records = [marcxml2record(record) for record in split_stream(stream)]
+
+    NAME_VARIATIONS_CACHE.clear()
+
+    timings = []
+    for json_record in json_records:
+        start = time.time()
+        for _ in range(repeat):
+            enhance_after_index(None, deepcopy(json_record))
+        # Deep copies are also timed, so they are measured apart.
+        copy_start = time.time()
+        for _ in range(repeat):
+            deepcopy(json_record)
+        copy_duration = time.time() - copy_start
+
+        duration = (copy_start - start - copy_duration) / repeat
+        timings.append((duration, json_record))
+
+    by_schema = {}
+    for duration, json_record in timings:
+        durations = by_schema.setdefault(get_schema_name(json_record), [])
+        durations.append(duration)
+
+    for schema_name, durations in sorted(by_schema.items()):
+        click.echo('{0}: {1} records, {2:.3f}ms per record, {3:.3f}ms max'.format(
+            schema_name or 'no schema',
+            len(durations),
+            1000 * sum(durations) / len(durations),
+            1000 * max(durations),
+        ))
+
+    click.echo('Slowest records:')
+    for duration, json_record in sorted(timings, key=lambda el: el[0], reverse=True)[:slowest]:
+        click.echo('  {0}: {1:.3f}ms, {2} authors'.format(
+            json_record.get('control_number'),
+            1000 * duration,
+            len(json_record.get('authors', [])),
+        ))
+
+    info = NAME_VARIATIONS_CACHE.info()
+    click.echo('Name variations cache: {0:.1%} hit rate, {1} names'.format(
+        info['hit_rate'], info['size']))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Bulk indexing of records in ES."""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+from elasticsearch.helpers import bulk as es_bulk
+from flask import current_app
+
+from invenio_search import current_search_client as es
+
+
+LOGGER = logging.getLogger(__name__)
+
+BULK_INDEX_CHUNK_SIZE = 500
+
+
+def get_index_op(indexer, record, citation_count=None):
+    """Return the bulk action indexing ``record`` like ``indexer.index``.
+
+    The citation count is not part of the record in the DB, so it must be
+    passed in order not to lose it when reindexing the record.
+    """
+    index, doc_type = indexer.record_to_index(record)
+    body = indexer._prepare_record(record, index, doc_type)
+    if citation_count is not None:
+        body['citation_count'] = citation_count
+
+    return {
+        '_op_type': 'index',
+        '_index': index,
+        '_type': doc_type,
+        '_id': str(record.id),
+        '_version': record.revision_id,
+        '_version_type': indexer._version_type,
+        '_source': body,
+    }
+
+
+def get_delete_op(indexer, record):
+    """Return the bulk action deleting ``record`` like ``indexer.delete``."""
+    index, doc_type = indexer.record_to_index(record)
+
+    return {
+        '_op_type': 'delete',
+        '_index': index,
+        '_type': doc_type,
+        '_id': str(record.id),
+    }
+
+
+def _is_expected_error(error):
+    op_type, result = list(error.items())[0]
+    # A newer revision of the record has already been indexed.
+    if result.get('status') == 409:
+        return True
+    # The record had never been indexed.
+    if op_type == 'delete' and result.get('status') == 404:
+        return True
+    return False
+
+
+def bulk_index(actions):
+    """Send ``actions`` to ES in as few bulk requests as possible.
+
+    Errors don't stop the other actions from being applied, and are logged
+    unless they are due to the action being outdated.
+
+    Returns:
+        tuple: the number of successful and of failed actions.
+    """
+    success, errors = es_bulk(
+        es,
+        actions,
+        chunk_size=BULK_INDEX_CHUNK_SIZE,
+        raise_on_error=False,
+        raise_on_exception=False,
+        request_timeout=current_app.config['INDEXER_BULK_REQUEST_TIMEOUT'],
+    )
+    errors = [error for error in errors if not _is_expected_error(error)]
+    for error in errors:
+        LOGGER.error('Cannot index record: %r', error)
+
+    return success, len(errors)
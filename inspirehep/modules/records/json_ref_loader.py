@@ -25,9 +25,13 @@
 from __future__ import absolute_import, division, print_function
 
 import re
+from collections import defaultdict
+from copy import deepcopy
 
-from flask import current_app, url_for
+import six
+from flask import _request_ctx_stack, current_app, has_request_context, url_for
 from jsonref import JsonLoader, JsonRef
+from six.moves.urllib.parse import urldefrag
 from werkzeug.urls import url_parse
 
 import jsonresolver
@@ -45,10 +49,36 @@ class AbstractRecordLoader(JsonLoader):
     local resources.
     """
 
+    def __call__(self, uri, **kwargs):
+        """Return a copy of the resource at ``uri``.
+
+        The store can be shared by all the references resolved in a request,
+        so callers changing what they get must not change what others get.
+        """
+        return deepcopy(super(AbstractRecordLoader, self).__call__(uri, **kwargs))
+
     def get_record(self, pid_type, recid):
         raise NotImplementedError()
 
-    def get_remote_json(self, uri, **kwargs):
+    def get_records(self, pid_type, recids):
+        """Return a dictionary mapping the given recids to their records.
+
+        Recids are strings, and those not found are missing. By default,
+        records are fetched one by one through ``get_record``.
+        """
+        records = dict(
+            (recid, self.get_record(pid_type, recid)) for recid in recids)
+        return dict(
+            (recid, record) for recid, record in records.items()
+            if record is not None
+        )
+
+    def parse_uri(self, uri):
+        """Return the PID type and recid referenced by a local ``uri``.
+
+        Returns ``None`` for references to other servers, and ``(None,
+        None)`` for malformed references.
+        """
         parsed_uri = url_parse(uri)
         # Add http:// protocol so uri.netloc is correctly parsed.
         server_name = current_app.config.get('SERVER_NAME')
@@ -57,19 +87,59 @@ class AbstractRecordLoader(JsonLoader):
         parsed_server = url_parse(server_name)
 
         if parsed_uri.netloc and parsed_uri.netloc != parsed_server.netloc:
-            return super(AbstractRecordLoader, self).get_remote_json(uri,
-                                                                     **kwargs)
+            return None
         path_parts = parsed_uri.path.strip('/').split('/')
         if len(path_parts) < 2:
-            current_app.logger.error('Bad JSONref URI: {0}'.format(uri))
-            return None
+            return None, None
 
         endpoint = path_parts[-2]
         pid_type = get_pid_type_from_endpoint(endpoint)
         recid = path_parts[-1]
+        return pid_type, recid
+
+    def get_remote_json(self, uri, **kwargs):
+        parsed = self.parse_uri(uri)
+        if parsed is None:
+            return super(AbstractRecordLoader, self).get_remote_json(uri,
+                                                                     **kwargs)
+        pid_type, recid = parsed
+        if pid_type is None:
+            current_app.logger.error('Bad JSONref URI: {0}'.format(uri))
+            return None
+
         res = self.get_record(pid_type, recid)
         return res
 
+    def prefetch(self, uris):
+        """Load the records referenced by ``uris`` in as few queries as possible.
+
+        The references are grouped by PID type, and the records of each
+        type are fetched at once with ``get_records``. Records that cannot
+        be prefetched are left to be loaded one by one when resolved.
+        """
+        recids_by_pid_type = defaultdict(dict)
+        for uri in uris:
+            if uri in self.store:
+                continue
+            try:
+                parsed = self.parse_uri(uri)
+            except KeyError:
+                # Unknown endpoint, which fails when the reference is resolved.
+                continue
+            if parsed is None or parsed[0] is None:
+                continue
+            pid_type, recid = parsed
+            recids_by_pid_type[pid_type].setdefault(recid, []).append(uri)
+
+        for pid_type, uris_by_recid in recids_by_pid_type.items():
+            try:
+                records = self.get_records(pid_type, list(uris_by_recid))
+            except record_getter.RecordGetterError:
+                continue
+            for recid, uris in uris_by_recid.items():
+                for uri in uris:
+                    self.store[uri] = records.get(recid)
+
 
 class ESJsonLoader(AbstractRecordLoader):
     """Resolve resources by retrieving them from Elasticsearch."""
@@ -80,6 +150,9 @@ class ESJsonLoader(AbstractRecordLoader):
         except record_getter.RecordGetterError:
             return None
 
+    def get_records(self, pid_type, recids):
+        return record_getter.get_es_records_by_recid(pid_type, recids)
+
 
 class DatabaseJsonLoader(AbstractRecordLoader):
 
@@ -89,9 +162,10 @@ class DatabaseJsonLoader(AbstractRecordLoader):
         except record_getter.RecordGetterError:
             return None
 
+    def get_records(self, pid_type, recids):
+        return record_getter.get_db_records_by_recid(pid_type, recids)
+
 
-es_record_loader = ESJsonLoader()
-db_record_loader = DatabaseJsonLoader()
 SCHEMA_LOADER_CLS = json_loader_factory(
     jsonresolver.JSONResolver(
         plugins=['invenio_jsonschemas.jsonresolver']
@@ -121,12 +195,47 @@ def load_resolved_schema(name):
     )
 
 
+def _get_refs(obj):
+    """Yield the URIs of all the JSON references in ``obj``."""
+    if isinstance(obj, dict):
+        ref = obj.get('$ref')
+        if isinstance(ref, six.string_types):
+            yield urldefrag(ref)[0]
+            return
+        for value in obj.values():
+            for ref in _get_refs(value):
+                yield ref
+    elif isinstance(obj, list):
+        for value in obj:
+            for ref in _get_refs(value):
+                yield ref
+
+
+def _get_loaders_store():
+    """Return the store of the loaders shared by the current request.
+
+    Outside of a request, every call to ``replace_refs`` has its own store.
+    """
+    if not has_request_context():
+        return {}
+
+    ctx = _request_ctx_stack.top
+    if not hasattr(ctx, 'inspire_json_refs'):
+        ctx.inspire_json_refs = {}
+    return ctx.inspire_json_refs
+
+
 def replace_refs(obj, source='db'):
     """Replaces record refs in obj by bypassing HTTP requests.
 
     Any reference URI that comes from the same server and references a resource
     will be resolved directly either from the database or from Elasticsearch.
 
+    All the references in obj are loaded upfront, with one query to the DB
+    and, for Elasticsearch, one ``mget`` per PID type. Loaded references are
+    remembered until the end of the current request, and each resolution
+    gets its own copy of them.
+
     :param obj:
         Dict-like object for which '$ref' fields are recursively replaced.
     :param source:
@@ -139,13 +248,18 @@ def replace_refs(obj, source='db'):
         The same obj structure with the '$ref' fields replaced with the object
         available at the given URI.
     """
-    loaders = {
-        'db': db_record_loader,
-        'es': es_record_loader,
+    loaders_classes = {
+        'db': DatabaseJsonLoader,
+        'es': ESJsonLoader,
         'http': None
     }
-    if source not in loaders:
-        raise ValueError('source must be one of {}'.format(loaders.keys()))
+    if source not in loaders_classes:
+        raise ValueError('source must be one of {}'.format(loaders_classes.keys()))
+
+    loader = None
+    if loaders_classes[source]:
+        loader = loaders_classes[source]()
+        loader.store = _get_loaders_store().setdefault(source, loader.store)
+        loader.prefetch(_get_refs(obj))
 
-    loader = loaders[source]
     return JsonRef.replace_refs(obj, loader=loader, load_on_repr=False)
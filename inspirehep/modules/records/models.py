@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Models for Records."""
+
+from __future__ import absolute_import, division, print_function
+
+from sqlalchemy_utils.types import UUIDType
+
+from invenio_db import db
+
+
+class RecordCitations(db.Model):
+    """Edge of the citation graph: a Literature record citing another one.
+
+    Both forward and reverse lookups are served by an index: the primary
+    key for the references of a record, and ``idx_citations_cited_recid``
+    for its citers.
+    """
+
+    __tablename__ = 'records_citations'
+    __table_args__ = (
+        db.Index('idx_citations_cited_recid', 'cited_recid'),
+    )
+
+    citer_recid = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    cited_recid = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+class RecordReferences(db.Model):
+    """JSON reference from a record to another one, at some path.
+
+    Serves as reverse index of the references updated when records are
+    merged: the primary key looks up the records referring to a ``$ref``,
+    and ``idx_references_record_uuid`` the references of a record.
+    """
+
+    __tablename__ = 'records_references'
+    __table_args__ = (
+        db.Index('idx_references_record_uuid', 'record_uuid'),
+    )
+
+    ref = db.Column(db.Text, primary_key=True)
+    record_uuid = db.Column(UUIDType, primary_key=True)
+    path = db.Column(db.Text, primary_key=True)
@@ -25,12 +25,15 @@
 from __future__ import absolute_import, division, print_function
 
 import uuid
+from collections import Counter, OrderedDict, defaultdict
+from functools import wraps
 from itertools import chain
 
 import six
 from flask import current_app
-from flask_sqlalchemy import models_committed
+from flask_sqlalchemy import before_models_committed, models_committed
 
+from invenio_db import db
 from invenio_indexer.api import RecordIndexer
 from invenio_indexer.signals import before_record_index
 from invenio_records.api import Record
@@ -43,9 +46,39 @@ from invenio_records.signals import (
 from inspire_dojson.utils import get_recid_from_ref
 from inspire_utils.date import earliest_date
 from inspire_utils.helpers import force_list
-from inspire_utils.name import generate_name_variations
 from inspire_utils.record import get_value
-from inspirehep.modules.authors.utils import phonetic_blocks
+from inspirehep.modules.authors.utils import (
+    invalidate_author_citations,
+    name_variations,
+    phonetic_blocks,
+)
+from inspirehep.modules.records.citations import (
+    apply_citation_deltas,
+    citation_counts_lock,
+    get_citation_deltas,
+    get_indexed_references_recids,
+    get_indexed_sources,
+    get_references_recids,
+    invalidate_impact_graphs,
+    is_literature,
+    replace_citations,
+)
+from inspirehep.modules.records.indexer import (
+    bulk_index,
+    get_delete_op,
+    get_index_op,
+)
+from inspirehep.modules.records.references import (
+    get_ref_paths,
+    replace_references,
+)
+from inspirehep.modules.records.renderings import invalidate_renderings
+from inspirehep.modules.records.utils import get_changed_authors
+
+
+# Seconds after which the impact graphs affected by a commit are updated,
+# longer than the refresh interval of ES.
+IMPACT_GRAPHS_UPDATE_COUNTDOWN = 5
 
 
 #
@@ -60,16 +93,27 @@ def assign_phonetic_block(sender, record, *args, **kwargs):
     Uses the NYSIIS algorithm to compute a phonetic block from each
     signature's full name, skipping those that are not recognized
     as real names, but logging an error when that happens.
+
+    On update, only the signatures whose full name changed since the
+    stored revision, or that have no phonetic block yet, are processed.
     """
     if 'hep.json' not in record.get('$schema'):
         return
 
-    authors = record.get('authors', [])
+    authors = get_changed_authors(record, fields=['full_name'])
+    changed = set(id(author) for author in authors)
+    authors.extend(
+        author for author in record.get('authors', [])
+        if 'signature_block' not in author and id(author) not in changed
+    )
 
-    authors_map = {}
-    for i, author in enumerate(authors):
+    authors_map = defaultdict(list)
+    for author in authors:
         if 'full_name' in author:
-            authors_map[author['full_name']] = i
+            authors_map[author['full_name']].append(author)
+
+    if not authors_map:
+        return
 
     try:
         signatures_blocks = phonetic_blocks(authors_map.keys())
@@ -80,9 +124,10 @@ def assign_phonetic_block(sender, record, *args, **kwargs):
         return
 
     for full_name, signature_block in six.iteritems(signatures_blocks):
-        authors[authors_map[full_name]].update({
-            'signature_block': signature_block,
-        })
+        for author in authors_map[full_name]:
+            author.update({
+                'signature_block': signature_block,
+            })
 
 
 @before_record_insert.connect
@@ -99,6 +144,58 @@ def assign_uuid(sender, record, *args, **kwargs):
             author['uuid'] = str(uuid.uuid4())
 
 
+#
+# before_models_committed
+#
+
+@before_models_committed.connect
+def update_citations_before_commit(sender, changes):
+    """Update the citation graph in the same transaction as the records."""
+    if db.session().transaction.nested:
+        # The same changes are sent again when the transaction is committed.
+        return
+
+    citations = {}
+    for model_instance, change in changes:
+        if not isinstance(model_instance, RecordMetadata):
+            continue
+        if not is_literature(model_instance.json):
+            continue
+
+        recid = model_instance.json.get('control_number')
+        if recid is None:
+            continue
+
+        if change in ('insert', 'update'):
+            citations[recid] = get_references_recids(model_instance.json)
+        else:
+            citations[recid] = set()
+
+    if citations:
+        replace_citations(citations)
+
+
+@before_models_committed.connect
+def update_references_before_commit(sender, changes):
+    """Update the index of references in the same transaction as the records."""
+    if db.session().transaction.nested:
+        # The same changes are sent again when the transaction is committed.
+        return
+
+    references = {}
+    for model_instance, change in changes:
+        if not isinstance(model_instance, RecordMetadata):
+            continue
+
+        if change in ('insert', 'update'):
+            references[model_instance.id] = get_ref_paths(model_instance.json)
+        else:
+            references[model_instance.id] = set()
+
+    if references:
+        replace_references(references)
+
+
 #
 # models_committed
 #
@@ -110,25 +207,159 @@ def index_after_commit(sender, changes):
     This cannot happen in an ``after_record_commit`` receiver from Invenio-Records
     because, despite the name, at that point we are not yet sure whether the record
     has been really committed to the DB.
+
+    All the records changed by the transaction are sent to ES in bulk
+    requests, one for the Literature records and one for the others. As each
+    one is indexed with its revision as external version, an older revision
+    can never overwrite a newer one.
+
+    The citation counts of the records whose citations changed are updated
+    incrementally, comparing the references that were indexed with the new
+    ones. Only this update, and the indexing of the Literature records
+    carrying over their counts, happen while holding ``citation_counts_lock``.
+
+    The cached renderings of the records are dropped, and the impact graphs
+    affected by the changes are updated by ``update_impact_graphs``.
     """
     indexer = RecordIndexer()
 
+    # The last change of a record is the one that counts.
+    changes = OrderedDict(
+        (model_instance.id, (model_instance, change))
+        for model_instance, change in changes
+        if isinstance(model_instance, RecordMetadata)
+    ).values()
+    literature = set(
+        model_instance.id for model_instance, _ in changes
+        if is_literature(model_instance.json)
+    )
+
+    invalidate_renderings(model_instance.id for model_instance, _ in changes)
+
+    # The documents are built before taking the lock, which only covers the
+    # read-modify-write of the citation counts of the Literature records.
+    actions = OrderedDict()
     for model_instance, change in changes:
-        if isinstance(model_instance, RecordMetadata):
+        record = Record(model_instance.json, model_instance)
+        if change in ('insert', 'update'):
+            actions[model_instance.id] = get_index_op(indexer, record)
+        else:
+            actions[model_instance.id] = get_delete_op(indexer, record)
+
+    bulk_index(
+        action for id_, action in actions.items() if id_ not in literature)
+    if not literature:
+        return
+
+    with citation_counts_lock():
+        indexed = get_indexed_sources(literature, fields=[
+            'authors.recid',
+            'citation_count',
+            'deleted',
+            'references.recid',
+        ])
+
+        deltas = Counter()
+        authors_recids = []
+        recids = []
+        for model_instance, change in changes:
+            if model_instance.id not in literature:
+                continue
+
+            source = indexed.get(str(model_instance.id), {}).get('_source') or {}
+            action = actions[model_instance.id]
             if change in ('insert', 'update'):
-                indexer.index(Record(model_instance.json, model_instance))
+                if 'citation_count' in source:
+                    action['_source']['citation_count'] = source['citation_count']
+                new_recids = get_references_recids(model_instance.json)
             else:
-                indexer.delete(Record(model_instance.json, model_instance))
+                new_recids = set()
+
+            recids.append((model_instance.json or {}).get('control_number'))
+            deltas.update(get_citation_deltas(
+                get_indexed_references_recids(source), new_recids))
+            authors_recids.extend(force_list(
+                get_value(source, 'authors.recid', default=[])))
+            authors_recids.extend(
+                get_recid_from_ref(author.get('record'))
+                for author in (model_instance.json or {}).get('authors', [])
+                if author.get('record')
+            )
+
+        bulk_index(
+            action for id_, action in actions.items() if id_ in literature)
+        apply_citation_deltas(deltas)
+
+    # The publications of these authors have changed.
+    invalidate_author_citations(authors_recids)
+    # The title and references in the impact graphs of these records too.
+    recids = [recid for recid in recids if recid is not None]
+    invalidate_impact_graphs(recids)
+
+    # Their impact graphs, those of the records which gained or lost a
+    # citer, and those showing the counts that changed are computed again
+    # once ES has made the new documents searchable.
+    from inspirehep.modules.records.tasks import update_impact_graphs
+    cited_recids = [recid for recid, delta in deltas.items() if delta]
+    update_impact_graphs.apply_async(
+        args=(recids + cited_recids, cited_recids),
+        countdown=IMPACT_GRAPHS_UPDATE_COUNTDOWN,
+    )
 
 
 #
 # before_record_index
 #
 
+# Functions enhancing a record for ES, by name of the schema of the record.
+ENHANCERS = defaultdict(list)
+
+# Fields whose references are replaced by recids by the enhancers going
+# through them, rather than by a walk of their own, by name of the schema.
+REFS_ENHANCED_FIELDS = {
+    'hep.json': ('authors',),
+}
+
+LIST_REF_FIELDS_TRANSLATIONS = {
+    'deleted_records': 'deleted_recids',
+}
+
+
+def get_schema_name(json):
+    """Return the name of the schema of ``json``, e.g. ``hep.json``."""
+    return (json.get('$schema') or '').rsplit('/', 1)[-1]
+
+
+def enhancer(schema_name):
+    """Register the decorated function as an enhancer of some records.
+
+    The decorated function takes a record and changes it in place. It is
+    run by ``enhance_after_index`` on all the records of the given schema.
+    What is returned is a receiver of ``before_record_index`` that checks
+    the schema of the record before enhancing it.
+    """
+    def decorator(func):
+        ENHANCERS[schema_name].append(func)
+
+        @wraps(func)
+        def receiver(sender, json, *args, **kwargs):
+            if get_schema_name(json) == schema_name:
+                func(json)
+
+        return receiver
+    return decorator
+
+
 @before_record_index.connect
 def enhance_after_index(sender, json, *args, **kwargs):
     """Run all the receivers that enhance the record for ES in the right order.
 
+    The schema of the record is only looked up once, to run the enhancers
+    registered for it. The recids of the references are extracted by a
+    single walk of the record, which skips the fields listed in
+    ``REFS_ENHANCED_FIELDS``: their enhancers extract them while going
+    through them, so that e.g. the authors are only gone through once.
+
     .. note::
 
        ``populate_recid_from_ref`` **MUST** come before ``populate_bookautocomplete``
@@ -136,22 +367,15 @@ def enhance_after_index(sender, json, *args, **kwargs):
        would be expanded to an incorrect ``payload_recid`` by the former.
 
     """
-    populate_recid_from_ref(sender, json, *args, **kwargs)
-    populate_bookautocomplete(sender, json, *args, **kwargs)
-    populate_abstract_source_suggest(sender, json, *args, **kwargs)
-    populate_affiliation_suggest(sender, json, *args, **kwargs)
-    populate_author_count(sender, json, *args, **kwargs)
-    populate_earliest_date(sender, json, *args, **kwargs)
-    populate_inspire_document_type(sender, json, *args, **kwargs)
-    populate_name_variations(sender, json, *args, **kwargs)
-    populate_title_suggest(sender, json, *args, **kwargs)
-
-
-def populate_bookautocomplete(sender, json, *args, **kwargs):
-    """Populate the ```bookautocomplete`` field of Literature records."""
-    if 'hep.json' not in json.get('$schema'):
-        return
+    schema_name = get_schema_name(json)
+    add_recids_from_refs(json, skip=REFS_ENHANCED_FIELDS.get(schema_name, ()))
+    for func in ENHANCERS[schema_name]:
+        func(json)
+
 
+@enhancer('hep.json')
+def populate_bookautocomplete(json):
+    """Populate the ```bookautocomplete`` field of Literature records."""
     if 'book' not in json.get('document_type', []):
         return
 
@@ -184,11 +408,13 @@ def populate_bookautocomplete(sender, json, *args, **kwargs):
     })
 
 
-def populate_inspire_document_type(sender, json, *args, **kwargs):
-    """Populate the ``facet_inspire_doc_type`` field of Literature records."""
-    if 'hep.json' not in json.get('$schema'):
-        return
+@enhancer('hep.json')
+def populate_inspire_document_type(json):
+    """Populate the ``facet_inspire_doc_type`` field of Literature records.
 
+    Its first value is also stored in ``facet_inspire_primary_doc_type``,
+    so that aggregations can count a single type per record.
+    """
     result = []
 
     result.extend(json.get('document_type', []))
@@ -197,6 +423,8 @@ def populate_inspire_document_type(sender, json, *args, **kwargs):
         result.append('peer reviewed')
 
     json['facet_inspire_doc_type'] = result
+    if result:
+        json['facet_inspire_primary_doc_type'] = result[0]
 
 
 def populate_recid_from_ref(sender, json, *args, **kwargs):
@@ -241,43 +469,43 @@ def populate_recid_from_ref(sender, json, *args, **kwargs):
         }
 
     """
-    list_ref_fields_translations = {
-        'deleted_records': 'deleted_recids'
-    }
-
-    def _recursive_find_refs(json_root):
-        if isinstance(json_root, list):
-            items = enumerate(json_root)
-        elif isinstance(json_root, dict):
-            # Note that items have to be generated before altering the dict.
-            # In this case, iteritems might break during iteration.
-            items = json_root.items()
-        else:
-            items = []
-
-        for key, value in items:
-            if (isinstance(json_root, dict) and isinstance(value, dict) and
-                    '$ref' in value):
-                # Append '_recid' and remove 'record' from the key name.
-                key_basename = key.replace('record', '').rstrip('_')
-                new_key = '{}_recid'.format(key_basename).lstrip('_')
-                json_root[new_key] = get_recid_from_ref(value)
-            elif (isinstance(json_root, dict) and isinstance(value, list) and
-                    key in list_ref_fields_translations):
-                new_list = [get_recid_from_ref(v) for v in value]
-                new_key = list_ref_fields_translations[key]
-                json_root[new_key] = new_list
-            else:
-                _recursive_find_refs(value)
+    add_recids_from_refs(json)
 
-    _recursive_find_refs(json)
 
+def add_recids_from_refs(json_root, skip=()):
+    """Add the recids of the references of ``json_root``, walking it once.
+
+    See ``populate_recid_from_ref``. The keys in ``skip`` are not walked,
+    only at the top level.
+    """
+    if isinstance(json_root, list):
+        items = enumerate(json_root)
+    elif isinstance(json_root, dict):
+        # Note that items have to be generated before altering the dict.
+        # In this case, iteritems might break during iteration.
+        items = [(key, value) for key, value in json_root.items() if key not in skip]
+    else:
+        items = []
+
+    for key, value in items:
+        if (isinstance(json_root, dict) and isinstance(value, dict) and
+                '$ref' in value):
+            # Append '_recid' and remove 'record' from the key name.
+            key_basename = key.replace('record', '').rstrip('_')
+            new_key = '{}_recid'.format(key_basename).lstrip('_')
+            json_root[new_key] = get_recid_from_ref(value)
+        elif (isinstance(json_root, dict) and isinstance(value, list) and
+                key in LIST_REF_FIELDS_TRANSLATIONS):
+            new_list = [get_recid_from_ref(v) for v in value]
+            new_key = LIST_REF_FIELDS_TRANSLATIONS[key]
+            json_root[new_key] = new_list
+        else:
+            add_recids_from_refs(value)
 
-def populate_abstract_source_suggest(sender, json, *args, **kwargs):
-    """Populate the ``abstract_source_suggest`` field in Literature records."""
-    if 'hep.json' not in json.get('$schema'):
-        return
 
+@enhancer('hep.json')
+def populate_abstract_source_suggest(json):
+    """Populate the ``abstract_source_suggest`` field in Literature records."""
     abstracts = json.get('abstracts', [])
 
     for abstract in abstracts:
@@ -291,11 +519,9 @@ def populate_abstract_source_suggest(sender, json, *args, **kwargs):
             })
 
 
-def populate_title_suggest(sender, json, *args, **kwargs):
+@enhancer('journals.json')
+def populate_title_suggest(json):
     """Populate the ``title_suggest`` field of Journals records."""
-    if 'journals.json' not in json.get('$schema'):
-        return
-
     journal_title = get_value(json, 'journal_title.title', default='')
     short_title = json.get('short_title', '')
     title_variants = json.get('title_variants', [])
@@ -317,11 +543,9 @@ def populate_title_suggest(sender, json, *args, **kwargs):
     })
 
 
-def populate_affiliation_suggest(sender, json, *args, **kwargs):
+@enhancer('institutions.json')
+def populate_affiliation_suggest(json):
     """Populate the ``affiliation_suggest`` field of Institution records."""
-    if 'institutions.json' not in json.get('$schema'):
-        return
-
     ICN = json.get('ICN', [])
     institution_acronyms = get_value(json, 'institution_hierarchy.acronym', default=[])
     institution_names = get_value(json, 'institution_hierarchy.name', default=[])
@@ -353,11 +577,9 @@ def populate_affiliation_suggest(sender, json, *args, **kwargs):
     })
 
 
-def populate_earliest_date(sender, json, *args, **kwargs):
+@enhancer('hep.json')
+def populate_earliest_date(json):
     """Populate the ``earliest_date`` field of Literature records."""
-    if 'hep.json' not in json.get('$schema'):
-        return
-
     date_paths = [
         'preprint_date',
         'thesis_info.date',
@@ -376,39 +598,37 @@ def populate_earliest_date(sender, json, *args, **kwargs):
             json['earliest_date'] = result
 
 
-def populate_name_variations(sender, json, *args, **kwargs):
-    """Generate name variations for each signature of a Literature record."""
-    if 'hep.json' not in json.get('$schema'):
-        return
+@enhancer('hep.json')
+def populate_authors(json):
+    """Populate the fields derived from the authors of Literature records.
 
+    Generates the name variations of each signature, and the ``author_count``
+    field, and adds the recids of the references of each signature, while
+    going through the authors only once.
+    """
     authors = json.get('authors', [])
+    variations = name_variations(
+        [author['full_name'] for author in authors if author.get('full_name')])
 
+    author_count = 0
     for author in authors:
+        add_recids_from_refs(author)
+
         full_name = author.get('full_name')
         if full_name:
             bais = [
                 el['value'] for el in author.get('ids', [])
                 if el['schema'] == 'INSPIRE BAI'
             ]
-            name_variations = generate_name_variations(full_name)
 
-            author.update({'name_variations': name_variations})
+            author.update({'name_variations': variations[full_name]})
             author.update({'name_suggest': {
-                'input': name_variations,
+                'input': variations[full_name],
                 'output': full_name,
                 'payload': {'bai': bais[0] if bais else None}
             }})
 
+        if 'supervisor' not in author.get('inspire_roles', []):
+            author_count += 1
 
-def populate_author_count(sender, json, *args, **kwargs):
-    """Populate the ``author_count`` field of Literature records."""
-    if 'hep.json' not in json.get('$schema'):
-        return
-
-    authors = json.get('authors', [])
-
-    authors_excluding_supervisors = [
-        author for author in authors
-        if 'supervisor' not in author.get('inspire_roles', [])
-    ]
-    json['author_count'] = len(authors_excluding_supervisors)
+    json['author_count'] = author_count
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Reverse index of the JSON references between records."""
+
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+
+from flask import current_app
+from six import string_types
+
+from invenio_db import db
+from invenio_records.models import RecordMetadata
+
+from inspirehep.modules.records.utils import get_endpoint_from_record
+from inspirehep.utils.helpers import chunker
+
+from .models import RecordReferences
+
+
+REFERENCES_CHUNK_SIZE = 500
+
+
+def _iter_refs(obj, parts):
+    """Yield the JSON references at the path ``parts`` of ``obj``."""
+    if isinstance(obj, list):
+        for el in obj:
+            for ref in _iter_refs(el, parts):
+                yield ref
+    elif isinstance(obj, dict):
+        if not parts:
+            if isinstance(obj.get('$ref'), string_types):
+                yield obj
+        elif parts[0] in obj:
+            for ref in _iter_refs(obj[parts[0]], parts[1:]):
+                yield ref
+
+
+def get_ref_paths(json):
+    """Return the paths at which the record ``json`` has references to update.
+
+    Only the paths listed in ``INSPIRE_REF_UPDATER_WHITELISTS`` for the
+    endpoint of the record are considered.
+
+    Returns:
+        set: the ``(ref, path)`` of every reference of the record.
+    """
+    if not json or '$schema' not in json:
+        return set()
+
+    try:
+        endpoint = get_endpoint_from_record(json)
+    except KeyError:
+        return set()
+    whitelist = current_app.config['INSPIRE_REF_UPDATER_WHITELISTS'].get(endpoint, [])
+
+    return set(
+        (ref['$ref'], path)
+        for path in whitelist
+        for ref in _iter_refs(json, path.split('.'))
+    )
+
+
+def update_ref_paths(json, old_ref, new_ref, paths):
+    """Replace ``old_ref`` with ``new_ref`` at the given paths of ``json``.
+
+    Returns:
+        int: the number of references replaced.
+    """
+    count = 0
+    for path in paths:
+        for ref in _iter_refs(json, path.split('.')):
+            if ref['$ref'] == old_ref:
+                ref['$ref'] = new_ref
+                count += 1
+
+    return count
+
+
+def referring_records(ref, after=None, limit=None):
+    """Return the records referring to ``ref``, by increasing UUID.
+
+    Args:
+        ref(str): the referred ``$ref``.
+        after(Optional[UUID]): only return the records after this one.
+        limit(Optional[int]): maximum number of records to return.
+
+    Returns:
+        OrderedDict: mapping the UUIDs of the records to the paths at which
+        they refer to ``ref``.
+    """
+    query = RecordReferences.query.filter_by(ref=ref)
+    if after is not None:
+        query = query.filter(RecordReferences.record_uuid > after)
+
+    uuids = query.with_entities(RecordReferences.record_uuid).distinct().order_by(
+        RecordReferences.record_uuid)
+    if limit is not None:
+        uuids = uuids.limit(limit)
+    uuids = [uuid for uuid, in uuids]
+    if not uuids:
+        return OrderedDict()
+
+    result = OrderedDict((uuid, set()) for uuid in uuids)
+    for uuid, path in query.filter(RecordReferences.record_uuid.in_(uuids)).with_entities(
+            RecordReferences.record_uuid, RecordReferences.path):
+        result[uuid].add(path)
+
+    return result
+
+
+def count_referring_records(ref):
+    """Return the number of records referring to ``ref``."""
+    return db.session.query(
+        db.func.count(db.distinct(RecordReferences.record_uuid))
+    ).filter(RecordReferences.ref == ref).scalar()
+
+
+def replace_references(references):
+    """Replace the references of some records in the index.
+
+    Args:
+        references(dict): mapping the UUIDs of records to the sets of
+            ``(ref, path)`` returned by ``get_ref_paths``.
+    """
+    table = RecordReferences.__table__
+    uuids = list(references)
+
+    for i in range(0, len(uuids), REFERENCES_CHUNK_SIZE):
+        db.session.execute(table.delete().where(table.c.record_uuid.in_(
+            uuids[i:i + REFERENCES_CHUNK_SIZE])))
+
+    _insert_references(
+        (ref, uuid, path)
+        for uuid, ref_paths in references.items()
+        for ref, path in ref_paths
+    )
+
+
+def _insert_references(rows):
+    table = RecordReferences.__table__
+    rows = (
+        {'ref': ref, 'record_uuid': uuid, 'path': path}
+        for ref, uuid, path in rows
+    )
+    count = 0
+    for chunk in chunker(rows, REFERENCES_CHUNK_SIZE):
+        db.session.execute(table.insert(), chunk)
+        count += len(chunk)
+
+    return count
+
+
+def build_references_index():
+    """Build the index of references from scratch out of the records in the DB.
+
+    The records are streamed from the DB, and the index is replaced in a
+    single transaction, so that the old one is served until the new one is
+    complete.
+
+    Returns:
+        int: the number of references in the index.
+    """
+    query = db.session.query(
+        RecordMetadata.id,
+        RecordMetadata.json,
+    ).execution_options(stream_results=True).yield_per(1000)
+
+    def _get_rows():
+        for uuid, json in query:
+            for ref, path in get_ref_paths(json):
+                yield ref, uuid, path
+
+    db.session.execute(RecordReferences.__table__.delete())
+    count = _insert_references(_get_rows())
+    db.session.commit()
+
+    return count
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Cache of the renderings of records in export formats."""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import os
+import sys
+from types import FunctionType, ModuleType
+
+from flask import current_app
+import pkg_resources
+from redis import StrictRedis
+from redis_lock import Lock
+
+from inspirehep.version import __version__
+
+RENDERINGS_LOCK_EXPIRE = 60
+
+# Packages whose version changes the output of the formats.
+RENDERING_PACKAGES = ('inspire-dojson', 'inspire-schemas', 'pybtex')
+
+# One Redis client, and so one connection pool, per URL.
+_redis_clients = {}
+
+
+def get_renderings_key(uuid):
+    """Return the key of the renderings of a record."""
+    return 'record_renderings::{0}'.format(uuid)
+
+
+def _get_source_file(module):
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.splitext(path)[0] + '.py'
+    return path if os.path.exists(path) else None
+
+
+def get_code_version(obj):
+    """Return a version of the code producing the renderings of ``obj``.
+
+    It is a hash of the source of the module defining the class of ``obj``,
+    and of all the INSPIRE modules that it uses, directly or not, and of the
+    versions of the ``RENDERING_PACKAGES``. Any change to the code of a
+    format, or any upgrade of these packages, changes the version, so that
+    renderings made by the old code are never served.
+    """
+    seen = set()
+    to_visit = [type(obj).__module__]
+    while to_visit:
+        name = to_visit.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+
+        for value in vars(sys.modules[name]).values():
+            if isinstance(value, ModuleType):
+                dependency = value.__name__
+            elif isinstance(value, (type, FunctionType)):
+                dependency = value.__module__
+            else:
+                continue
+            if dependency and dependency.split('.')[0] == 'inspirehep':
+                to_visit.append(dependency)
+
+    digest = hashlib.md5(__version__.encode('utf-8'))
+    for package in RENDERING_PACKAGES:
+        version = pkg_resources.get_distribution(package).version
+        digest.update('{}=={}'.format(package, version).encode('utf-8'))
+    for name in sorted(seen):
+        path = _get_source_file(sys.modules[name])
+        if path is None:
+            continue
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def _get_redis():
+    """Return the Redis client of this process, sharing its connections."""
+    url = current_app.config.get('CACHE_REDIS_URL')
+    if url not in _redis_clients:
+        _redis_clients[url] = StrictRedis.from_url(url)
+
+    return _redis_clients[url]
+
+
+def get_rendering(uuid, revision_id, format_, version, render):
+    """Return the rendering of a revision of a record in some format.
+
+    The renderings of a record are stored in a single Redis hash, with a
+    field for each format, revision and code version. When the rendering is
+    missing, only one process renders it, while the others wait for it.
+
+    Args:
+        uuid(UUID): the UUID of the record.
+        revision_id(int): the revision of the record.
+        format_(str): the MIME type of the rendering.
+        version(str): the version of the code rendering it, as returned by
+            ``get_code_version``.
+        render(callable): function returning the rendering.
+
+    Returns:
+        the rendering, as a string of bytes when it comes from the cache.
+    """
+    redis = _get_redis()
+    key = get_renderings_key(uuid)
+    field = u'{0}::{1}::{2}'.format(format_, revision_id, version)
+
+    rendering = redis.hget(key, field)
+    if rendering is not None:
+        return rendering
+
+    with Lock(redis, u'{0}::{1}'.format(key, field), expire=RENDERINGS_LOCK_EXPIRE):
+        rendering = redis.hget(key, field)
+        if rendering is not None:
+            return rendering
+
+        rendering = render()
+        pipeline = redis.pipeline()
+        pipeline.hset(key, field, rendering)
+        pipeline.expire(key, current_app.config['RECORDS_RENDERINGS_CACHE_TIMEOUT'])
+        pipeline.execute()
+
+    return rendering
+
+
+def invalidate_renderings(uuids):
+    """Drop the cached renderings of the given records."""
+    keys = [get_renderings_key(uuid) for uuid in set(uuids)]
+    if keys:
+        _get_redis().delete(*keys)
@@ -39,7 +39,11 @@ from .cvformattext_serializer import CVFORMATTEXTSerializer
 from .schemas.json import RecordSchemaJSONBRIEFV1
 from .marcxml import MARCXMLSerializer
 
-from .response import record_responsify_nocache
+from .response import (
+    record_responsify_cached,
+    record_responsify_etag,
+    records_stream_responsify,
+)
 
 json_literature_brief_v1 = LiteratureJSONBriefSerializer(
     RecordSchemaJSONBRIEFV1
@@ -58,19 +62,19 @@ cvformathtml_v1 = CVFORMATHTMLSerializer()
 cvformattext_v1 = CVFORMATTEXTSerializer()
 marcxml_v1 = MARCXMLSerializer()
 
-bibtex_v1_response = record_responsify_nocache(
+bibtex_v1_response = record_responsify_cached(
     bibtex_v1, 'application/x-bibtex')
-latexeu_v1_response = record_responsify_nocache(
+latexeu_v1_response = record_responsify_cached(
     latexeu_v1, 'application/x-latexeu')
-latexus_v1_response = record_responsify_nocache(
+latexus_v1_response = record_responsify_cached(
     latexus_v1, 'application/x-latexus')
-cvformatlatex_v1_response = record_responsify_nocache(cvformatlatex_v1,
-                                                      'application/x-cvformatlatex')
-cvformathtml_v1_response = record_responsify_nocache(cvformathtml_v1,
-                                                     'application/x-cvformathtml')
-cvformattext_v1_response = record_responsify_nocache(cvformattext_v1,
-                                                     'application/x-cvformattext')
-marcxml_v1_response = record_responsify_nocache(marcxml_v1, 'application/marcxml+xml')
+cvformatlatex_v1_response = record_responsify_cached(cvformatlatex_v1,
+                                                     'application/x-cvformatlatex')
+cvformathtml_v1_response = record_responsify_cached(cvformathtml_v1,
+                                                    'application/x-cvformathtml')
+cvformattext_v1_response = record_responsify_cached(cvformattext_v1,
+                                                    'application/x-cvformattext')
+marcxml_v1_response = record_responsify_cached(marcxml_v1, 'application/marcxml+xml')
 
 bibtex_v1_search = search_responsify(bibtex_v1, 'application/x-bibtex')
 latexeu_v1_search = search_responsify(latexeu_v1, 'application/x-latexeu')
@@ -82,6 +86,16 @@ cvformathtml_v1_search = search_responsify(cvformathtml_v1,
 cvformattext_v1_search = search_responsify(cvformattext_v1,
                                            'application/x-cvformattext')
 impactgraph_v1 = ImpactGraphSerializer()
-impactgraph_v1_response = record_responsify_nocache(impactgraph_v1,
-                                                    'application/x-impact.graph+json')
+impactgraph_v1_response = record_responsify_etag(impactgraph_v1,
+                                                 'application/x-impact.graph+json')
 marcxml_v1_search = search_responsify(marcxml_v1, 'application/marcxml+xml')
+
+bibtex_v1_stream = records_stream_responsify(bibtex_v1, 'application/x-bibtex')
+latexeu_v1_stream = records_stream_responsify(latexeu_v1, 'application/x-latexeu')
+latexus_v1_stream = records_stream_responsify(latexus_v1, 'application/x-latexus')
+cvformatlatex_v1_stream = records_stream_responsify(cvformatlatex_v1,
+                                                    'application/x-cvformatlatex')
+cvformathtml_v1_stream = records_stream_responsify(cvformathtml_v1,
+                                                   'application/x-cvformathtml')
+cvformattext_v1_stream = records_stream_responsify(cvformattext_v1,
+                                                   'application/x-cvformattext')
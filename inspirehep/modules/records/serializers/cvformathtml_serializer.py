@@ -46,10 +46,16 @@ class CVFORMATHTMLSerializer(object):
         :param search_result: Elasticsearch search result.
         :param links: Dictionary of links to add to response.
         """
+        return self.create_bibliography(
+            hit['_source'] for hit in search_result['hits']['hits'])
+
+    def create_bibliography(self, record_list):
+        """Serialize a list of records.
+        :param record_list: records to serialize.
+        """
         records = []
-        for hit in search_result['hits']['hits']:
-            records.append(Cv_latex_html_text(hit['_source'],
-                                              'cv_latex_html',
+        for record in record_list:
+            records.append(Cv_latex_html_text(record, 'cv_latex_html',
                                               '<br/>').format())
 
         return "\n".join(records)
@@ -26,9 +26,105 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
+from flask import current_app
+
+from invenio_cache import current_cache
+
+from inspirehep.modules.records.citations import get_impact_graph_cache_key
+from inspirehep.modules.search import LiteratureSearch
 from inspirehep.utils.record import get_title
 from inspirehep.utils.record_getter import get_es_records
-from inspirehep.modules.search import LiteratureSearch
+
+IMPACT_GRAPH_FIELDS = [
+    'control_number',
+    'citation_count',
+    'titles',
+    'earliest_date',
+]
+
+
+def _get_node(source):
+    return {
+        "inspire_id": source['control_number'],
+        "citation_count": source.get('citation_count', 0),
+        "title": get_title(source),
+        "year": source['earliest_date'].split('-')[0]
+    }
+
+
+def get_impact_graph(record):
+    """Return the impact graph of a record.
+
+    Only the ``IMPACT_GRAPH_MAX_CITATIONS`` most cited citers are included,
+    already sorted by ElasticSearch. The number of citers per year is
+    computed by an aggregation over all of them, so it stays exact when
+    the citers are sampled.
+    """
+    out = {}
+
+    # Add information about current record
+    out['inspire_id'] = record['control_number']
+    out['title'] = get_title(record)
+    out['year'] = record['earliest_date'].split('-')[0]
+
+    # Get citations
+    max_citations = current_app.config['IMPACT_GRAPH_MAX_CITATIONS']
+
+    search = LiteratureSearch().filter(
+        'term', references__recid=record['control_number'],
+    ).sort({
+        'citation_count': {'order': 'desc', 'missing': '_last'},
+    }).params(
+        _source=IMPACT_GRAPH_FIELDS,
+    )[:max_citations]
+    search.aggs.bucket(
+        'years', 'date_histogram', field='earliest_date',
+        interval='year', format='yyyy', min_doc_count=1)
+    response = search.execute()
+
+    out['citations'] = [
+        _get_node(citation.to_dict()) for citation in response.hits
+    ]
+    out['citation_count'] = response.hits.total
+    out['citations_by_year'] = {
+        bucket.key_as_string: bucket.doc_count
+        for bucket in response.aggregations.years.buckets
+    }
+    out['sampled'] = response.hits.total > len(out['citations'])
+
+    # Get references
+    reference_recids = [
+        ref['recid'] for ref in record.get('references', []) if ref.get('recid')
+    ]
+
+    references = []
+    if reference_recids:
+        records = get_es_records(
+            'lit', reference_recids, _source=IMPACT_GRAPH_FIELDS)
+        references = [
+            _get_node(reference) for reference in records
+            if reference is not None
+        ]
+
+    out['references'] = references
+
+    return out
+
+
+def store_impact_graph(record):
+    """Compute the impact graph of a record, and store it in the cache.
+
+    Returns:
+        str: the impact graph, serialized to JSON.
+    """
+    impact_graph = json.dumps(get_impact_graph(record))
+    current_cache.set(
+        get_impact_graph_cache_key(record['control_number']),
+        impact_graph,
+        timeout=current_app.config['IMPACT_GRAPH_CACHE_TIMEOUT'],
+    )
+
+    return impact_graph
 
 
 class ImpactGraphSerializer(object):
@@ -39,79 +135,18 @@ class ImpactGraphSerializer(object):
         """
         Serialize a single impact graph from a record.
 
+        The impact graph is precomputed by ``update_impact_graphs`` when the
+        record or its citers change, and only computed here if it is missing.
+
         :param pid: Persistent identifier instance.
         :param record: Record instance.
         :param links_factory: Factory function for the link generation,
                               which are added to the response.
         """
-        out = {}
-
-        # Add information about current record
-        out['inspire_id'] = record['control_number']
-        out['title'] = get_title(record)
-        out['year'] = record['earliest_date'].split('-')[0]
-
-        # Get citations
-        citations = []
-
-        record_citations = LiteratureSearch().query(
-            'match', references__recid=record['control_number'],
-        ).params(
-            size=9999,
-            _source=[
-                'control_number',
-                'citation_count',
-                'titles',
-                'earliest_date'
-            ]
-        ).execute().hits
-
-        for citation in record_citations:
-            try:
-                citation_count = citation.citation_count
-            except AttributeError:
-                citation_count = 0
-            citations.append({
-                "inspire_id": citation['control_number'],
-                "citation_count": citation_count,
-                "title": get_title(citation.to_dict()),
-                "year": citation['earliest_date'].split('-')[0]
-            })
-
-        out['citations'] = citations
-
-        # Get references
-        record_references = record.get('references', [])
-        references = []
-
-        reference_recids = [
-            ref['recid'] for ref in record_references if ref.get('recid')
-        ]
+        cache_key = get_impact_graph_cache_key(pid.pid_value)
+
+        impact_graph = current_cache.get(cache_key)
+        if impact_graph is None:
+            impact_graph = store_impact_graph(record)
 
-        if reference_recids:
-            record_references = get_es_records(
-                'lit',
-                reference_recids,
-                _source=[
-                    'control_number',
-                    'citation_count',
-                    'titles',
-                    'earliest_date'
-                ]
-            )
-
-            for reference in record_references:
-                try:
-                    citation_count = reference.citation_count
-                except AttributeError:
-                    citation_count = 0
-                references.append({
-                    "inspire_id": reference['control_number'],
-                    "citation_count": citation_count,
-                    "title": get_title(reference),
-                    "year": reference['earliest_date'].split('-')[0]
-                })
-
-        out['references'] = references
-
-        return json.dumps(out)
+        return impact_graph
@@ -46,8 +46,15 @@ class LATEXUSSerializer(object):
         :param search_result: Elasticsearch search result.
         :param links: Dictionary of links to add to response.
         """
+        return self.create_bibliography(
+            hit['_source'] for hit in search_result['hits']['hits'])
+
+    def create_bibliography(self, record_list):
+        """Serialize a list of records.
+        :param record_list: records to serialize, as found in ES.
+        """
         records = []
-        for hit in search_result['hits']['hits']:
-            records.append(Latex(hit['_source'], 'latex_us').format())
+        for record in record_list:
+            records.append(Latex(record, 'latex_us', from_es=True).format())
 
         return "\n".join(records)
@@ -27,7 +27,14 @@ Responsible for creating a HTTP response given the output of a serializer.
 
 from __future__ import absolute_import, division, print_function
 
-from flask import current_app
+from itertools import islice
+
+from flask import current_app, request, stream_with_context
+
+from inspirehep.modules.records.renderings import (
+    get_code_version,
+    get_rendering,
+)
 
 
 def record_responsify_nocache(serializer, mimetype):
@@ -48,3 +55,91 @@ def record_responsify_nocache(serializer, mimetype):
             response.headers.extend(headers)
         return response
     return view
+
+
+def record_responsify_cached(serializer, mimetype):
+    """Create a Records-REST response serializer cached by record revision.
+
+    The serialization of each revision of a record is cached, along with
+    the version of the code of the serializer, so that a change to the
+    format is never hidden by the cache. The cached serializations of a
+    record are dropped when it changes or when its citation count changes.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    version = get_code_version(serializer)
+
+    def view(pid, record, code=200, headers=None, links_factory=None):
+        def render():
+            return serializer.serialize(
+                pid, record, links_factory=links_factory)
+
+        if getattr(record, 'revision_id', None) is None:
+            data = render()
+        else:
+            data = get_rendering(
+                record.id, record.revision_id, mimetype, version, render)
+
+        response = current_app.response_class(data, mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return response
+    return view
+
+
+def record_responsify_etag(serializer, mimetype):
+    """Create a Records-REST response serializer tagged by its content.
+
+    This is useful for formats such as impact graphs that depend on other
+    records, so that the revision of the record cannot be used as ETag.
+    The ETag is a hash of the serialized record instead, and the response
+    is empty when the client already has it.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(pid, record, code=200, headers=None, links_factory=None):
+        response = current_app.response_class(
+            serializer.serialize(pid, record, links_factory=links_factory),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        response.add_etag()
+        return response.make_conditional(request)
+    return view
+
+
+def records_stream_responsify(serializer, mimetype):
+    """Create a response streaming the serialization of many records.
+
+    The records are serialized ``chunk_size`` at a time with the
+    ``create_bibliography`` method of the serializer, and each chunk is
+    sent as soon as it is ready, so that only one chunk of records is in
+    memory at any time.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def generate(records, chunk_size):
+        records = iter(records)
+        chunk = list(islice(records, chunk_size))
+        if chunk:
+            yield serializer.create_bibliography(chunk)
+        chunk = list(islice(records, chunk_size))
+        while chunk:
+            yield '\n'
+            yield serializer.create_bibliography(chunk)
+            chunk = list(islice(records, chunk_size))
+
+    def view(records, chunk_size, code=200, headers=None):
+        response = current_app.response_class(
+            stream_with_context(generate(records, chunk_size)),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return response
+    return view
@@ -24,156 +24,329 @@
 
 from __future__ import absolute_import, division, print_function
 
+from uuid import UUID, uuid4
+
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from elasticsearch.helpers import scan
 from flask import current_app
-from six import iteritems
+from six import iteritems, text_type
 
 from invenio_db import db
-from invenio_pidstore.models import PersistentIdentifier
+from invenio_pidstore.models import (
+    PersistentIdentifier,
+    PIDStatus,
+    Redirect,
+)
 from invenio_search import current_search_client as es
 
 from inspire_dojson.utils import get_recid_from_ref
 from inspirehep.modules.records.api import InspireRecord
+from inspirehep.modules.records.citations import (
+    citation_counts_lock,
+    count_citations,
+    sample_citation_counts,
+    set_citation_counts,
+)
+from inspirehep.modules.records.models import RecordCitations
+from inspirehep.modules.records.references import (
+    count_referring_records,
+    referring_records,
+    update_ref_paths,
+)
+from inspirehep.modules.records.serializers.impactgraph_serializer import (
+    store_impact_graph,
+)
 from inspirehep.modules.records.utils import get_endpoint_from_record
-from inspirehep.modules.pidstore.utils import get_pid_type_from_schema
+from inspirehep.modules.pidstore.utils import (
+    get_pid_type_from_schema,
+    invalidate_pids,
+)
+from inspirehep.utils.helpers import chunker
+from inspirehep.utils.record_getter import get_es_records
 
 
 logger = get_task_logger(__name__)
 
+MERGED_RECORDS_BATCH_SIZE = 500
 
-@shared_task(ignore_result=True)
-def update_refs(old_ref, new_ref):
+IMPACT_GRAPHS_BATCH_SIZE = 500
+
+
+@shared_task(bind=True, ignore_result=True)
+def update_refs(self, old_ref, new_ref):
     """Update references in the entire database.
 
     Replaces all occurrences of ``old_ref`` with ``new_ref``,
     provided that they happen at one of the paths listed in
     ``INSPIRE_REF_UPDATER_WHITELISTS``.
+
+    The records to update are looked up in the index of references, and
+    updated in batches of ``INSPIRE_REF_UPDATER_BATCH_SIZE``, each in its own
+    transaction. As the updated records stop referring to ``old_ref``, a task
+    that was interrupted can simply be run again to resume where it stopped.
     """
-    records = get_records_to_update(old_ref)
+    batch_size = current_app.config['INSPIRE_REF_UPDATER_BATCH_SIZE']
 
-    with db.session.begin_nested():
-        for record in records:
-            logger.info('Updated reference: %s -> %s, Record: %s', old_ref, new_ref, record.id)
-            update_links(record, old_ref, new_ref)
-            record.commit()
-    db.session.commit()
+    total = count_referring_records(old_ref)
+    done = 0
+    after = None
 
+    while True:
+        batch = referring_records(old_ref, after=after, limit=batch_size)
+        if not batch:
+            break
 
-def update_links(record, old_ref, new_ref):
-    def _update_links(record, parts, old_ref, new_ref):
-        for i, part in enumerate(parts):
-            if isinstance(record, dict):
-                try:
-                    record = record[part]
-                except KeyError:
-                    return
-            elif isinstance(record, list):
-                for el in record:
-                    _update_links(el, parts[i:], old_ref, new_ref)
-                return
-
-        if record['$ref'] == old_ref:
-            record['$ref'] = new_ref
+        records = InspireRecord.get_records(list(batch))
+        with db.session.begin_nested():
+            for record in records:
+                update_ref_paths(record, old_ref, new_ref, batch[record.id])
+                record.commit()
+        db.session.commit()
+
+        after = next(reversed(batch))
+        done += len(batch)
+        logger.info(
+            'Updated reference: %s -> %s, %d/%d records',
+            old_ref, new_ref, done, total)
+        if self.request.id:
+            self.update_state(
+                state='PROGRESS', meta={'done': done, 'total': total})
 
+    return done
+
+
+def update_links(record, old_ref, new_ref):
+    """Replace ``old_ref`` with ``new_ref`` at the whitelisted paths of ``record``."""
     endpoint = get_endpoint_from_record(record)
     whitelist = current_app.config['INSPIRE_REF_UPDATER_WHITELISTS'][endpoint]
 
-    for path in whitelist:
-        _update_links(record, path.split('.'), old_ref, new_ref)
+    return update_ref_paths(record, old_ref, new_ref, whitelist)
+
+
+@shared_task
+def merge_merged_records():
+    """Merge all records that were marked as merged.
+
+    The PIDs of the ``deleted_records`` of every merged record are redirected
+    to it, creating the ones that do not exist. The PIDs are handled in
+    batches of ``MERGED_RECORDS_BATCH_SIZE``, each committed on its own, and
+    the ones already redirected to the right record are skipped, so that
+    running the task again only costs a few queries per batch.
 
+    Returns:
+        int: the number of PIDs that were redirected.
+    """
+    count = 0
+    for batch in chunker(get_merged_pids(), MERGED_RECORDS_BATCH_SIZE):
+        count += redirect_merged_pids(batch)
+        db.session.commit()
 
-def get_records_to_update(old_ref):
-    def _get_uuids_to_update(old_ref):
-        def _replace_record_with_recid(path):
-            return path.replace('record', 'recid')
+    logger.info('Merged records: %d PIDs were redirected', count)
 
-        def _ref_to_recid(ref):
-            return int(ref.split('/')[-1])
+    return count
 
-        result = []
 
-        whitelists = current_app.config['INSPIRE_REF_UPDATER_WHITELISTS']
-        for endpoint, whitelist in iteritems(whitelists):
-            fields = [_replace_record_with_recid(path) for path in whitelist]
-            body = {
-                'query': {
-                    'bool': {
-                        'should': [
-                            {
-                                'term': {
-                                    field: {
-                                        'value': _ref_to_recid(old_ref),
-                                    },
-                                },
-                            } for field in fields
-                        ],
-                    },
-                },
-            }
+def get_merged_pids():
+    """Yield the PIDs of the records deleted by a merge.
 
-            index = current_app.config['INSPIRE_ENDPOINT_TO_INDEX'][endpoint]
-            query = scan(es, query=body, index=index)
+    Yields:
+        tuple: the ``(pid_type, pid_value, uuid)`` of every PID of a deleted
+        record, where ``uuid`` identifies the record it was merged into.
+    """
+    body = {
+        '_source': ['$schema', 'deleted_records'],
+        'query': {
+            'exists': {
+                'field': 'deleted_records',
+            },
+        },
+    }
 
-            result.extend(el['_id'] for el in list(query))
+    index = 'records-*'
+    query = scan(es, query=body, index=index)
 
-        return result
+    for result in query:
+        source = result['_source']
+        pid_type = get_pid_type_from_schema(source['$schema'])
+        uuid = UUID(result['_id'])
+        for ref in source['deleted_records']:
+            yield pid_type, text_type(get_recid_from_ref(ref)), uuid
 
-    def _get_records_to_update(uuids):
-        return InspireRecord.get_records(uuids)
 
-    uuids = _get_uuids_to_update(old_ref)
-    records = _get_records_to_update(uuids)
+def redirect_merged_pids(merged_pids):
+    """Redirect a batch of PIDs of deleted records to the merged records.
 
-    return records
+    All the PIDs, and the redirections of the ones already redirected, are
+    fetched in one query each, and the PIDs and redirections to create or
+    update are written in bulk.
+
+    Args:
+        merged_pids(list): ``(pid_type, pid_value, uuid)`` as returned by
+            ``get_merged_pids``.
+
+    Returns:
+        int: the number of PIDs that were redirected.
+    """
+    pid_types = set(pid_type for pid_type, _, _ in merged_pids)
+
+    targets = dict(
+        ((object_uuid, pid_type), pid_id)
+        for object_uuid, pid_type, pid_id in PersistentIdentifier.query.filter(
+            PersistentIdentifier.object_uuid.in_(
+                set(uuid for _, _, uuid in merged_pids)),
+            PersistentIdentifier.pid_type.in_(pid_types),
+            PersistentIdentifier.status == PIDStatus.REGISTERED,
+        ).with_entities(
+            PersistentIdentifier.object_uuid,
+            PersistentIdentifier.pid_type,
+            PersistentIdentifier.id,
+        )
+    )
+
+    pids = dict(
+        ((pid.pid_type, pid.pid_value), pid)
+        for pid in PersistentIdentifier.query.filter(
+            PersistentIdentifier.pid_type.in_(pid_types),
+            PersistentIdentifier.pid_value.in_(
+                set(pid_value for _, pid_value, _ in merged_pids)),
+        )
+    )
+
+    redirected_uuids = [
+        pid.object_uuid for pid in pids.values()
+        if pid.status == PIDStatus.REDIRECTED and pid.object_uuid]
+    redirects = {}
+    if redirected_uuids:
+        redirects = dict(
+            (redirect_id, pid_id)
+            for redirect_id, pid_id in Redirect.query.filter(
+                Redirect.id.in_(redirected_uuids),
+            ).with_entities(Redirect.id, Redirect.pid_id)
+        )
+
+    new_pids = []
+    new_redirects = []
+    updated_pids = []
+    updated_redirects = []
+    redirected_pids = []
+    seen = set()
+
+    for pid_type, pid_value, uuid in merged_pids:
+        if (pid_type, pid_value) in seen:
+            continue
+        seen.add((pid_type, pid_value))
+
+        target_id = targets.get((uuid, pid_type))
+        if target_id is None:
+            logger.warning(
+                'Cannot redirect %s:%s: record %s has no PID',
+                pid_type, pid_value, uuid)
+            continue
+
+        pid = pids.get((pid_type, pid_value))
+        if pid is None:
+            redirect = Redirect(id=uuid4(), pid_id=target_id)
+            new_redirects.append(redirect)
+            pid = PersistentIdentifier(
+                pid_type=pid_type,
+                pid_value=pid_value,
+                status=PIDStatus.REDIRECTED,
+                object_uuid=redirect.id,
+            )
+            new_pids.append(pid)
+        elif pid.status == PIDStatus.REDIRECTED:
+            if redirects.get(pid.object_uuid, target_id) == target_id:
+                continue
+            updated_redirects.append({'id': pid.object_uuid, 'pid_id': target_id})
+        elif pid.status == PIDStatus.REGISTERED:
+            if pid.object_uuid == uuid:
+                continue
+            redirect = Redirect(id=uuid4(), pid_id=target_id)
+            new_redirects.append(redirect)
+            updated_pids.append({
+                'id': pid.id,
+                'status': PIDStatus.REDIRECTED,
+                'object_type': None,
+                'object_uuid': redirect.id,
+            })
+        else:
+            logger.warning(
+                'Cannot redirect %s:%s: its status is %s',
+                pid_type, pid_value, pid.status)
+            continue
+
+        redirected_pids.append(pid)
+
+    if new_redirects:
+        db.session.bulk_save_objects(new_redirects)
+    if new_pids:
+        db.session.bulk_save_objects(new_pids)
+    if updated_pids:
+        db.session.bulk_update_mappings(PersistentIdentifier, updated_pids)
+    if updated_redirects:
+        db.session.bulk_update_mappings(Redirect, updated_redirects)
+
+    invalidate_pids(redirected_pids)
+
+    return len(redirected_pids)
 
 
 @shared_task
-def merge_merged_records():
-    """Merge all records that were marked as merged."""
-    records = get_merged_records()
-
-    for record in records:
-
-        record_pid = PersistentIdentifier.query.filter_by(object_uuid=record.id).one()
-        deleted_ids = [get_recid_from_ref(ref) for ref in record['deleted_records']]
-
-        for deleted_id in deleted_ids:
-                deleted_pid = PersistentIdentifier.query.filter_by(
-                    pid_value=str(deleted_id)
-                ).one_or_none()
-
-                if not deleted_pid:
-                    deleted_pid = PersistentIdentifier.create(
-                        pid_type=get_pid_type_from_schema(record['$schema']),
-                        pid_value=deleted_id,
-                        object_type='rec'
-                    )
-                    deleted_pid.register()
-                    db.session.add(deleted_pid)
-
-                deleted_pid.redirect(record_pid)
-    db.session.commit()
-
-
-def get_merged_records():
-    def _get_uuids_to_merge():
-        body = {
-            'query': {
-                'exists': {
-                    'field': 'deleted_records',
-                },
-            },
+def reconcile_citation_counts(sample_size=None):
+    """Verify the citation counts of a random sample of Literature records.
+
+    The citation counts are maintained incrementally by
+    ``index_after_commit``: this recounts the citations of
+    ``CITATION_COUNTS_RECONCILIATION_SAMPLE_SIZE`` records, and fixes the
+    counts that drifted.
+    """
+    if sample_size is None:
+        sample_size = current_app.config[
+            'CITATION_COUNTS_RECONCILIATION_SAMPLE_SIZE']
+
+    with citation_counts_lock():
+        sample = sample_citation_counts(sample_size)
+        recounts = count_citations(recid for recid, _ in sample.values())
+
+        wrong_counts = {
+            uuid: recounts[recid]
+            for uuid, (recid, citation_count) in iteritems(sample)
+            if recounts[recid] != citation_count
         }
+        if wrong_counts:
+            set_citation_counts(wrong_counts)
 
-        index = 'records-*'
-        query = scan(es, query=body, index=index)
+    logger.info(
+        'Reconciled citation counts: %d out of %d records were wrong',
+        len(wrong_counts), len(sample))
 
-        for result in query:
-            yield result['_id']
+    return len(wrong_counts)
 
-    uuids = _get_uuids_to_merge()
-    records = InspireRecord.get_records(uuids)
 
-    return records
+@shared_task(ignore_result=True)
+def update_impact_graphs(recids, citers_recids=()):
+    """Recompute and store the impact graphs of some Literature records.
+
+    The impact graphs of the records cited by ``citers_recids`` are also
+    recomputed, as they show the citation counts of these records, which
+    changed.
+    """
+    recids = set(recids)
+    for chunk in chunker(set(citers_recids), IMPACT_GRAPHS_BATCH_SIZE):
+        recids.update(
+            cited_recid for cited_recid, in RecordCitations.query.filter(
+                RecordCitations.citer_recid.in_(chunk),
+            ).with_entities(RecordCitations.cited_recid)
+        )
+
+    for chunk in chunker(recids, IMPACT_GRAPHS_BATCH_SIZE):
+        records = get_es_records('lit', chunk)
+        for recid, record in zip(chunk, records):
+            if record is None:
+                continue
+            try:
+                store_impact_graph(record)
+            except KeyError as e:
+                logger.warning(
+                    'Cannot compute the impact graph of %s: missing %s', recid, e)
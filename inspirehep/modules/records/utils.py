@@ -24,6 +24,9 @@
 
 from __future__ import absolute_import, division, print_function
 
+from invenio_db import db
+from invenio_records.models import RecordMetadata
+
 from inspirehep.modules.pidstore.utils import (
     get_endpoint_from_pid_type,
     get_pid_type_from_schema
@@ -36,3 +39,54 @@ def get_endpoint_from_record(record):
     endpoint = get_endpoint_from_pid_type(pid_type)
 
     return endpoint
+
+
+def get_stored_authors(record):
+    """Return the authors of the revision of ``record`` stored in the DB.
+
+    Only the authors are read from the DB, which is never flushed by this
+    function, so changes to ``record`` that were not yet committed are not
+    visible in the result, even if they modified nested objects in place.
+    """
+    if getattr(record, 'model', None) is None:
+        return []
+
+    with db.session.no_autoflush:
+        authors = db.session.query(RecordMetadata.json['authors']).filter(
+            RecordMetadata.id == record.id).scalar()
+
+    return authors or []
+
+
+def get_changed_authors(record, fields=None):
+    """Return the authors of ``record`` that changed since the last commit.
+
+    Authors are matched with the ones of the stored revision through their
+    ``uuid``, so authors without one are always considered new.
+
+    Args:
+        record(Record): a record being inserted or updated.
+        fields(list): if given, only changes to these fields of an author
+            are taken into account.
+
+    Returns:
+        list: the authors of ``record`` that were added or changed.
+    """
+    def _relevant(author):
+        if fields is None:
+            return author
+        return dict((field, author.get(field)) for field in fields)
+
+    authors = record.get('authors', [])
+    if not authors:
+        return []
+
+    stored_authors = dict(
+        (author['uuid'], _relevant(author))
+        for author in get_stored_authors(record) if 'uuid' in author
+    )
+
+    return [
+        author for author in authors
+        if stored_authors.get(author.get('uuid')) != _relevant(author)
+    ]
@@ -78,25 +78,25 @@ class LiteratureRecord(ESRecord, AdminToolsMixin):
         Returns a list with information about conferences related to the
         record.
         """
+        publication_info = self['publication_info']
+        # All the references are resolved at once.
+        refs = replace_refs([
+            [pub_info.get('conference_record'), pub_info.get('parent_record')]
+            for pub_info in publication_info
+        ], 'es')
+
         conf_info = []
-        for pub_info in self['publication_info']:
+        for pub_info, (conference_rec, parent_rec) in zip(publication_info, refs):
             conference_recid = None
             parent_recid = None
-            parent_rec = {}
-            conference_rec = {}
-            if 'conference_record' in pub_info:
-                conference_rec = replace_refs(pub_info['conference_record'],
-                                              'es')
-                if conference_rec and conference_rec.get('control_number'):
-                    conference_recid = conference_rec['control_number']
-                else:
-                    conference_rec = {}
-            if 'parent_record' in pub_info:
-                parent_rec = replace_refs(pub_info['parent_record'], 'es')
-                if parent_rec and parent_rec.get('control_number'):
-                    parent_recid = parent_rec['control_number']
-                else:
-                    parent_rec = {}
+            if conference_rec and conference_rec.get('control_number'):
+                conference_recid = conference_rec['control_number']
+            else:
+                conference_rec = {}
+            if parent_rec and parent_rec.get('control_number'):
+                parent_recid = parent_rec['control_number']
+            else:
+                parent_rec = {}
             conf_info.append(
                 {
                     "conference_recid": conference_recid,
@@ -26,6 +26,7 @@ from __future__ import absolute_import, division, print_function
 
 from .api import (              # noqa: F401
     IQ,
+    IQTemplate,
     LiteratureSearch,
     AuthorsSearch,
     DataSearch,
@@ -23,11 +23,13 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
-from flask import request
+from flask import current_app, request
 from flask_security import current_user
 
-from elasticsearch import RequestError
+from elasticsearch import TransportError
 from elasticsearch_dsl.query import Q
 
 from invenio_search.api import DefaultFilter, RecordsSearch
@@ -38,7 +40,7 @@ from inspirehep.modules.records.permissions import (
     user_collections
 )
 
-from .query_factory import inspire_query_factory
+from .query_factory import IQTemplate, inspire_query_factory  # noqa: F401
 
 
 logger = logging.getLogger(__name__)
@@ -48,14 +50,15 @@ IQ = inspire_query_factory()
 class SearchMixin(object):
     """Mixin that adds helper functions to ElasticSearch DSL classes."""
 
-    def query_from_iq(self, query_string):
+    def query_from_iq(self, query_string, *args):
         """Initialize ES DSL object using INSPIRE query parser.
 
-        :param query_string: Query string as a user would input in INSPIRE's search box.
-        :type query_string: string
+        :param query_string: Query string as a user would input in INSPIRE's
+            search box, or an ``IQTemplate`` filled with ``args``.
+        :type query_string: string or IQTemplate
         :returns: Elasticsearch DSL search class
         """
-        return self.query(IQ(query_string, self))
+        return self.query(IQ(query_string, self, *args))
 
     def get_source(self, uuid, **kwargs):
         """Get source from a given uuid.
@@ -74,27 +77,86 @@ class SearchMixin(object):
             **kwargs
         )
 
-    def mget(self, uuids, **kwargs):
-        """Get source from a list of uuids.
+    def mget(self, uuids, chunk_size=None, **kwargs):
+        """Get sources from a list of uuids.
+
+        The uuids are fetched in chunks of ``chunk_size`` (by default
+        ``SEARCH_MGET_CHUNK_SIZE``), and up to ``SEARCH_MGET_CONCURRENCY``
+        chunks are requested at once. A chunk that fails is logged and does
+        not prevent the other chunks from being fetched.
 
         :param uuids: uuids of documents to be retrieved.
         :type uuids: list of strings representing uuids
-        :returns: list of JSON documents
+        :param chunk_size: number of documents fetched by each request.
+        :type chunk_size: int
+        :returns: one JSON document per uuid, in the same order, with
+            ``None`` for the documents that were not found or whose chunk
+            failed. The failures are in the ``errors`` attribute.
+        :rtype: MultiGetResult
         """
-        results = []
-
-        try:
-            documents = es.mget(
-                index=self.Meta.index,
-                doc_type=self.Meta.doc_types,
-                body={'ids': uuids},
-                **kwargs
+        chunk_size = chunk_size or current_app.config['SEARCH_MGET_CHUNK_SIZE']
+        unique_uuids = list(OrderedDict.fromkeys(str(uuid) for uuid in uuids))
+        chunks = [
+            unique_uuids[i:i + chunk_size]
+            for i in range(0, len(unique_uuids), chunk_size)
+        ]
+
+        # The client is resolved here because the proxy is bound to the app
+        # context, which the threads of the pool do not have.
+        client = es._get_current_object()
+
+        def fetch_chunk(chunk):
+            try:
+                documents = client.mget(
+                    index=self.Meta.index,
+                    doc_type=self.Meta.doc_types,
+                    body={'ids': chunk},
+                    **kwargs
+                )
+            except TransportError as e:
+                logger.exception(
+                    'Failed to fetch %d documents from %s',
+                    len(chunk), self.Meta.index)
+                return chunk, e
+            return documents['docs'], None
+
+        concurrency = min(
+            current_app.config['SEARCH_MGET_CONCURRENCY'], len(chunks))
+        if concurrency > 1:
+            pool = ThreadPool(concurrency)
+            try:
+                responses = pool.map(fetch_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            responses = [fetch_chunk(chunk) for chunk in chunks]
+
+        sources = {}
+        errors = []
+        for documents, error in responses:
+            if error is not None:
+                errors.append((documents, error))
+                continue
+            sources.update(
+                (document['_id'], document['_source'])
+                for document in documents if document.get('found')
             )
-            results = [document['_source'] for document in documents['docs']]
-        except RequestError as e:
-            logger.exception(e)
 
-        return results
+        return MultiGetResult(
+            [sources.get(str(uuid)) for uuid in uuids], errors)
+
+
+class MultiGetResult(list):
+    """Documents returned by ``SearchMixin.mget``.
+
+    Besides the documents, it holds the chunks that could not be fetched
+    in ``errors``, as a list of ``(uuids, exception)`` tuples.
+    """
+
+    def __init__(self, documents, errors):
+        super(MultiGetResult, self).__init__(documents)
+        self.errors = errors
 
 
 def inspire_filter():
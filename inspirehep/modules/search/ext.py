@@ -24,6 +24,7 @@
 
 from __future__ import absolute_import, division, print_function
 
+from .query_factory import add_query_parse_timing
 from .views import blueprint
 
 
@@ -34,4 +35,5 @@ class InspireSearch(object):
 
     def init_app(self, app):
         app.register_blueprint(blueprint)
+        app.after_request(add_query_parse_timing)
         app.extensions['inspire-search'] = self
@@ -24,15 +24,195 @@
 
 from __future__ import absolute_import, division, print_function
 
+import json
+import re
+import time
+from copy import deepcopy
+from string import Formatter
+
 from elasticsearch_dsl import Q
+from flask import g, has_request_context
+from six import string_types, text_type
 
 import inspire_query_parser
 
+from inspirehep.utils.cache import TwoLevelCache
+
+PARSED_QUERIES_CACHE_SIZE = 10000
+
+# Number of value shapes remembered by each query template.
+IQ_TEMPLATE_SHAPES_SIZE = 1000
+
+_LETTERS = re.compile(r'[^\W\d_]+', re.UNICODE)
+_DIGITS = re.compile(r'\d+', re.UNICODE)
+_OPERATORS = ('and', 'not', 'or')
+
+# Exact, partial and regex phrases, in which the parser keeps whitespace,
+# up to the end of the query string when they are not closed.
+_PHRASE = re.compile(r'''("[^"]*(?:"|$)|'[^']*(?:'|$)|/[^/]*(?:/|$))''')
+_WHITESPACE = re.compile(r'\s+', re.UNICODE)
+
+
+def _count(name, value=1):
+    """Add ``value`` to a query parsing metric of the current request."""
+    if has_request_context():
+        setattr(g, name, getattr(g, name, 0) + value)
+
+
+def normalize_query_string(query_string):
+    """Collapse the whitespace of a query string outside of its phrases.
+
+    The parser ignores this whitespace, while the whitespace of quoted
+    phrases is part of what they match, so phrases are left untouched.
+    """
+    parts = _PHRASE.split(query_string)
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE.sub(u' ', parts[i])
+    parts[0] = parts[0].lstrip()
+    parts[-1] = parts[-1].rstrip()
+    return u''.join(parts)
+
+
+def _parse_query_strings(query_strings):
+    result = {}
+    for query_string in query_strings:
+        start = time.time()
+        result[query_string] = inspire_query_parser.parse_query(query_string)
+        _count('iq_parsed')
+        _count('iq_parse_time', time.time() - start)
+    return result
+
+
+PARSED_QUERIES_CACHE = TwoLevelCache(
+    'iq', _parse_query_strings, PARSED_QUERIES_CACHE_SIZE)
+
+
+def parse_query(query_string):
+    """Return the ES query of an INSPIRE query string.
+
+    Queries are only parsed the first time they are seen by the process.
+    The result is a copy, which the caller is free to change.
+    """
+    _count('iq_queries')
+    query_string = normalize_query_string(query_string)
+    return deepcopy(PARSED_QUERIES_CACHE.get(query_string))
+
+
+def _fill(query, values):
+    if isinstance(query, dict):
+        return dict((key, _fill(value, values)) for key, value in query.items())
+    elif isinstance(query, list):
+        return [_fill(value, values) for value in query]
+    elif isinstance(query, string_types):
+        for marker, value in values:
+            query = query.replace(marker, value)
+    return query
+
+
+def _get_shape(value):
+    """Return the shape of a value, in which runs of letters are ``a``.
+
+    The digits, punctuation, whitespace and boolean operators that the
+    parser looks at are kept, with the length of each run of digits.
+    """
+    value = _DIGITS.sub(lambda match: u'9' * len(match.group()), value)
+    return _LETTERS.sub(
+        lambda match: match.group() if match.group().lower() in _OPERATORS else u'a',
+        value,
+    )
+
+
+class IQTemplate(object):
+    """Query string with ``{}`` placeholders, parsed once for all values.
+
+    The template is parsed with a marker in place of each placeholder, and
+    the markers are replaced by the values in the parsed query. How values
+    are parsed depends on what they look like, for example dates, numbers,
+    wildcards, author names or BAIs, so the first values of each shape are
+    parsed in the query string, and the values of this shape are only
+    filled in the parsed template when it gave the same query.
+
+    Example::
+
+        >>> PROCEEDINGS = IQTemplate('cnum:"{}" and 980__a:proceedings')
+        >>> LiteratureSearch().query_from_iq(PROCEEDINGS, 'C06-07-01')
+
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+        placeholders = [
+            field_name for _, field_name, _, _ in Formatter().parse(template)
+            if field_name is not None
+        ]
+        self._markers = [
+            u'iqtemplatemarker{0}x'.format(i) for i in range(len(placeholders))]
+        self._parsed = None
+        self._fillable_shapes = {}
+
+    def __repr__(self):
+        return 'IQTemplate({0!r})'.format(self.template)
+
+    def _get_parsed(self):
+        """Parse the template, or return ``False`` if markers get lost."""
+        if self._parsed is None:
+            parsed = parse_query(self.template.format(*self._markers))
+            dumped = json.dumps(parsed)
+            if all(marker in dumped for marker in self._markers):
+                self._parsed = parsed
+            else:
+                self._parsed = False
+        return self._parsed
+
+    def parse(self, *args):
+        """Return the ES query of the template filled with ``args``."""
+        values = [text_type(arg) for arg in args]
+        query_string = self.template.format(*values)
+        if not self._get_parsed():
+            return parse_query(query_string)
+
+        shape = tuple(_get_shape(value) for value in values)
+        fillable = self._fillable_shapes.get(shape)
+        if fillable is False:
+            return parse_query(query_string)
+
+        filled = _fill(self._parsed, list(zip(self._markers, values)))
+        if fillable:
+            _count('iq_queries')
+            return filled
+
+        parsed = parse_query(query_string)
+        if len(self._fillable_shapes) < IQ_TEMPLATE_SHAPES_SIZE:
+            self._fillable_shapes[shape] = parsed == filled
+        return parsed
+
 
 def inspire_query_factory():
     """Create an Elastic Search DSL query instance using the generated Elastic Search query by the parser."""
 
-    def inspire_query(query_string, search):
-        return Q(inspire_query_parser.parse_query(query_string))
+    def inspire_query(query_string, search, *args):
+        if isinstance(query_string, IQTemplate):
+            return Q(query_string.parse(*args))
+        return Q(parse_query(query_string))
 
     return inspire_query
+
+
+def add_query_parse_timing(response):
+    """Report the time spent parsing queries during a request.
+
+    The metrics are sent in a ``Server-Timing`` header, which browsers show
+    along with the other timings of the request.
+    """
+    queries = getattr(g, 'iq_queries', 0)
+    if queries:
+        response.headers.add(
+            'Server-Timing',
+            'iq;dur={0:.3f};desc="{1} queries, {2} parsed"'.format(
+                getattr(g, 'iq_parse_time', 0) * 1000,
+                queries,
+                getattr(g, 'iq_parsed', 0),
+            ),
+        )
+    return response
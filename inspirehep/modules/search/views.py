@@ -27,7 +27,17 @@ from __future__ import absolute_import, division, print_function
 import json
 
 import six
-from flask import Blueprint, current_app, jsonify, request, render_template
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    render_template,
+)
+from werkzeug.utils import import_string
+
+from invenio_records_rest.sorter import default_sorter_factory
 
 from inspirehep.modules.search import LiteratureSearch
 
@@ -118,6 +128,41 @@ def suggest():
     })
 
 
+@blueprint.route('/search/export', methods=['GET'])
+def export():
+    """Stream all the Literature records matching a query in some format.
+
+    Unlike the search API, which serializes a single page of results, the
+    records are scrolled through and serialized in chunks while the
+    response is being sent, so that exports of any size use bounded memory.
+    """
+    export_format = request.values.get('format', 'bibtex')
+    query_string = request.values.get('q', '')
+
+    export_formats = current_app.config['SEARCH_EXPORT_FORMATS']
+    if export_format not in export_formats:
+        abort(400)
+    responsify = import_string(export_formats[export_format])
+
+    try:
+        search = LiteratureSearch().query_from_iq(query_string)
+    except SyntaxError:
+        abort(400)
+    search, _ = default_sorter_factory(search, LiteratureSearch.Meta.index)
+
+    chunk_size = current_app.config['SEARCH_EXPORT_CHUNK_SIZE']
+    search = search.params(
+        size=chunk_size,
+        preserve_order=bool(search.to_dict().get('sort')),
+        _source_exclude=['references'],
+    )
+
+    return responsify(
+        (hit.to_dict() for hit in search.scan()),
+        chunk_size,
+    )
+
+
 def sorted_options(sort_options):
     """Sort sort options for display."""
     return [
@@ -39,12 +39,19 @@ from werkzeug.urls import url_decode
 from inspire_utils.date import format_date as _format_date
 from inspire_utils.dedupers import dedupe_list
 from inspirehep.modules.records.wrappers import LiteratureRecord
-from inspirehep.modules.search import InstitutionsSearch, LiteratureSearch
+from inspirehep.modules.search import (
+    InstitutionsSearch,
+    IQTemplate,
+    LiteratureSearch,
+)
 from inspirehep.utils.jinja2 import render_template_to_string
 from inspirehep.utils.template import render_macro_from_template
 
 from .views import blueprint
 
+PROCEEDINGS_QUERY = IQTemplate('cnum:"{}" and 980__a:proceedings')
+AFFILIATION_QUERY = IQTemplate('affiliation:{}')
+
 
 def apply_template_on_array(array, template_path, **common_context):
     """Render a template specified by 'template_path'.
@@ -222,7 +229,7 @@ def proceedings_link(record):
         return out
 
     records = LiteratureSearch().query_from_iq(
-        'cnum:%s and 980__a:proceedings' % cnum
+        PROCEEDINGS_QUERY, cnum
     ).execute()
 
     if len(records):
@@ -313,7 +320,7 @@ def link_to_hep_affiliation(record):
         return ''
 
     records = InstitutionsSearch().query_from_iq(
-        'affiliation:%s' % icn
+        AFFILIATION_QUERY, icn
     ).execute()
     results = records.hits.total
 
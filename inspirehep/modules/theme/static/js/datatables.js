@@ -49,6 +49,8 @@
               search: "_INPUT_",
               searchPlaceholder: "Filter references..."
             },
+            "serverSide": true,
+            "searchDelay": 500,
             "ajax": {
               "url": "/ajax/references",
               "data": {
@@ -58,7 +60,7 @@
               "method": "GET"
             },
             "fnInitComplete": function(oSettings, json) {
-              if ( json.data.length > 0 ) {
+              if ( json.recordsTotal > 0 ) {
                 $("#references .datatables-loading").hide();
                 $('#references .datatables-wrapper').show();
               }
@@ -72,9 +74,9 @@
 
           $('#record-citations-table').DataTable({
             language: {
-              info: "Showing _START_ to _END_ of " + that.attr.citation_count + " citations"
+              info: "Showing _START_ to _END_ of _TOTAL_ citations"
             },
-            "bPaginate": false,
+            "serverSide": true,
             "ajax": {
               "url": "/ajax/citations",
               "data": {
@@ -84,7 +86,7 @@
               "method": "GET"
             },
             "fnInitComplete": function(oSettings, json) {
-              if ( json.data.length > 0 ) {
+              if ( json.recordsTotal > 0 ) {
                 $("#citations .datatables-loading").hide();
                 $('#citations .datatables-wrapper').show();
               }
@@ -94,7 +96,7 @@
             },
             "aaSorting": [],
             "autoWidth": false,
-            "paging": false,
+            "lengthMenu": [10, 25, 50, 100],
             "searching": false
           });
 
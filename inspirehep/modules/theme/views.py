@@ -57,6 +57,7 @@ from inspirehep.modules.search import (
     DataSearch,
     ExperimentsSearch,
     InstitutionsSearch,
+    IQTemplate,
     JournalsSearch,
     LiteratureSearch
 )
@@ -73,6 +74,8 @@ from inspirehep.utils.record import get_title
 from inspirehep.utils.references import get_and_format_references
 from inspirehep.utils.template import render_macro_from_template
 
+INSTITUTION_PAPERS_QUERY = IQTemplate('authors.affiliations.recid:{}')
+
 CONFERENCE_CATEGORIES_TO_SERIES = [
     {
         'name': 'Accelerators',
@@ -368,18 +371,54 @@ def ping():
 # Handlers for AJAX requests regarding references and citations
 #
 
+RECORDS_DATATABLES_SORT_COLUMNS = {0: 'earliest_date', 1: 'citation_count'}
+
+
+def get_datatables_page(sort_columns):
+    """Get the page requested by a DataTables server-side processing call.
+
+    See: https://datatables.net/manual/server-side.
+
+    :param sort_columns: mapping from the indices of the sortable columns
+        to the fields they are sorted on.
+    :type sort_columns: dict
+    :returns: the draw counter, the index of the first row, the number of
+        rows or ``None`` for all of them, the field to sort on or ``None``,
+        whether to sort in descending order and the search string.
+    :rtype: tuple
+    """
+    draw = request.args.get('draw', 0, type=int)
+    start = max(request.args.get('start', 0, type=int), 0)
+    length = request.args.get('length', -1, type=int)
+    sort = sort_columns.get(request.args.get('order[0][column]', type=int))
+    reverse = request.args.get('order[0][dir]') == 'desc'
+    search = request.args.get('search[value]', '').strip()
+
+    return draw, start, length if length >= 0 else None, sort, reverse, search
+
+
 @blueprint.route('/ajax/references', methods=['GET'])
 def ajax_references():
     """Handler for datatables references view"""
     recid = request.args.get('recid', '')
     endpoint = request.args.get('endpoint', '')
+    draw, start, length, sort, reverse, search = get_datatables_page(
+        RECORDS_DATATABLES_SORT_COLUMNS)
 
     pid_type = get_pid_type_from_endpoint(endpoint)
     pid = PersistentIdentifier.get(pid_type, recid)
 
-    record = LiteratureSearch().get_source(pid.object_uuid)
+    record = LiteratureSearch().get_source(
+        pid.object_uuid, _source=['references'])
+    total, filtered, data = get_and_format_references(
+        record, start, length, sort, reverse, search)
 
-    return jsonify({'data': get_and_format_references(record)})
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': total,
+        'recordsFiltered': filtered,
+        'data': data,
+    })
 
 
 @blueprint.route('/ajax/citations', methods=['GET'])
@@ -387,13 +426,23 @@ def ajax_citations():
     """Handler for datatables citations view"""
     recid = request.args.get('recid', '')
     endpoint = request.args.get('endpoint', '')
+    draw, start, length, sort, reverse, _ = get_datatables_page(
+        RECORDS_DATATABLES_SORT_COLUMNS)
 
     pid_type = get_pid_type_from_endpoint(endpoint)
     pid = PersistentIdentifier.get(pid_type, recid)
 
-    record = LiteratureSearch().get_source(pid.object_uuid)
+    if sort is None:
+        sort, reverse = 'earliest_date', True
+    total, data = get_and_format_citations(
+        int(pid.pid_value), start, length, sort, reverse)
 
-    return jsonify({'data': get_and_format_citations(record)})
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': total,
+        'recordsFiltered': total,
+        'data': data,
+    })
 
 
 #
@@ -426,7 +475,7 @@ def get_institution_papers_from_es(recid):
     :type recid: string
     """
     return LiteratureSearch().query_from_iq(
-        'authors.affiliations.recid:{}'.format(recid)
+        INSTITUTION_PAPERS_QUERY, recid
     ).sort(
         '-earliest_date'
     ).params(
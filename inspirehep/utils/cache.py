@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Caches local to the process, optionally backed by the shared cache."""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from six import text_type
+
+from invenio_cache import current_cache
+
+
+class TwoLevelCache(object):
+    """Cache of values computed from keys, in batches.
+
+    Values are kept in a bounded LRU cache local to the process. When the
+    configuration variable named by ``shared_config`` is set, the values
+    that are missing locally are also looked up in the shared cache, before
+    being computed.
+
+    Args:
+        prefix(str): prefix of the keys in the shared cache.
+        compute(callable): function taking a list of keys and returning a
+            dictionary mapping them to their values. Keys that are missing
+            from the dictionary are not cached.
+        maxsize(int): maximum number of keys cached in the process.
+        shared_config(str): name of the configuration variable enabling
+            the shared cache.
+        shared_timeout_config(str): name of the configuration variable
+            with the timeout in seconds of the values in the shared cache.
+        local_timeout(int): if given, time in seconds after which a value
+            cached in the process is computed again. This bounds how long
+            the processes that did not invalidate a value can use it.
+    """
+
+    def __init__(self, prefix, compute, maxsize, shared_config=None,
+                 shared_timeout_config=None, local_timeout=None):
+        self.prefix = prefix
+        self.compute = compute
+        self.maxsize = maxsize
+        self.shared_config = shared_config
+        self.shared_timeout_config = shared_timeout_config
+        self.local_timeout = local_timeout
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_key(self, key):
+        if isinstance(key, tuple):
+            key = u'::'.join(text_type(el) for el in key)
+        return u'{0}::{1}'.format(self.prefix, key)
+
+    def _use_shared(self):
+        return bool(
+            self.shared_config and has_app_context() and
+            current_app.config.get(self.shared_config)
+        )
+
+    def _get_local(self, keys):
+        now = time.time()
+        values = {}
+        with self._lock:
+            for key in keys:
+                if key not in self._values:
+                    continue
+                value, expires = self._values.pop(key)
+                if expires is not None and expires < now:
+                    continue
+                # Mark the key as the most recently used one.
+                self._values[key] = value, expires
+                values[key] = value
+            self.hits += len(values)
+        return values
+
+    def _set_local(self, values):
+        expires = None
+        if self.local_timeout is not None:
+            expires = time.time() + self.local_timeout
+
+        with self._lock:
+            for key, value in values.items():
+                self._values.pop(key, None)
+                self._values[key] = value, expires
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def _get_shared(self, keys):
+        shared_keys = [self._shared_key(key) for key in keys]
+        values = dict(
+            (key, value) for key, value
+            in zip(keys, current_cache.get_many(*shared_keys))
+            if value is not None
+        )
+        self.shared_hits += len(values)
+        return values
+
+    def _set_shared(self, values):
+        current_cache.set_many(
+            dict((self._shared_key(key), value) for key, value in values.items()),
+            timeout=current_app.config[self.shared_timeout_config],
+        )
+
+    def get_many(self, keys):
+        """Return a dictionary mapping each of ``keys`` to its value."""
+        keys = set(keys)
+        values = self._get_local(keys)
+
+        missing = [key for key in keys if key not in values]
+        if not missing:
+            return values
+
+        use_shared = self._use_shared()
+        if use_shared:
+            shared_values = self._get_shared(missing)
+            self._set_local(shared_values)
+            values.update(shared_values)
+            missing = [key for key in missing if key not in shared_values]
+
+        if missing:
+            self.misses += len(missing)
+            computed = self.compute(missing)
+            self._set_local(computed)
+            if use_shared and computed:
+                self._set_shared(computed)
+            values.update(computed)
+
+        return values
+
+    def get(self, key, default=None):
+        """Return the value of ``key``, or ``default`` if it has none."""
+        return self.get_many([key]).get(key, default)
+
+    def delete_many(self, keys):
+        """Drop ``keys`` from the local and the shared caches."""
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+        if keys and self._use_shared():
+            current_cache.delete_many(*[self._shared_key(key) for key in keys])
+
+    def info(self):
+        """Return the counters of the cache."""
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0,
+            'size': len(self._values),
+        }
+
+    def clear(self):
+        """Empty the local cache and reset its counters."""
+        with self._lock:
+            self._values.clear()
+            self.hits = self.shared_hits = self.misses = 0
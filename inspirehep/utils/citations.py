@@ -22,41 +22,98 @@
 
 from __future__ import absolute_import, division, print_function
 
+from six import text_type
+
+from inspirehep.modules.records.citations import citers_of
 from inspirehep.modules.search import LiteratureSearch
-from inspirehep.utils.jinja2 import render_template_to_string
+from inspirehep.utils.references import REFERENCE_FIELDS
+from inspirehep.utils.template import get_template_module
 
 
-def get_and_format_citations(record):
-    result = []
+# Default ``index.max_result_window`` of ES: hits past it cannot be paged.
+MAX_RESULT_WINDOW = 10000
 
-    citations = LiteratureSearch().query(
-        'match', references__recid=record['control_number'],
-    ).params(
-        _source=[
-            'citation_count',
-            'control_number',
-            'earliest_date',
-            'titles',
-        ]
-    ).execute().hits
 
+def get_and_format_citations(recid, start=0, length=None,
+                             sort='earliest_date', reverse=True):
+    """Render a page of the records citing a record.
+
+    Only the citing records in the page are fetched from ElasticSearch,
+    already sorted, and the page is rendered with a single template module.
+    Pages ending past ``MAX_RESULT_WINDOW`` are instead cut from the recids
+    of the citing records, sorted on the field alone.
+
+    Args:
+        recid(int): the recid of the cited record.
+        start(int): index of the first citation of the page.
+        length(Optional[int]): number of citations in the page, all of the
+            remaining ones if ``None``.
+        sort(str): field of the citing records to sort on, like
+            ``citation_count`` or ``earliest_date``.
+        reverse(bool): whether to sort in descending order.
+
+    Returns:
+        tuple: the total number of citations and the rows of the page.
+    """
+    citers = citers_of(recid)
+    if not citers:
+        return 0, []
+
+    end = len(citers) if length is None else start + length
+    if end <= MAX_RESULT_WINDOW:
+        citations = LiteratureSearch().filter(
+            'terms', control_number=citers,
+        ).sort({
+            sort: {'order': 'desc' if reverse else 'asc', 'missing': '_last'},
+        }).params(
+            _source=REFERENCE_FIELDS,
+        )[start:end].execute()
+        total = citations.hits.total
+        citations = [citation.to_dict() for citation in citations.hits]
+    else:
+        total, citations = _get_deep_page(citers, start, end, sort, reverse)
+
+    template = get_template_module('inspirehep_theme/citations.html')
+    result = []
     for citation in citations:
-        citation_from_es = LiteratureSearch().get_source(citation.meta.id)
-        row = []
+        result.append([
+            text_type(template.render_citation(citation)),
+            citation.get('citation_count', 0),
+        ])
 
-        row.append(
-            render_template_to_string(
-                'inspirehep_theme/citations.html',
-                record=citation_from_es,
-            )
-        )
+    return total, result
 
-        try:
-            citation_count = citation.citation_count
-        except AttributeError:
-            citation_count = 0
-        row.append(citation_count)
 
-        result.append(row)
+def _get_deep_page(citers, start, end, sort, reverse):
+    keys = LiteratureSearch().filter(
+        'terms', control_number=citers,
+    ).params(
+        _source=['control_number', sort],
+    )
+
+    present = []
+    missing = []
+    for hit in keys.scan():
+        hit = hit.to_dict()
+        if hit.get(sort) is None:
+            missing.append(hit['control_number'])
+        else:
+            present.append((hit[sort], hit['control_number']))
+    present.sort(reverse=reverse)
+    recids = [recid for _, recid in present] + sorted(missing)
+
+    page = recids[start:end]
+    if not page:
+        return len(recids), []
+
+    citations = LiteratureSearch().filter(
+        'terms', control_number=page,
+    ).params(
+        _source=REFERENCE_FIELDS,
+    )[0:len(page)].execute()
+    by_recid = dict(
+        (citation['control_number'], citation)
+        for citation in (hit.to_dict() for hit in citations.hits)
+    )
 
-    return result
+    return len(recids), [by_recid[recid] for recid in page if recid in by_recid]
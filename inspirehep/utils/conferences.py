@@ -22,11 +22,18 @@
 
 from __future__ import absolute_import, division, print_function
 
-from inspirehep.modules.search import ConferencesSearch, LiteratureSearch
+from inspirehep.modules.search import (
+    ConferencesSearch,
+    IQTemplate,
+    LiteratureSearch,
+)
 from inspirehep.utils.jinja2 import render_template_to_string
 from inspirehep.utils.record import get_title
 from inspirehep.utils.template import render_macro_from_template
 
+SERIES_QUERY = IQTemplate('series:"{}"')
+CONTRIBUTIONS_QUERY = IQTemplate('cnum:"{}"')
+
 
 def render_conferences_in_the_same_series(recid, seriesname):
     """Conference export for single record in datatables format.
@@ -51,9 +58,8 @@ def render_conferences_contributions(cnum):
 
 def conferences_in_the_same_series_from_es(seriesname):
     """Query ES for conferences in the same series."""
-    query = 'series:"{}"'.format(seriesname)
     return ConferencesSearch().query_from_iq(
-        query
+        SERIES_QUERY, seriesname
     ).params(
         _source=[
             'control_number',
@@ -67,9 +73,8 @@ def conferences_in_the_same_series_from_es(seriesname):
 
 def conferences_contributions_from_es(cnum):
     """Query ES for conferences in the same series."""
-    query = 'cnum:"{}"'.format(cnum)
     return LiteratureSearch().query_from_iq(
-        query
+        CONTRIBUTIONS_QUERY, cnum
     ).params(
         size=100,
         _source=[
@@ -25,7 +25,10 @@ from __future__ import absolute_import, division, print_function
 from inspirehep.utils.record import get_title
 from inspirehep.utils.template import render_macro_from_template
 
-from inspirehep.modules.search import AuthorsSearch, LiteratureSearch
+from inspirehep.modules.search import AuthorsSearch, IQTemplate, LiteratureSearch
+
+CONTRIBUTIONS_QUERY = IQTemplate('accelerator_experiments.experiment:"{}"')
+PEOPLE_QUERY = IQTemplate('experiments.name:"{}"')
 
 
 def render_experiment_contributions(experiment_name):
@@ -52,9 +55,8 @@ def render_experiment_people(experiment_name):
 
 def experiment_contributions_from_es(experiment_name):
     """Query ES for conferences in the same series."""
-    query = 'accelerator_experiments.experiment:"{}"'.format(experiment_name)
     return LiteratureSearch().query_from_iq(
-        query
+        CONTRIBUTIONS_QUERY, experiment_name
     ).params(
         size=100,
         _source=[
@@ -71,9 +73,8 @@ def experiment_contributions_from_es(experiment_name):
 
 def experiment_people_from_es(experiment_name):
     """Query ES for conferences in the same series."""
-    query = 'experiments.name:"{}"'.format(experiment_name)
     return AuthorsSearch().query_from_iq(
-        query
+        PEOPLE_QUERY, experiment_name
     ).execute().hits
 
 
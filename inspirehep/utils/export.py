@@ -44,8 +44,9 @@ class MissingRequiredFieldError(LookupError):
 class Export(object):
     """Base class used for export formats."""
 
-    def __init__(self, record, *args, **kwargs):
+    def __init__(self, record, from_es=False, *args, **kwargs):
         self.record = record
+        self.from_es = from_es
 
     def _get_citation_key(self):
         """Returns citation keys."""
@@ -134,9 +135,18 @@ class Export(object):
         return cite_line
 
     def _get_citation_number(self):
-        """Returns how many times record was cited. If 0, returns nothing"""
+        """Returns how many times record was cited. If 0, returns nothing
+
+        The citation count of a record coming from ES is used directly, as
+        uncited records have none. It is only fetched from ES for records
+        coming from the DB.
+        """
         today = time.strftime("%d %b %Y")
-        record = get_es_record('lit', self.record['control_number'])
+        record = self.record
+        if self.from_es:
+            record = {'citation_count': record.get('citation_count', 0)}
+        elif 'citation_count' not in record:
+            record = get_es_record('lit', record['control_number'])
         citations = ''
         try:
             times_cited = record['citation_count']
@@ -32,8 +32,8 @@ class Latex(Export):
 
     """Class used to output LaTex format."""
 
-    def __init__(self, record, latex_format):
-        super(Latex, self).__init__(record)
+    def __init__(self, record, latex_format, from_es=False):
+        super(Latex, self).__init__(record, from_es=from_es)
         self.latex_format = latex_format
 
     def format(self):
@@ -29,9 +29,17 @@ from functools import wraps
 from flask import current_app
 from werkzeug.utils import import_string
 
-from invenio_pidstore.models import PersistentIdentifier
+from inspirehep.modules.pidstore.utils import (
+    get_endpoint_from_pid_type,
+    get_pid_from_uuid,
+    get_pids,
+    get_uuid_from_pid,
+)
 
-from inspirehep.modules.pidstore.utils import get_endpoint_from_pid_type
+try:
+    from functools import lru_cache
+except ImportError:
+    from functools32 import lru_cache
 
 
 class RecordGetterError(Exception):
@@ -62,40 +70,83 @@ def raise_record_getter_error_and_log(f):
     return wrapper
 
 
-@raise_record_getter_error_and_log
-def get_es_record(pid_type, recid, **kwargs):
-    pid = PersistentIdentifier.get(pid_type, recid)
+@lru_cache()
+def _import_search_class(import_path):
+    return import_string(import_path)
 
+
+def get_search_class(pid_type):
+    """Return the search class of the records of a PID type."""
     endpoint = get_endpoint_from_pid_type(pid_type)
     search_conf = current_app.config['RECORDS_REST_ENDPOINTS'][endpoint]
-    search_class = import_string(search_conf['search_class'])()
+    return _import_search_class(search_conf['search_class'])
+
 
-    return search_class.get_source(pid.object_uuid, **kwargs)
+def get_uuids_by_recid(pid_type, recids):
+    """Return a dictionary mapping the given recids to UUIDs of records.
+
+    Recids are strings in the result, and those not found are missing.
+    """
+    return dict(
+        (recid, object_uuid) for recid, (object_uuid, _)
+        in get_pids(pid_type, recids).items()
+    )
+
+
+@raise_record_getter_error_and_log
+def get_es_record(pid_type, recid, **kwargs):
+    object_uuid = get_uuid_from_pid(pid_type, recid)
+
+    search_class = get_search_class(pid_type)()
+
+    return search_class.get_source(object_uuid, **kwargs)
 
 
 def get_es_records(pid_type, recids, **kwargs):
-    """Get a list of recids from ElasticSearch."""
-    recids = [str(recid) for recid in recids]
-    uuids = PersistentIdentifier.query.filter(
-        PersistentIdentifier.pid_value.in_(recids),
-        PersistentIdentifier.pid_type == pid_type
-    ).all()
-    uuids = [str(uuid.object_uuid) for uuid in uuids]
+    """Get a list of recids from ElasticSearch.
 
-    endpoint = get_endpoint_from_pid_type(pid_type)
-    search_conf = current_app.config['RECORDS_REST_ENDPOINTS'][endpoint]
-    search_class = import_string(search_conf['search_class'])()
+    Returns one record per recid, in the same order, with ``None`` for the
+    recids not found. The ``errors`` attribute of the result lists the
+    chunks of records that could not be fetched.
+    """
+    from inspirehep.modules.search.api import MultiGetResult
+    uuids = get_uuids_by_recid(pid_type, recids)
 
-    return search_class.mget(uuids, **kwargs)
+    search_class = get_search_class(pid_type)()
+    records = search_class.mget(
+        [str(uuid) for uuid in uuids.values()], **kwargs)
+    sources = dict(zip(uuids, records))
+
+    return MultiGetResult(
+        [sources.get(str(recid)) for recid in recids], records.errors)
+
+
+@raise_record_getter_error_and_log
+def get_es_records_by_recid(pid_type, recids):
+    """Return a dictionary mapping recids to records in ElasticSearch.
+
+    Only one query is made to the DB, and the records are fetched from
+    ElasticSearch in chunks. Recids are strings in the result, and those
+    not found are missing.
+    """
+    uuids = get_uuids_by_recid(pid_type, recids)
+    if not uuids:
+        return {}
+
+    search_class = get_search_class(pid_type)()
+    records = search_class.mget([str(uuid) for uuid in uuids.values()])
+
+    return dict(
+        (recid, record) for recid, record in zip(uuids, records)
+        if record is not None
+    )
 
 
 @raise_record_getter_error_and_log
 def get_es_record_by_uuid(uuid):
-    pid = PersistentIdentifier.query.filter_by(object_uuid=uuid).one()
+    pid_type, _ = get_pid_from_uuid(uuid)
 
-    endpoint = get_endpoint_from_pid_type(pid.pid_type)
-    search_conf = current_app.config['RECORDS_REST_ENDPOINTS'][endpoint]
-    search_class = import_string(search_conf['search_class'])()
+    search_class = get_search_class(pid_type)()
 
     return search_class.get_source(uuid)
 
@@ -103,5 +154,28 @@ def get_es_record_by_uuid(uuid):
 @raise_record_getter_error_and_log
 def get_db_record(pid_type, recid):
     from inspirehep.modules.records.api import InspireRecord
-    pid = PersistentIdentifier.get(pid_type, recid)
-    return InspireRecord.get_record(pid.object_uuid)
+    object_uuid = get_uuid_from_pid(pid_type, recid)
+    return InspireRecord.get_record(object_uuid)
+
+
+@raise_record_getter_error_and_log
+def get_db_records_by_recid(pid_type, recids):
+    """Return a dictionary mapping recids to records in the DB.
+
+    Only two queries are made to the DB. Recids are strings in the result,
+    and those not found are missing.
+    """
+    from inspirehep.modules.records.api import InspireRecord
+    uuids = get_uuids_by_recid(pid_type, recids)
+    if not uuids:
+        return {}
+
+    records = dict(
+        (record.id, record)
+        for record in InspireRecord.get_records(list(uuids.values()))
+    )
+
+    return dict(
+        (recid, records[uuid]) for recid, uuid in uuids.items()
+        if uuid in records
+    )
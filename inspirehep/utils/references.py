@@ -22,67 +22,130 @@
 
 from __future__ import absolute_import, division, print_function
 
+import json
 import os
 from contextlib import contextmanager
+from operator import itemgetter
 
 from flask import current_app
+from six import text_type
 
 from inspire_schemas.api import ReferenceBuilder
 from inspire_utils.helpers import force_list
 
-from inspirehep.utils.jinja2 import render_template_to_string
 from inspirehep.utils.record_getter import get_es_records
+from inspirehep.utils.template import get_template_module
 from inspirehep.utils.url import retrieve_uri
 
 
-def get_and_format_references(record):
-    out = []
-    references = record.get('references')
-    if references:
-        reference_recids = [
-            str(ref['recid']) for ref in references if ref.get('recid')
-        ]
+REFERENCE_FIELDS = [
+    'authors',
+    'citation_count',
+    'collaboration',
+    'control_number',
+    'corporate_author',
+    'earliest_date',
+    'publication_info',
+    'titles',
+]
+"""Fields of the referenced records needed to render a reference."""
+
+
+def _sort_references(references, sort, reverse=False):
+    """Sort references on a field of the records they point to.
+
+    Only the sort field of the referenced records is fetched. References
+    without a record, or whose record lacks the field, come last.
+    """
+    reference_recids = [
+        str(ref['recid']) for ref in references if ref.get('recid')
+    ]
+    records = iter(get_es_records('lit', reference_recids, _source=[sort]))
+
+    with_value, without_value = [], []
+    for reference in references:
+        value = None
+        if reference.get('recid'):
+            value = (next(records) or {}).get(sort)
+        if value is None:
+            without_value.append(reference)
+        else:
+            with_value.append((value, reference))
+
+    with_value.sort(key=itemgetter(0), reverse=reverse)
+
+    return [reference for _, reference in with_value] + without_value
+
+
+def _filter_references(references, search):
+    """Keep the references whose metadata contains ``search``."""
+    search = search.lower()
+
+    return [
+        reference for reference in references
+        if search in json.dumps(reference, ensure_ascii=False).lower()
+    ]
+
+
+def get_and_format_references(record, start=0, length=None, sort=None,
+                              reverse=False, search=None):
+    """Render a page of the references of a record.
+
+    Only the records referenced in the page are fetched, and the page is
+    rendered with a single template module.
+
+    Args:
+        record(dict): the citing record.
+        start(int): index of the first reference of the page.
+        length(Optional[int]): number of references in the page, all of
+            the remaining ones if ``None``.
+        sort(Optional[str]): field of the referenced records to sort on,
+            like ``citation_count`` or ``earliest_date``. References are in
+            the order of the record if ``None``.
+        reverse(bool): whether to sort in descending order.
+        search(Optional[str]): only keep the references containing it.
+
+    Returns:
+        tuple: the total number of references, the number of references
+        matching ``search``, and the rows of the page.
+    """
+    references = record.get('references', [])
+    total = len(references)
+
+    if search:
+        references = _filter_references(references, search)
+    if sort:
+        references = _sort_references(references, sort, reverse)
+
+    filtered = len(references)
+    end = None if length is None else start + length
+    references = references[start:end]
 
-        resolved_references = get_es_records(
-            'lit',
-            reference_recids,
-            _source=[
-                'authors',
-                'citation_count',
-                'collaboration',
-                'control_number',
-                'corporate_author',
-                'earliest_date',
-                'publication_info',
-                'titles',
-            ]
-        )
-
-        # Create mapping to keep reference order
-        recid_to_reference = {
-            ref['control_number']: ref for ref in resolved_references
-        }
-        for reference in references:
-            row = []
-            ref_record = recid_to_reference.get(
-                reference.get('recid'), {}
+    reference_recids = [
+        str(ref['recid']) for ref in references if ref.get('recid')
+    ]
+    records = iter(get_es_records(
+        'lit', reference_recids, _source=REFERENCE_FIELDS))
+
+    template = get_template_module('inspirehep_theme/references.html')
+    out = []
+    for reference in references:
+        ref_record = {}
+        if reference.get('recid'):
+            ref_record = next(records) or {}
+        if 'reference' in reference:
+            reference.update(reference['reference'])
+            del reference['reference']
+        if 'publication_info' in reference:
+            reference['publication_info'] = force_list(
+                reference['publication_info']
             )
-            if 'reference' in reference:
-                reference.update(reference['reference'])
-                del reference['reference']
-            if 'publication_info' in reference:
-                reference['publication_info'] = force_list(
-                    reference['publication_info']
-                )
-            row.append(render_template_to_string(
-                'inspirehep_theme/references.html',
-                record=ref_record,
-                reference=reference
-            ))
-            row.append(ref_record.get('citation_count', ''))
-            out.append(row)
-
-    return out
+        out.append([
+            text_type(template.render_reference(ref_record, reference)),
+            ref_record.get('citation_count', ''),
+        ])
+
+    return total, filtered, out
 
 
 def map_refextract_to_schema(extracted_references, source=None):
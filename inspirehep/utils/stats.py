@@ -59,3 +59,22 @@ def calculate_i10_index(citations):
     :return: i10-index of the dictionary of citations.
     """
     return len([_ for _, count in citations.items() if count >= 10])
+
+
+def calculate_h_index_from_sorted(citation_counts):
+    """
+    Calculate the h-index of citation counts sorted in decreasing order.
+
+    Consumes only the first h + 1 elements of ``citation_counts``, so it
+    can be fed a lazy stream of citation counts.
+
+    :param citation_counts: an iterable of citation counts, highest first.
+    :return: h-index of the citation counts.
+    """
+    h_index = 0
+    for count in citation_counts:
+        if not count or count <= h_index:
+            break
+        h_index += 1
+
+    return h_index
@@ -45,3 +45,24 @@ def render_macro_from_template(name, template, app=None, ctx=None):
     tpl = app.jinja_env.get_template(template)
     macro = getattr(tpl.make_module(), name)
     return unicode(macro(**ctx))
+
+
+def get_template_module(template, app=None, ctx=None):
+    """Get the module of a template, to call its macros many times.
+
+    The template is compiled, its imports are evaluated and the template
+    context processors run only once, whereas ``render_template_to_string``
+    does all of it every time it renders a template.
+
+    :param template: template name.
+    :type template: string.
+    :param app: Flask app.
+    :type app: object.
+    :param ctx: variables of the template context.
+    :type ctx: dict.
+    :return: module exposing the macros of the template as attributes.
+    """
+    ctx = dict(ctx or {})
+    app = app or current_app
+    app.update_template_context(ctx)
+    return app.jinja_env.get_template(template).make_module(ctx)
@@ -59,6 +59,7 @@ install_requires = [
     'elasticsearch~=2.0,>=2.4.1',
     'flask-shell-ipython~=0.0,>=0.3.0',
     'fs~=0.0,>=0.5.4',
+    'functools32~=3.0,>=3.2.3; python_version < "3"',
     'inspire-crawler~=1.0',
     'inspire-dojson~=58.0,>=58.0.0',
     'inspire-json-merger~=7.0,>=7.0.0',
@@ -141,6 +142,9 @@ extras_require = {
         'invenio-xrootd>=1.0.0a5',
         'xrootdpyfs~=0.0,>=0.1.5',
     ],
+    'zstd': [
+        'zstandard~=0.0,>=0.9.0',
+    ],
 }
 
 extras_require['all'] = []
@@ -216,6 +220,7 @@ setup(
             'inspire_hal = inspirehep.modules.hal:InspireHAL',
             'inspire_literaturesuggest = inspirehep.modules.literaturesuggest:InspireLiteratureSuggest',
             'inspire_migrator = inspirehep.modules.migrator:InspireMigrator',
+            'inspire_records = inspirehep.modules.records:InspireRecords',
             'inspire_search = inspirehep.modules.search:InspireSearch',
             'inspire_theme = inspirehep.modules.theme:INSPIRETheme',
             'inspire_tools = inspirehep.modules.tools:InspireTools',
@@ -234,6 +239,7 @@ setup(
             'inspirehep = inspirehep:alembic',
         ],
         'invenio_db.models': [
+            'inspire_records = inspirehep.modules.records.models',
             'inspire_workflows_audit = inspirehep.modules.workflows.models',
         ],
         'invenio_jsonschemas.schemas': [
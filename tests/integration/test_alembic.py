@@ -22,8 +22,12 @@
 
 from __future__ import absolute_import, division, print_function
 
+import hashlib
+import json
+import zlib
+
 import pytest
-from sqlalchemy import inspect
+from sqlalchemy import LargeBinary, bindparam, inspect, text
 
 from invenio_db.utils import drop_alembic_version_table
 from invenio_db import db
@@ -110,3 +114,132 @@ def test_alembic_revision_cb5153afd839(alembic_app):
     assert 'workflows_record_sources' not in inspector.get_table_names()
 
     drop_alembic_version_table()
+
+
+def test_alembic_revision_2a8b0c3d4e5f(alembic_app):
+    ext = alembic_app.extensions['invenio-db']
+
+    if db.engine.name == 'sqlite':
+        raise pytest.skip('Upgrades are not supported on SQLite.')
+
+    db.drop_all()
+    drop_alembic_version_table()
+
+    inspector = inspect(db.engine)
+    assert 'records_citations' not in inspector.get_table_names()
+
+    ext.alembic.upgrade(target='cb5153afd839')
+    db.session.execute(
+        "INSERT INTO records_metadata (id, created, updated, json, version_id) "
+        "VALUES ('1f3a4c36-8e0e-4b0c-9d5d-9a2b5b0f6c1e', now(), now(), :json, 1)",
+        {'json': json.dumps({
+            '$schema': 'http://localhost:5000/schemas/records/hep.json',
+            'control_number': 2,
+            'references': [
+                {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+                {'reference': {'title': {'title': 'Not a record'}}},
+            ],
+        })},
+    )
+    db.session.commit()
+
+    ext.alembic.upgrade(target='2a8b0c3d4e5f')
+    inspector = inspect(db.engine)
+    assert 'records_citations' in inspector.get_table_names()
+
+    expected = [(2, 1)]
+    result = [tuple(row) for row in db.session.execute(
+        'SELECT citer_recid, cited_recid FROM records_citations'
+    )]
+
+    assert expected == result
+
+    ext.alembic.downgrade(target='cb5153afd839')
+    inspector = inspect(db.engine)
+    assert 'records_citations' not in inspector.get_table_names()
+
+    drop_alembic_version_table()
+
+
+def test_alembic_revision_3b9c1d4e5f6a(alembic_app):
+    ext = alembic_app.extensions['invenio-db']
+
+    if db.engine.name == 'sqlite':
+        raise pytest.skip('Upgrades are not supported on SQLite.')
+
+    db.drop_all()
+    drop_alembic_version_table()
+
+    inspector = inspect(db.engine)
+    assert 'records_references' not in inspector.get_table_names()
+
+    ext.alembic.upgrade(target='2a8b0c3d4e5f')
+    db.session.execute(
+        "INSERT INTO records_metadata (id, created, updated, json, version_id) "
+        "VALUES ('6c3dcb2b-3ebe-4e7d-b8b4-4e5a0e9e4ac8', now(), now(), :json, 1)",
+        {'json': json.dumps({
+            '$schema': 'http://localhost:5000/schemas/records/hep.json',
+            'references': [
+                {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+            ],
+        })},
+    )
+    db.session.commit()
+
+    ext.alembic.upgrade(target='3b9c1d4e5f6a')
+    inspector = inspect(db.engine)
+    assert 'records_references' in inspector.get_table_names()
+
+    expected = [(
+        'http://localhost:5000/api/literature/1',
+        'references.record',
+    )]
+    result = [tuple(row) for row in db.session.execute(
+        'SELECT ref, path FROM records_references'
+    )]
+
+    assert expected == result
+
+    ext.alembic.downgrade(target='2a8b0c3d4e5f')
+    inspector = inspect(db.engine)
+    assert 'records_references' not in inspector.get_table_names()
+
+    drop_alembic_version_table()
+
+
+def test_alembic_revision_4c0e2f5a6b7d(alembic_app):
+    ext = alembic_app.extensions['invenio-db']
+
+    if db.engine.name == 'sqlite':
+        raise pytest.skip('Upgrades are not supported on SQLite.')
+
+    db.drop_all()
+    drop_alembic_version_table()
+
+    ext.alembic.upgrade(target='3b9c1d4e5f6a')
+    db.session.execute(
+        text(
+            "INSERT INTO inspire_prod_records (recid, last_updated, marcxml) "
+            "VALUES (1, now(), :marcxml)"
+        ).bindparams(bindparam('marcxml', type_=LargeBinary)),
+        {'marcxml': zlib.compress(b'<record></record>')},
+    )
+    db.session.commit()
+
+    ext.alembic.upgrade(target='4c0e2f5a6b7d')
+    inspector = inspect(db.engine)
+    assert 'inspire_prod_records_dictionaries' in inspector.get_table_names()
+
+    expected = (hashlib.sha1(b'<record></record>').hexdigest(), None)
+    result = tuple(db.session.execute(
+        'SELECT marcxml_hash, converter_version FROM inspire_prod_records '
+        'WHERE recid = 1'
+    ).first())
+
+    assert expected == result
+
+    ext.alembic.downgrade(target='3b9c1d4e5f6a')
+    inspector = inspect(db.engine)
+    assert 'inspire_prod_records_dictionaries' not in inspector.get_table_names()
+
+    drop_alembic_version_table()
@@ -195,3 +195,41 @@ def test_api_author_stats(api_client):
 
     assert validate(response_json, schema) is None
     assert len(response_json['keywords']) == 12
+
+
+def test_api_authors_stats_count_one_type_per_publication(api_client):
+    response = api_client.get('/authors/1061000/stats')
+
+    assert response.status_code == 200
+
+    response_json = json.loads(response.data)
+
+    assert sum(response_json['types'].values()) == response_json['publications']
+    assert 'peer reviewed' not in response_json['types']
+
+
+def test_api_author_profile(api_client):
+    response = api_client.get('/authors/1061000/profile')
+
+    assert response.status_code == 200
+
+    response_json = json.loads(response.data)
+
+    expected = json.loads(api_client.get('/authors/1061000/stats').data)
+    result = response_json['stats']
+
+    assert expected == result
+
+    expected = sorted(
+        json.loads(api_client.get('/authors/1061000/coauthors').data),
+        key=lambda coauthor: coauthor['id'])
+    result = sorted(response_json['coauthors'], key=lambda coauthor: coauthor['id'])
+
+    assert expected == result
+
+    expected = sorted(
+        json.loads(api_client.get('/authors/1061000/publications').data),
+        key=lambda publication: publication['id'])
+    result = sorted(response_json['publications'], key=lambda publication: publication['id'])
+
+    assert expected == result
@@ -22,6 +22,15 @@
 
 from __future__ import absolute_import, division, print_function
 
+from invenio_db import db
+
+from inspirehep.modules.records.api import InspireRecord
+from inspirehep.modules.records.citations import (
+    build_citation_graph,
+    citation_count,
+    citers_of,
+    references_of,
+)
 from inspirehep.utils.record_getter import get_es_record
 
 
@@ -37,3 +46,93 @@ def test_citation_counts_are_correct(app):
     assert get_citation_count(1430091) == 1
     assert get_citation_count(452060) == 1
     assert get_citation_count(1496635) == 1
+
+
+def test_citation_counts_are_updated_incrementally(app):
+    def get_citation_count(recid):
+        return get_es_record('lit', recid).get('citation_count', 0)
+
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/712925'}},
+        ],
+        '_collections': ['Literature']
+    }
+
+    record = InspireRecord.create(json)
+    db.session.commit()
+
+    assert get_citation_count(712925) == 3
+    assert get_citation_count(451647) == 2
+
+    record['references'] = [
+        {'record': {'$ref': 'http://localhost:5000/api/literature/451647'}},
+    ]
+    record.commit()
+    db.session.commit()
+
+    assert get_citation_count(712925) == 2
+    assert get_citation_count(451647) == 3
+
+    record._delete(force=True)
+    db.session.commit()
+
+    assert get_citation_count(712925) == 2
+    assert get_citation_count(451647) == 2
+
+
+def test_citation_graph_is_built_at_migration(app):
+    assert citation_count(712925) == 2
+    assert citation_count(1430091) == 1
+
+    citers = citers_of(712925)
+
+    assert len(citers) == 2
+    for citer in citers:
+        assert 712925 in references_of(citer)
+
+
+def test_citation_graph_is_updated_on_commit(app):
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/712925'}},
+        ],
+        '_collections': ['Literature']
+    }
+
+    record = InspireRecord.create(json)
+    db.session.commit()
+
+    assert record['control_number'] in citers_of(712925)
+    assert references_of(record['control_number']) == [712925]
+    assert citation_count(712925) == 3
+
+    record._delete(force=True)
+    db.session.commit()
+
+    assert record['control_number'] not in citers_of(712925)
+    assert citation_count(712925) == 2
+
+
+def test_build_citation_graph_matches_the_incremental_one(app):
+    expected = sorted(citers_of(451647))
+
+    build_citation_graph()
+
+    result = sorted(citers_of(451647))
+
+    assert expected == result
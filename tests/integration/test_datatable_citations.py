@@ -22,8 +22,25 @@
 
 from __future__ import absolute_import, division, print_function
 
+import json
+
 
 def test_citations(app_client):
     """Tests if citation datatables work for records."""
     response = app_client.get('/ajax/citations?recid=712925&endpoint=literature')
     assert response.status_code == 200
+
+
+def test_citations_returns_the_requested_page(app_client):
+    """Tests if citation datatables only return the requested page."""
+    response = app_client.get(
+        '/ajax/citations?recid=712925&endpoint=literature'
+        '&draw=3&start=0&length=1&order[0][column]=1&order[0][dir]=desc'
+    )
+    assert response.status_code == 200
+
+    result = json.loads(response.data)
+
+    assert result['draw'] == 3
+    assert result['recordsFiltered'] <= result['recordsTotal']
+    assert len(result['data']) == min(1, result['recordsFiltered'])
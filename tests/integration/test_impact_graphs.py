@@ -26,6 +26,10 @@ from __future__ import absolute_import, division, print_function
 
 import json
 
+from mock import patch
+
+from inspirehep.modules.records.citations import invalidate_impact_graphs
+
 
 def test_impact_graphs_api(api_client):
     """Test response of impact graph API."""
@@ -38,3 +42,45 @@ def test_impact_graphs_api(api_client):
     assert result['title'] == u'PYTHIA 6.4 Physics and Manual'
     assert result['year'] == u'2006'
     assert len(result['citations']) == 2
+    assert result['citation_count'] == 2
+    assert result['citations_by_year']
+    assert not result['sampled']
+
+
+def test_impact_graphs_api_is_sampled(api, api_client):
+    """Test that only the most cited citers are in the impact graph."""
+    with api.app_context():
+        invalidate_impact_graphs([712925])
+
+    with patch.dict(api.config, {'IMPACT_GRAPH_MAX_CITATIONS': 1}):
+        result = api_client.get(
+            "/literature/712925",
+            headers={"Accept": "application/x-impact.graph+json"}
+        )
+
+    with api.app_context():
+        invalidate_impact_graphs([712925])
+
+    result = json.loads(result.data)
+    assert len(result['citations']) == 1
+    assert result['citation_count'] == 2
+    assert result['sampled']
+
+
+def test_impact_graphs_api_is_not_modified(api_client):
+    """Test that an impact graph is not sent again when it did not change."""
+    result = api_client.get(
+        "/literature/712925",
+        headers={"Accept": "application/x-impact.graph+json"}
+    )
+    assert result.status_code == 200
+    etag = result.headers['ETag']
+
+    result = api_client.get(
+        "/literature/712925",
+        headers={
+            "Accept": "application/x-impact.graph+json",
+            "If-None-Match": etag,
+        }
+    )
+    assert result.status_code == 304
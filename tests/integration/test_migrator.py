@@ -28,10 +28,19 @@ import zlib
 
 import pytest
 from flask import current_app
+from mock import patch
 from redis import StrictRedis
 
+from invenio_db import db
+
 from inspirehep.modules.migrator.models import InspireProdRecords
-from inspirehep.modules.migrator.tasks import continuous_migration
+from inspirehep.modules.migrator.tasks import (
+    continuous_migration,
+    get_continuous_migration_stats,
+    get_shards_progress,
+    migrate_chunk,
+    migrate_sharded,
+)
 from inspirehep.utils.record_getter import get_db_record
 
 from utils import _delete_record
@@ -76,6 +85,48 @@ def record_1502655_and_1502656():
     _delete_record('lit', 1502656)
 
 
+@pytest.fixture(scope='function')
+def dump_with_1502655_and_1502656(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write(b''.join([
+        b'<collection>\n',
+        pkg_resources.resource_string(
+            __name__, os.path.join('fixtures', '1502655.xml')),
+        pkg_resources.resource_string(
+            __name__, os.path.join('fixtures', '1502656.xml')),
+        b'</collection>\n',
+    ]), mode='wb')
+
+    yield str(dump)
+
+    _delete_record('aut', 1502655)
+    _delete_record('lit', 1502656)
+
+
+@pytest.fixture(scope='function')
+def chunk_with_invalid_record():
+    record1 = pkg_resources.resource_string(
+        __name__, os.path.join('fixtures', '1502656.xml'))
+    record2 = (
+        b'<record>'
+        b'<controlfield tag="001">1502657</controlfield>'
+        b'<datafield tag="980" ind1=" " ind2=" ">'
+        b'<subfield code="a">HEP</subfield>'
+        b'</datafield>'
+        b'</record>'
+    )
+    record3 = pkg_resources.resource_string(
+        __name__, os.path.join('fixtures', '1502656_update.xml'))
+
+    yield record1, record2, record3
+
+    _delete_record('lit', 1502656)
+    InspireProdRecords.query.filter(
+        InspireProdRecords.recid.in_([1502656, 1502657])).delete(
+            synchronize_session=False)
+    db.session.commit()
+
+
 @pytest.fixture(scope='function')
 def record_1502656_and_update():
     record1 = push_to_redis('1502656.xml')
@@ -104,6 +155,42 @@ def test_continuous_migration_handles_a_single_record(app, record_1502656):
     assert expected == result
 
 
+def test_continuous_migration_stores_its_lag(app, record_1502655_and_1502656):
+    continuous_migration(batch_size=1)
+
+    stats = get_continuous_migration_stats()
+
+    assert stats['queue_length'] == 0
+    assert stats['oldest_record_age'] == 0
+    assert stats['batch_size'] == 1
+
+
+def test_continuous_migration_skips_unchanged_records(app, record_1502656):
+    continuous_migration()
+    revision_id = get_db_record('lit', 1502656).revision_id
+
+    push_to_redis('1502656.xml')
+    continuous_migration()
+
+    assert get_db_record('lit', 1502656).revision_id == revision_id
+
+
+def test_continuous_migration_converts_again_after_a_converter_upgrade(app, record_1502656):
+    continuous_migration()
+
+    push_to_redis('1502656.xml')
+    with patch(
+        'inspirehep.modules.migrator.tasks.get_converter_version',
+        return_value='inspire-dojson==0.0.0 inspire-schemas==0.0.0',
+    ):
+        continuous_migration()
+
+    expected = 'inspire-dojson==0.0.0 inspire-schemas==0.0.0'
+    result = InspireProdRecords.query.get(1502656).converter_version
+
+    assert expected == result
+
+
 def test_continuous_migration_handles_multiple_records(app, record_1502655_and_1502656):
     r = StrictRedis.from_url(current_app.config.get('CACHE_REDIS_URL'))
 
@@ -148,3 +235,38 @@ def test_continuous_migration_handles_record_updates(app, record_1502656_and_upd
     result = InspireProdRecords.query.get(1502656).marcxml
 
     assert expected == result
+
+
+def test_migrate_sharded(app, dump_with_1502655_and_1502656):
+    migrate_sharded(dump_with_1502655_and_1502656, 2, wait_for_results=True)
+
+    get_db_record('aut', 1502655)  # Does not raise.
+    get_db_record('lit', 1502656)  # Does not raise.
+
+    progress = get_shards_progress(dump_with_1502655_and_1502656)
+
+    assert progress
+    for (start, end), offset in progress.items():
+        assert offset == end
+
+
+def test_migrate_chunk_isolates_invalid_records(app, chunk_with_invalid_record):
+    migrate_chunk(chunk_with_invalid_record)
+
+    record = get_db_record('lit', 1502656)
+
+    expected = 1
+    result = len(record['authors'])
+
+    assert expected == result
+
+    expected = chunk_with_invalid_record[2]
+    result = InspireProdRecords.query.get(1502656).marcxml
+
+    assert expected == result
+    assert InspireProdRecords.query.get(1502656).valid
+
+    prod_record = InspireProdRecords.query.get(1502657)
+
+    assert not prod_record.valid
+    assert prod_record.errors
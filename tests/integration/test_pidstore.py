@@ -26,7 +26,14 @@ import mock
 import requests_mock
 from flask import current_app
 
+from invenio_db import db
+from invenio_pidstore.models import PIDStatus
+
 from inspirehep.modules.pidstore.providers import InspireRecordIdProvider
+from inspirehep.modules.pidstore.utils import PIDS_CACHE, get_pids
+from inspirehep.modules.records.api import InspireRecord
+
+from utils import _delete_record
 
 
 def test_getting_next_recid_from_legacy(app):
@@ -51,3 +58,34 @@ def test_getting_next_recid_from_legacy(app):
             provider = InspireRecordIdProvider.create(**args)
 
             assert str(provider.pid.pid_value) == '3141592'
+
+
+def test_pids_cache_is_invalidated_when_records_are_deleted(app):
+    record = InspireRecord.create({
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': ['Literature']
+    })
+    recid = str(record['control_number'])
+
+    assert get_pids('lit', [recid]) == {recid: (record.id, PIDStatus.REGISTERED)}
+
+    misses = PIDS_CACHE.misses
+    assert get_pids('lit', [recid]) == {recid: (record.id, PIDStatus.REGISTERED)}
+    assert PIDS_CACHE.misses == misses
+
+    record.delete()
+
+    assert get_pids('lit', [recid]) == {recid: (record.id, PIDStatus.REGISTERED)}
+
+    db.session.commit()
+
+    assert get_pids('lit', [recid]) == {recid: (record.id, PIDStatus.DELETED)}
+
+    _delete_record('lit', recid)
+    PIDS_CACHE.clear()
@@ -39,9 +39,18 @@ from inspire_dojson import marcxml2record
 from inspire_utils.record import get_value
 from inspire_dojson.utils import get_recid_from_ref
 from inspirehep.modules.records.api import InspireRecord
+from inspirehep.modules.records.references import (
+    count_referring_records,
+    referring_records,
+)
 from inspirehep.modules.records.tasks import merge_merged_records, update_refs
 from inspirehep.modules.migrator.tasks import record_insert_or_replace
-from inspirehep.utils.record_getter import get_db_record, get_es_records
+from inspirehep.utils.record_getter import (
+    get_db_record,
+    get_db_records_by_recid,
+    get_es_records,
+    get_es_records_by_recid,
+)
 
 from utils import _delete_record
 
@@ -306,6 +315,14 @@ def test_merged_records_stay_merged(api_client, merged_records):
     assert api_client.get('/literature/222').status_code == 301
 
 
+def test_merge_merged_records_skips_redirected_pids(api_client, merged_records):
+    merge_merged_records()
+    db.session.commit()
+
+    assert merge_merged_records() == 0
+    assert api_client.get('/literature/222').status_code == 301
+
+
 def test_merge_record_with_non_existing_pid(api_client, merged_records):
     def get_pid_entry(recid):
         return PersistentIdentifier.query.filter_by(pid_value=str(recid)).one_or_none()
@@ -361,6 +378,23 @@ def test_references_can_be_updated(app, records_to_be_merged):
     assert expected == result
 
 
+def test_references_index_follows_updates(app, records_to_be_merged):
+    pointing_record = get_db_record('lit', 333)
+
+    assert referring_records('http://localhost:5000/api/literature/222') == {
+        pointing_record.id: {'accelerator_experiments.record'},
+    }
+
+    update_refs.delay(
+        'http://localhost:5000/api/literature/222',
+        'http://localhost:5000/api/literature/111')
+
+    assert count_referring_records('http://localhost:5000/api/literature/222') == 0
+    assert referring_records('http://localhost:5000/api/literature/111') == {
+        pointing_record.id: {'accelerator_experiments.record'},
+    }
+
+
 def test_get_es_records_handles_empty_lists(app):
     get_es_records('lit', [])  # Does not raise.
 
@@ -377,6 +411,29 @@ def test_get_es_records_accepts_lists_of_strings(app):
     assert len(records) == 1
 
 
+def test_get_es_records_preserves_order_and_marks_missing_records(app):
+    records = get_es_records('lit', ['999999999', 4328, '524480'])
+
+    assert records[0] is None
+    assert records[1]['control_number'] == 4328
+    assert records[2]['control_number'] == 524480
+    assert records.errors == []
+
+
+def test_get_es_records_by_recid_skips_missing_records(app):
+    records = get_es_records_by_recid('lit', [4328, '999999999'])
+
+    assert list(records) == ['4328']
+    assert records['4328']['control_number'] == 4328
+
+
+def test_get_db_records_by_recid_skips_missing_records(app):
+    records = get_db_records_by_recid('lit', ['4328', '999999999'])
+
+    assert list(records) == ['4328']
+    assert records['4328']['control_number'] == 4328
+
+
 def test_records_files_attached_correctly(app):
     record_json = {
         '$schema': 'http://localhost:5000/schemas/records/hep.json',
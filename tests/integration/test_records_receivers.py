@@ -64,3 +64,35 @@ def test_that_db_changes_are_mirrored_in_es(app):
 
     with pytest.raises(NotFoundError):
         es_record = search.get_source(record.id)
+
+
+def test_phonetic_blocks_are_updated_when_full_names_change(app):
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'authors': [
+            {'full_name': 'Ellis, John Richard'},
+            {'full_name': 'Jimmy'},
+        ],
+        'document_type': [
+            'article',
+        ],
+        'titles': [
+            {'title': 'foo'},
+        ],
+        '_collections': ['Literature']
+    }
+
+    record = InspireRecord.create(json)
+
+    assert record['authors'][0]['signature_block'] == 'ELj'
+    assert record['authors'][1]['signature_block'] == 'JANY'
+
+    # Changing a nested author in place is detected against the DB.
+
+    record['authors'][0]['full_name'] = u'Páramos, Jorge'
+    record.commit()
+
+    assert record['authors'][0]['signature_block'] == 'PARANj'
+    assert record['authors'][1]['signature_block'] == 'JANY'
+
+    record._delete(force=True)
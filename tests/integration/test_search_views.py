@@ -98,3 +98,16 @@ def test_search_logs(current_app_mock, api_client):
 
     current_app_mock.logger.debug.side_effect = _debug
     api_client.get('/literature/')
+
+
+def test_search_export_streams_all_the_records(app_client):
+    with patch.dict(app_client.application.config, {'SEARCH_EXPORT_CHUNK_SIZE': 1}):
+        response = app_client.get('/search/export?q=control_number:712925&format=bibtex')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-bibtex'
+        assert response.data.count(b'@') == 1
+
+
+def test_search_export_rejects_unknown_formats(app_client):
+    assert app_client.get('/search/export?q=&format=foo').status_code == 400
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from mock import MagicMock, patch
+
+from inspirehep.modules.authors.rest.coauthors import get_coauthors
+
+
+def test_get_coauthors_excludes_the_author():
+    bucket = MagicMock(key=1, doc_count=3)
+    response = MagicMock()
+    response.aggregations.coauthors.buckets = [bucket]
+
+    assert get_coauthors(response, '1') == []
+
+
+@patch('inspirehep.modules.authors.rest.coauthors.LiteratureSearch')
+@patch('inspirehep.modules.authors.rest.coauthors.AuthorsSearch')
+def test_get_coauthors_without_author_record(authors_search, literature_search):
+    response = MagicMock()
+    response.aggregations.coauthors.buckets = [
+        MagicMock(key=1, doc_count=3),
+        MagicMock(key=2, doc_count=2),
+    ]
+    authors_search.return_value.filter.return_value.params.return_value.scan.return_value = []
+    paper = MagicMock()
+    paper.to_dict.return_value = {
+        'authors': [
+            {
+                'full_name': 'Smith, John',
+                'recid': 2,
+                'record': {'$ref': 'http://localhost:5000/api/authors/2'},
+            },
+            {'full_name': 'Doe, Jane'},
+        ],
+    }
+    literature_search.return_value.filter.return_value.params.return_value.scan.return_value = [paper]
+
+    expected = [
+        {
+            'count': 2,
+            'full_name': 'Smith, John',
+            'id': 2,
+            'record': {'$ref': 'http://localhost:5000/api/authors/2'},
+        },
+    ]
+    result = get_coauthors(response, '1')
+
+    assert expected == result
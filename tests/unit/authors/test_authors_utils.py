@@ -22,7 +22,14 @@
 
 from __future__ import absolute_import, division, print_function
 
-from inspirehep.modules.authors.utils import bai
+from mock import patch
+
+from inspirehep.modules.authors.utils import (
+    bai,
+    get_author_citations_cache_key,
+    invalidate_author_citations,
+    normalize_name,
+)
 
 
 def test_that_bai_conforms_to_the_spec():
@@ -46,3 +53,28 @@ def test_that_bai_conforms_to_the_spec():
     assert bai("Müller, Andreas") == "A.Mueller"
     assert bai("Hernández-Tomé, G.") == "G.Hernandez.Tome"
     assert bai("José de Goya y Lucientes, Francisco Y H") == "F.Y.H.Jose.de.Goya.y.Lucientes"
+
+
+def test_get_author_citations_cache_key():
+    assert get_author_citations_cache_key(1) == 'author_citations::1'
+    assert get_author_citations_cache_key('1') == 'author_citations::1'
+
+
+@patch('inspirehep.modules.authors.utils.current_cache')
+def test_invalidate_author_citations_deletes_each_key_once(current_cache):
+    invalidate_author_citations([1, 2, 1])
+
+    assert current_cache.delete_many.call_count == 1
+    keys = current_cache.delete_many.call_args[0]
+    assert sorted(keys) == ['author_citations::1', 'author_citations::2']
+
+
+@patch('inspirehep.modules.authors.utils.current_cache')
+def test_invalidate_author_citations_without_authors(current_cache):
+    invalidate_author_citations([])
+
+    assert not current_cache.delete_many.called
+
+
+def test_normalize_name_collapses_whitespace():
+    assert normalize_name(u' Ellis,  John\tRichard ') == u'Ellis, John Richard'
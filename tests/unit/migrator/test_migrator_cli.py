@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from inspirehep.modules.migrator.cli import _check_record, _get_collection
+
+
+def test_get_collection():
+    record = (
+        b'<record>\n'
+        b'  <controlfield tag="001">1</controlfield>\n'
+        b'  <datafield tag="980" ind1=" " ind2=" ">\n'
+        b'    <subfield code="a">HEP</subfield>\n'
+        b'  </datafield>\n'
+        b'  <datafield tag="980" ind1=" " ind2=" ">\n'
+        b'    <subfield code="a">Conferences</subfield>\n'
+        b'  </datafield>\n'
+        b'</record>'
+    )
+
+    assert _get_collection(record) == 'CONFERENCES'
+
+
+def test_get_collection_of_deleted_records():
+    record = (
+        b'<record>\n'
+        b'  <datafield tag="980" ind1=" " ind2=" ">\n'
+        b'    <subfield code="a">CONFERENCES</subfield>\n'
+        b'    <subfield code="c">DELETED</subfield>\n'
+        b'  </datafield>\n'
+        b'</record>'
+    )
+
+    assert _get_collection(record) == 'DELETED'
+
+
+def test_get_collection_defaults_to_hep():
+    record = b'<record>\n  <controlfield tag="001">1</controlfield>\n</record>'
+
+    assert _get_collection(record) == 'HEP'
+
+
+def test_check_record_skips_deleted_records():
+    record = (
+        b'<record>\n'
+        b'  <datafield tag="980" ind1=" " ind2=" ">\n'
+        b'    <subfield code="c">DELETED</subfield>\n'
+        b'  </datafield>\n'
+        b'</record>'
+    )
+
+    assert _check_record((1, record)) is None
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import zlib
+
+import pytest
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.migrator.models import (
+    ZSTD_MAGIC,
+    InspireProdRecords,
+    compress_marcxml,
+    decompress_marcxml,
+    get_converter_version,
+    get_marcxml_hash,
+)
+
+
+RECORD = b'<record>\n  <controlfield tag="001">1</controlfield>\n</record>'
+
+
+def test_get_marcxml_hash():
+    assert get_marcxml_hash(RECORD) == get_marcxml_hash(RECORD)
+    assert get_marcxml_hash(RECORD) != get_marcxml_hash(RECORD + b'\n')
+
+
+def test_get_converter_version():
+    result = get_converter_version()
+
+    assert result.startswith('inspire-dojson==')
+    assert ' inspire-schemas==' in result
+
+
+def test_compress_marcxml_uses_zlib_by_default():
+    config = {'MIGRATOR_MARCXML_DICTIONARY_COMPRESSION': False}
+
+    with patch.dict(current_app.config, config):
+        compressed = compress_marcxml(RECORD)
+
+    assert zlib.decompress(compressed) == RECORD
+    assert decompress_marcxml(compressed) == RECORD
+
+
+def test_decompress_marcxml_handles_uncompressed_data():
+    assert decompress_marcxml(RECORD) == RECORD
+
+
+def test_decompress_marcxml_names_the_zstd_extra_when_zstandard_is_missing():
+    with patch('inspirehep.modules.migrator.models.zstandard', None):
+        with pytest.raises(RuntimeError) as excinfo:
+            decompress_marcxml(ZSTD_MAGIC + RECORD)
+
+    assert '"zstd" extra' in str(excinfo.value)
+
+
+def test_inspire_prod_records_marcxml_sets_the_hash():
+    prod_record = InspireProdRecords(recid=1)
+    prod_record.marcxml = RECORD
+
+    assert prod_record.marcxml == RECORD
+    assert prod_record.marcxml_hash == get_marcxml_hash(RECORD)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+from mock import MagicMock, patch
+
+from inspirehep.modules.migrator.tasks import (
+    AdaptiveChunker,
+    ChunkProducer,
+    MigrationStats,
+    get_latest_versions,
+    get_record_age,
+    get_shard_boundaries,
+    migrate_continuous_batch,
+    split_blob,
+    split_dump,
+    split_stream,
+)
+
+
+DUMP = (
+    b'<collection>\n'
+    b'<record>\n  <controlfield tag="001">1</controlfield>\n</record>\n'
+    b'<record xmlns="http://www.loc.gov/MARC21/slim">\n'
+    b'  <controlfield tag="001">2</controlfield>\n</record>\n'
+    b'<record>\n  <controlfield tag="001">3</controlfield>\n</record>\n'
+    b'</collection>\n'
+)
+
+RECORDS = [
+    b'<record>\n  <controlfield tag="001">1</controlfield>\n</record>',
+    b'<record xmlns="http://www.loc.gov/MARC21/slim">\n'
+    b'  <controlfield tag="001">2</controlfield>\n</record>',
+    b'<record>\n  <controlfield tag="001">3</controlfield>\n</record>',
+]
+
+
+@pytest.fixture
+def dump_path(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write(DUMP, mode='wb')
+
+    yield str(dump)
+
+
+def test_split_blob():
+    expected = RECORDS
+    result = list(split_blob(DUMP))
+
+    assert expected == result
+
+
+def test_split_blob_ignores_similar_tags():
+    blob = b'<records><record>foo</record></records>'
+
+    expected = [b'<record>foo</record>']
+    result = list(split_blob(blob))
+
+    assert expected == result
+
+
+def test_split_blob_ignores_truncated_records():
+    blob = DUMP[:DUMP.rindex(b'</record>')]
+
+    expected = RECORDS[:2]
+    result = list(split_blob(blob))
+
+    assert expected == result
+
+
+def test_split_blob_with_zero_copy():
+    expected = RECORDS
+    result = [record.tobytes() for record in split_blob(DUMP, zero_copy=True)]
+
+    assert expected == result
+
+
+def test_split_stream():
+    expected = RECORDS
+    result = list(split_stream(BytesIO(DUMP)))
+
+    assert expected == result
+
+
+def test_split_stream_handles_records_across_blocks():
+    for block_size in (1, 2, 7, 8, 9, 10):
+        expected = RECORDS
+        result = list(split_stream(BytesIO(DUMP), block_size=block_size))
+
+        assert expected == result
+
+
+def test_split_dump(dump_path):
+    expected = RECORDS
+    result = [record for record, _ in split_dump(dump_path)]
+
+    assert expected == result
+
+
+def test_split_dump_returns_offsets_to_resume_from(dump_path):
+    records = list(split_dump(dump_path))
+    offset = records[0][1]
+
+    expected = RECORDS[1:]
+    result = [record for record, _ in split_dump(dump_path, offset)]
+
+    assert expected == result
+
+
+def test_split_dump_stops_at_records_starting_after_end(dump_path):
+    end = DUMP.index(RECORDS[1])
+
+    expected = RECORDS[:1]
+    result = [record for record, _ in split_dump(dump_path, 0, end)]
+
+    assert expected == result
+
+
+def test_split_dump_handles_empty_files(tmpdir):
+    dump = tmpdir.join('empty.xml')
+    dump.write(b'', mode='wb')
+
+    assert list(split_dump(str(dump))) == []
+
+
+def test_get_shard_boundaries(dump_path):
+    boundaries = get_shard_boundaries(dump_path, 3)
+
+    assert 1 < len(boundaries) <= 3
+    assert boundaries[0][0] == 0
+    assert boundaries[-1][1] == len(DUMP)
+    for (_, end), (start, _) in zip(boundaries, boundaries[1:]):
+        assert end == start
+        assert DUMP[start:].startswith(b'<record')
+
+
+def test_get_shard_boundaries_covers_all_records(dump_path):
+    expected = RECORDS
+
+    result = []
+    for start, end in get_shard_boundaries(dump_path, 10):
+        result.extend(record for record, _ in split_dump(dump_path, start, end))
+
+    assert expected == result
+
+
+def test_migration_stats():
+    stats = MigrationStats()
+    stats.add('dojson', 2.0, records=10)
+    stats.add('dojson', 3.0, records=15)
+
+    other = MigrationStats.from_dict(stats.to_dict())
+    other.add('index', 1.0, records=5)
+    stats.update(other)
+
+    expected = {'dojson': 5.0, 'index': 5.0}
+    result = stats.rates()
+
+    assert expected == result
+
+
+def test_migration_stats_measure_iter():
+    stats = MigrationStats()
+
+    expected = [1, 2, 3]
+    result = list(stats.measure_iter('split', [1, 2, 3]))
+
+    assert expected == result
+    assert stats.records['split'] == 3
+
+
+def test_adaptive_chunker_closes_chunks_by_size_and_bytes():
+    chunker = AdaptiveChunker(target_duration=1, max_bytes=6, size=3)
+
+    expected = [[b'a', b'b', b'c'], [b'dddd', b'ee'], [b'f']]
+    result = list(chunker.chunks([b'a', b'b', b'c', b'dddd', b'ee', b'f']))
+
+    assert expected == result
+
+
+def test_adaptive_chunker_feedback_moves_towards_target_duration():
+    chunker = AdaptiveChunker(target_duration=10, max_bytes=1, size=100)
+
+    chunker.feedback(100, 100.0)
+
+    assert chunker.size == 55
+
+    chunker.feedback(55, 0.1)
+
+    assert chunker.size == 110
+
+
+def test_adaptive_chunker_feedback_respects_bounds():
+    chunker = AdaptiveChunker(
+        target_duration=10, max_bytes=1, size=2, min_size=2, max_size=3)
+
+    chunker.feedback(2, 1000.0)
+
+    assert chunker.size == 2
+
+    chunker.feedback(2, 0.001)
+    chunker.feedback(2, 0.001)
+
+    assert chunker.size == 3
+
+
+@patch('inspirehep.modules.migrator.tasks.get_queue_depth')
+@patch('inspirehep.modules.migrator.tasks.migrate_chunk')
+def test_chunk_producer_bounds_chunks_in_flight(migrate_chunk, get_queue_depth):
+    in_flight = []
+
+    def delay(chunk, skip_files=False, skip_unchanged=None):
+        result = MagicMock()
+        result.get.side_effect = lambda: in_flight.remove(result) or {
+            'elapsed': {'insert': 1.0},
+            'records': {'insert': len(chunk)},
+        }
+        in_flight.append(result)
+        assert len(in_flight) <= 2
+        return result
+
+    migrate_chunk.delay.side_effect = delay
+
+    chunker = AdaptiveChunker(target_duration=1, max_bytes=100, size=1)
+    producer = ChunkProducer(chunker, max_in_flight=2)
+    producer.migrate([b'a'] * 10)
+
+    assert in_flight == []
+    assert producer.completed == 10
+    assert producer.stats.records['insert'] == 10
+
+
+def test_get_latest_versions():
+    updated = b'<record>\n  <controlfield tag="001">1</controlfield>\n  <datafield/>\n</record>'
+    unnumbered = b'<record>\n</record>'
+
+    expected = [RECORDS[1], unnumbered, unnumbered, updated, RECORDS[2]]
+    result = get_latest_versions(
+        [RECORDS[0], RECORDS[1], unnumbered, unnumbered, updated, RECORDS[2]])
+
+    assert expected == result
+
+
+@patch('inspirehep.modules.migrator.tasks.CHUNK_SIZE', 2)
+@patch('inspirehep.modules.migrator.tasks._migrate_chunk')
+def test_migrate_continuous_batch_indexes_on_commit(_migrate_chunk):
+    migrate_continuous_batch(RECORDS + [RECORDS[0]])
+
+    chunks = [call[0][0] for call in _migrate_chunk.call_args_list]
+    assert chunks == [[RECORDS[1], RECORDS[2]], [RECORDS[0]]]
+    assert all(
+        call[1]['index_on_commit'] for call in _migrate_chunk.call_args_list)
+
+
+def test_get_record_age():
+    record = (
+        b'<record>\n'
+        b'  <controlfield tag="001">1</controlfield>\n'
+        b'  <controlfield tag="005">20161212102059.0</controlfield>\n'
+        b'</record>'
+    )
+
+    expected = 61.0
+    result = get_record_age(record, now=datetime(2016, 12, 12, 10, 22, 0))
+
+    assert expected == result
+
+
+def test_get_record_age_without_modification_date():
+    assert get_record_age(RECORDS[0]) is None
@@ -22,10 +22,19 @@
 
 from __future__ import absolute_import, division, print_function
 
+import pytest
+from flask import current_app
+from mock import patch
+
+from invenio_pidstore.errors import PIDDoesNotExistError
+
 from inspirehep.modules.pidstore.utils import (
+    PIDS_CACHE,
     get_endpoint_from_pid_type,
     get_pid_type_from_endpoint,
     get_pid_type_from_schema,
+    get_pids,
+    get_uuid_from_pid,
 )
 
 
@@ -55,3 +64,42 @@ def test_get_pid_from_schema_supports_relative_urls():
     result = get_pid_type_from_schema('schemas/record/authors.json')
 
     assert expected == result
+
+
+def test_get_endpoint_from_pid_type_follows_config_changes():
+    config = {
+        'RECORDS_REST_ENDPOINTS': {
+            'other': {
+                'default_endpoint_prefix': True,
+                'pid_type': 'lit',
+            },
+        },
+    }
+
+    with patch.dict(current_app.config, config):
+        assert get_endpoint_from_pid_type('lit') == 'other'
+
+    assert get_endpoint_from_pid_type('lit') == 'literature'
+
+
+@patch.dict(current_app.config, {'PIDSTORE_SHARED_CACHE': False})
+@patch.object(PIDS_CACHE, 'compute')
+def test_get_pids_looks_up_each_pid_once(compute):
+    PIDS_CACHE.clear()
+    compute.side_effect = lambda keys: dict(
+        (key, ('uuid-' + key[1], 'R')) for key in keys if key[1] != '404')
+
+    assert get_pids('lit', [1, '2', 404]) == {'1': ('uuid-1', 'R'), '2': ('uuid-2', 'R')}
+    assert get_pids('lit', [1, 2]) == {'1': ('uuid-1', 'R'), '2': ('uuid-2', 'R')}
+    assert compute.call_count == 1
+
+    PIDS_CACHE.clear()
+
+
+@patch.dict(current_app.config, {'PIDSTORE_SHARED_CACHE': False})
+@patch.object(PIDS_CACHE, 'compute', return_value={})
+def test_get_uuid_from_pid_raises_when_pid_does_not_exist(compute):
+    PIDS_CACHE.clear()
+
+    with pytest.raises(PIDDoesNotExistError):
+        get_uuid_from_pid('lit', 404)
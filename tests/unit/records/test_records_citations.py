@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from inspirehep.modules.records.citations import (
+    get_citation_deltas,
+    get_impact_graph_cache_key,
+    get_indexed_references_recids,
+    get_references_recids,
+)
+
+
+def test_get_references_recids():
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+            {'reference': {'title': {'title': 'Not a record'}}},
+            {'record': {'$ref': 'http://localhost:5000/api/literature/2'}},
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+        ],
+    }
+
+    expected = {1, 2}
+    result = get_references_recids(json)
+
+    assert expected == result
+
+
+def test_get_references_recids_of_deleted_records_is_empty():
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'deleted': True,
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+        ],
+    }
+
+    assert get_references_recids(json) == set()
+
+
+def test_get_references_recids_of_other_records_is_empty():
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/authors.json',
+    }
+
+    assert get_references_recids(json) == set()
+
+
+def test_get_indexed_references_recids():
+    source = {
+        'references': [
+            {'recid': 1},
+            {'reference': {'title': {'title': 'Not a record'}}},
+            {'recid': 2},
+        ],
+    }
+
+    expected = {1, 2}
+    result = get_indexed_references_recids(source)
+
+    assert expected == result
+
+
+def test_get_indexed_references_recids_of_missing_source_is_empty():
+    assert get_indexed_references_recids(None) == set()
+
+
+def test_get_citation_deltas():
+    expected = {1: -1, 4: 1}
+    result = get_citation_deltas({1, 2, 3}, {2, 3, 4})
+
+    assert expected == result
+
+
+def test_get_impact_graph_cache_key_is_the_same_for_int_and_str_recids():
+    assert get_impact_graph_cache_key(1) == get_impact_graph_cache_key('1')
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+from mock import Mock, patch
+
+from inspirehep.modules.records.indexer import (
+    bulk_index,
+    get_delete_op,
+    get_index_op,
+)
+
+
+def get_indexer():
+    indexer = Mock(_version_type='external_gte')
+    indexer.record_to_index.return_value = ('records-hep', 'hep')
+    indexer._prepare_record.return_value = {'control_number': 1}
+    return indexer
+
+
+def test_get_index_op():
+    record = Mock(id='uuid', revision_id=3)
+
+    expected = {
+        '_op_type': 'index',
+        '_index': 'records-hep',
+        '_type': 'hep',
+        '_id': 'uuid',
+        '_version': 3,
+        '_version_type': 'external_gte',
+        '_source': {'control_number': 1},
+    }
+    result = get_index_op(get_indexer(), record)
+
+    assert expected == result
+
+
+def test_get_index_op_keeps_citation_count():
+    record = Mock(id='uuid', revision_id=3)
+
+    result = get_index_op(get_indexer(), record, citation_count=0)
+
+    assert result['_source'] == {'control_number': 1, 'citation_count': 0}
+
+
+def test_get_delete_op():
+    record = Mock(id='uuid', revision_id=3)
+
+    expected = {
+        '_op_type': 'delete',
+        '_index': 'records-hep',
+        '_type': 'hep',
+        '_id': 'uuid',
+    }
+    result = get_delete_op(get_indexer(), record)
+
+    assert expected == result
+
+
+@patch('inspirehep.modules.records.indexer.current_app')
+@patch('inspirehep.modules.records.indexer.es_bulk')
+def test_bulk_index_ignores_outdated_actions(es_bulk, current_app):
+    current_app.config = {'INDEXER_BULK_REQUEST_TIMEOUT': 120}
+    es_bulk.return_value = (1, [
+        {'index': {'_id': 'outdated', 'status': 409}},
+        {'delete': {'_id': 'never-indexed', 'status': 404}},
+        {'index': {'_id': 'invalid', 'status': 400}},
+    ])
+
+    assert bulk_index([]) == (1, 1)
@@ -39,14 +39,14 @@ def _build_url(endpoint='literature', recid='42'):
     return '{}/api/{}/{}'.format(server, endpoint, recid)
 
 
-@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_record')
-@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_db_record')
-def test_replace_refs_correct_sources(get_db_rec, get_es_rec):
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_records_by_recid')
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_db_records_by_recid')
+def test_replace_refs_correct_sources(get_db_recs, get_es_recs):
     with_es_record = {'ES': 'ES'}
     with_db_record = {'DB': 'DB'}
 
-    get_es_rec.return_value = with_es_record
-    get_db_rec.return_value = with_db_record
+    get_es_recs.return_value = {'42': with_es_record}
+    get_db_recs.return_value = {'42': with_db_record}
 
     db_rec = replace_refs({'$ref': _build_url()}, 'db')
     es_rec = replace_refs({'$ref': _build_url()}, 'es')
@@ -182,3 +182,74 @@ def test_specific_loaders_return_none(get_db_rec, get_es_rec, g_p_t_f_e):
         assert expect_none == None  # noqa: E711
         assert get_db_rec.call_count == 1
         assert get_es_rec.call_count == 1
+
+
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_record')
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_records_by_recid')
+def test_replace_refs_fetches_records_by_pid_type(get_es_recs, get_es_rec):
+    def get_records(pid_type, recids):
+        return dict(
+            (recid, {'pid_type': pid_type, 'recid': recid})
+            for recid in recids if recid != '404'
+        )
+
+    get_es_recs.side_effect = get_records
+
+    obj = {
+        'conference': {'$ref': _build_url('conferences', '1')},
+        'references': [
+            {'record': {'$ref': _build_url('literature', '1')}},
+            {'record': {'$ref': _build_url('literature', '2')}},
+            {'record': {'$ref': _build_url('literature', '1')}},
+            {'record': {'$ref': _build_url('literature', '404')}},
+        ],
+    }
+    result = replace_refs(obj, 'es')
+
+    assert result['conference'] == {'pid_type': 'con', 'recid': '1'}
+    assert result['references'][1]['record'] == {'pid_type': 'lit', 'recid': '2'}
+    assert result['references'][2]['record'] == {'pid_type': 'lit', 'recid': '1'}
+    assert result['references'][3]['record'] == None  # noqa: E711
+
+    assert get_es_recs.call_count == 2
+    literature_recids = [
+        call[0][1] for call in get_es_recs.call_args_list if call[0][0] == 'lit'][0]
+    assert sorted(literature_recids) == ['1', '2', '404']
+    assert get_es_rec.call_count == 0
+
+
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_record')
+@patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_records_by_recid')
+def test_replace_refs_falls_back_to_single_records(get_es_recs, get_es_rec):
+    get_es_recs.side_effect = RecordGetterError('err', None)
+    get_es_rec.return_value = {'control_number': 1}
+
+    result = replace_refs({'record': {'$ref': _build_url()}}, 'es')
+
+    assert result['record'] == {'control_number': 1}
+    get_es_rec.assert_called_with('lit', '42')
+
+
+def test_replace_refs_shares_loaded_refs_in_a_request(app):
+    with app.test_request_context():
+        with patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_records_by_recid') as get_es_recs:
+            get_es_recs.return_value = {'42': {'control_number': 42}}
+
+            first = replace_refs({'$ref': _build_url()}, 'es')
+            second = replace_refs({'$ref': _build_url()}, 'es')
+
+            assert first == second == {'control_number': 42}
+            assert get_es_recs.call_count == 1
+
+
+def test_replace_refs_returns_copies_of_the_loaded_refs_in_a_request(app):
+    with app.test_request_context():
+        with patch('inspirehep.modules.records.json_ref_loader.record_getter.get_es_records_by_recid') as get_es_recs:
+            get_es_recs.return_value = {'42': {'control_number': 42, 'titles': [{'title': 'foo'}]}}
+
+            first = replace_refs({'record': {'$ref': _build_url()}}, 'es')
+            first['record']['titles'][0]['title'] = 'changed'
+            second = replace_refs({'record': {'$ref': _build_url()}}, 'es')
+
+            assert second['record'] == {'control_number': 42, 'titles': [{'title': 'foo'}]}
+            assert get_es_recs.call_count == 1
@@ -31,13 +31,14 @@ from inspirehep.modules.records.receivers import (
     assign_phonetic_block,
     assign_uuid,
     populate_abstract_source_suggest,
+    enhance_after_index,
     populate_affiliation_suggest,
+    populate_authors,
     populate_bookautocomplete,
     populate_earliest_date,
     populate_inspire_document_type,
     populate_recid_from_ref,
     populate_title_suggest,
-    populate_author_count,
 )
 
 
@@ -635,6 +636,26 @@ def test_populate_inspire_document_type_from_publication_type():
     assert expected == result
 
 
+def test_populate_inspire_document_type_populates_the_primary_type():
+    record = {
+        '$schema': 'http://localhost:5000/records/schemas/hep.json',
+        'document_type': [
+            'article',
+        ],
+        'publication_type': [
+            'introductory',
+        ],
+        'refereed': True,
+    }
+
+    populate_inspire_document_type(None, record)
+
+    expected = 'article'
+    result = record['facet_inspire_primary_doc_type']
+
+    assert expected == result
+
+
 def test_populate_inspire_document_type_does_nothing_if_record_is_not_literature():
     record = {'$schema': 'http://localhost:5000/schemas/records/other.json'}
 
@@ -1024,7 +1045,7 @@ def test_populate_affiliation_suggest_does_nothing_if_record_is_not_institution(
     assert 'affiliation_suggest' not in record
 
 
-def test_populate_author_count():
+def test_populate_authors_counts_authors_excluding_supervisors():
     schema = load_schema('hep')
     subschema = schema['properties']['authors']
 
@@ -1055,14 +1076,83 @@ def test_populate_author_count():
     }
     assert validate(record['authors'], subschema) is None
 
-    populate_author_count(None, record)
+    populate_authors(None, record)
 
     assert record['author_count'] == 2
 
 
-def test_populate_author_count_does_nothing_if_record_is_not_literature():
+def test_populate_authors_does_nothing_if_record_is_not_literature():
     record = {'$schema': 'http://localhost:5000/schemas/records/other.json'}
 
-    populate_author_count(None, record)
+    populate_authors(None, record)
 
     assert 'author_count' not in record
+
+
+def test_populate_authors_generates_name_variations():
+    record = {
+        '$schema': 'http://localhost:5000/records/schemas/hep.json',
+        'authors': [
+            {
+                'full_name': 'Ellis, John Richard',
+                'ids': [
+                    {
+                        'schema': 'INSPIRE BAI',
+                        'value': 'J.R.Ellis.1',
+                    },
+                ],
+            },
+        ],
+    }
+
+    populate_authors(None, record)
+
+    author = record['authors'][0]
+    assert 'Ellis, John Richard' in author['name_variations']
+    assert author['name_suggest'] == {
+        'input': author['name_variations'],
+        'output': 'Ellis, John Richard',
+        'payload': {'bai': 'J.R.Ellis.1'},
+    }
+
+
+def test_enhance_after_index_runs_the_enhancers_of_the_schema():
+    record = {
+        '$schema': 'http://localhost:5000/schemas/records/journals.json',
+        'journal_title': {'title': 'Physical Review D'},
+        'short_title': 'Phys.Rev.D',
+        'title_variants': [],
+    }
+
+    enhance_after_index(None, record)
+
+    assert 'title_suggest' in record
+    assert 'affiliation_suggest' not in record
+    assert 'author_count' not in record
+
+
+def test_enhance_after_index_adds_the_recids_of_the_authors():
+    record = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'authors': [
+            {
+                'affiliations': [
+                    {
+                        'record': {'$ref': 'http://localhost:5000/api/institutions/2'},
+                        'value': 'CERN',
+                    },
+                ],
+                'full_name': 'Ellis, John Richard',
+                'record': {'$ref': 'http://localhost:5000/api/authors/1'},
+            },
+        ],
+        'self': {'$ref': 'http://localhost:5000/api/literature/3'},
+    }
+
+    enhance_after_index(None, record)
+
+    author = record['authors'][0]
+    assert author['recid'] == 1
+    assert author['affiliations'][0]['recid'] == 2
+    assert record['self_recid'] == 3
+    assert 'name_variations' in author
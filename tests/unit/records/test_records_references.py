@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from flask import current_app
+from mock import patch
+
+from inspirehep.modules.records.references import (
+    get_ref_paths,
+    update_ref_paths,
+)
+
+
+def test_get_ref_paths():
+    config = {
+        'INSPIRE_REF_UPDATER_WHITELISTS': {
+            'literature': [
+                'authors.affiliations.record',
+                'references.record',
+            ],
+        },
+    }
+
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'authors': [
+            {
+                'affiliations': [
+                    {'record': {'$ref': 'http://localhost:5000/api/institutions/1'}},
+                ],
+            },
+            {'full_name': 'Smith, John'},
+        ],
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/2'}},
+            {'reference': {'title': {'title': 'Not a record'}}},
+        ],
+        'related_records': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/3'}},
+        ],
+    }
+
+    expected = {
+        ('http://localhost:5000/api/institutions/1', 'authors.affiliations.record'),
+        ('http://localhost:5000/api/literature/2', 'references.record'),
+    }
+
+    with patch.dict(current_app.config, config):
+        result = get_ref_paths(json)
+
+    assert expected == result
+
+
+def test_get_ref_paths_without_schema():
+    assert get_ref_paths({'references': []}) == set()
+
+
+def test_update_ref_paths():
+    json = {
+        '$schema': 'http://localhost:5000/schemas/records/hep.json',
+        'references': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+            {'record': {'$ref': 'http://localhost:5000/api/literature/2'}},
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+        ],
+        'related_records': [
+            {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+        ],
+    }
+
+    result = update_ref_paths(
+        json,
+        'http://localhost:5000/api/literature/1',
+        'http://localhost:5000/api/literature/4',
+        ['references.record'],
+    )
+
+    assert result == 2
+    assert json['references'] == [
+        {'record': {'$ref': 'http://localhost:5000/api/literature/4'}},
+        {'record': {'$ref': 'http://localhost:5000/api/literature/2'}},
+        {'record': {'$ref': 'http://localhost:5000/api/literature/4'}},
+    ]
+    assert json['related_records'] == [
+        {'record': {'$ref': 'http://localhost:5000/api/literature/1'}},
+    ]
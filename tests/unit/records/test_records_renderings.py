@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from mock import MagicMock, patch
+
+from inspirehep.modules.records.renderings import (
+    _get_redis,
+    get_code_version,
+    get_rendering,
+    invalidate_renderings,
+)
+from inspirehep.modules.records.serializers.latexeu_serializer import (
+    LATEXEUSerializer,
+)
+from inspirehep.modules.records.serializers.marcxml import MARCXMLSerializer
+
+
+def test_get_code_version_is_stable():
+    assert get_code_version(LATEXEUSerializer()) == get_code_version(LATEXEUSerializer())
+
+
+def test_get_code_version_depends_on_the_serializer():
+    assert get_code_version(LATEXEUSerializer()) != get_code_version(MARCXMLSerializer())
+
+
+@patch('inspirehep.modules.records.renderings.pkg_resources.get_distribution')
+def test_get_code_version_depends_on_the_rendering_packages(get_distribution):
+    get_distribution.return_value.version = '1.0.0'
+    old_version = get_code_version(MARCXMLSerializer())
+
+    get_distribution.return_value.version = '2.0.0'
+    new_version = get_code_version(MARCXMLSerializer())
+
+    assert old_version != new_version
+    get_distribution.assert_any_call('inspire-dojson')
+    get_distribution.assert_any_call('inspire-schemas')
+    get_distribution.assert_any_call('pybtex')
+
+
+@patch('inspirehep.modules.records.renderings.Lock')
+@patch('inspirehep.modules.records.renderings._get_redis')
+def test_get_rendering_returns_the_cached_rendering(_get_redis, Lock):
+    _get_redis.return_value.hget.return_value = b'cached'
+    render = MagicMock()
+
+    assert get_rendering('uuid', 1, 'application/x-latexeu', 'v', render) == b'cached'
+    assert not render.called
+    assert not Lock.called
+
+
+@patch('inspirehep.modules.records.renderings.current_app')
+@patch('inspirehep.modules.records.renderings.Lock')
+@patch('inspirehep.modules.records.renderings._get_redis')
+def test_get_rendering_renders_and_caches_a_missing_rendering(_get_redis, Lock, current_app):
+    current_app.config = {'RECORDS_RENDERINGS_CACHE_TIMEOUT': 10}
+    redis = _get_redis.return_value
+    redis.hget.return_value = None
+    render = MagicMock(return_value=u'rendered')
+
+    assert get_rendering('uuid', 1, 'application/x-latexeu', 'v', render) == u'rendered'
+
+    render.assert_called_once_with()
+    redis.pipeline.return_value.hset.assert_called_once_with(
+        'record_renderings::uuid', u'application/x-latexeu::1::v', u'rendered')
+    redis.pipeline.return_value.expire.assert_called_once_with(
+        'record_renderings::uuid', 10)
+
+
+@patch('inspirehep.modules.records.renderings._get_redis')
+def test_invalidate_renderings_deletes_each_key_once(_get_redis):
+    invalidate_renderings(['a', 'b', 'a'])
+
+    keys = _get_redis.return_value.delete.call_args[0]
+    assert sorted(keys) == ['record_renderings::a', 'record_renderings::b']
+
+
+@patch('inspirehep.modules.records.renderings._get_redis')
+def test_invalidate_renderings_without_records(_get_redis):
+    invalidate_renderings([])
+
+    assert not _get_redis.called
+
+
+@patch.dict('inspirehep.modules.records.renderings._redis_clients', clear=True)
+@patch('inspirehep.modules.records.renderings.StrictRedis')
+def test_get_redis_reuses_the_client(StrictRedis):
+    assert _get_redis() is _get_redis()
+    assert StrictRedis.from_url.call_count == 1
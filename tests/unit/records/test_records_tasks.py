@@ -25,7 +25,7 @@ from __future__ import absolute_import, division, print_function
 from flask import current_app
 from mock import patch
 
-from inspirehep.modules.records.tasks import update_links
+from inspirehep.modules.records.tasks import update_impact_graphs, update_links
 
 
 def test_update_links():
@@ -146,3 +146,21 @@ def test_update_links_ignores_non_whitelisted_paths():
                 'record': {'$ref': 'http://localhost:5000/record/1'},
             }
         }
+
+
+@patch('inspirehep.modules.records.tasks.store_impact_graph')
+@patch('inspirehep.modules.records.tasks.get_es_records')
+@patch('inspirehep.modules.records.tasks.RecordCitations')
+def test_update_impact_graphs_includes_the_records_cited_by_the_citers(
+        record_citations, get_es_records, store_impact_graph):
+    record_citations.query.filter.return_value.with_entities.return_value = [(3,)]
+    get_es_records.side_effect = lambda pid_type, recids: [
+        {'control_number': recid} if recid != 2 else None for recid in recids]
+
+    update_impact_graphs([1, 2], citers_recids=[4])
+
+    expected = [1, 3]
+    result = sorted(
+        call[0][0]['control_number'] for call in store_impact_graph.call_args_list)
+
+    assert expected == result
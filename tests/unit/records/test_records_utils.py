@@ -22,7 +22,12 @@
 
 from __future__ import absolute_import, division, print_function
 
-from inspirehep.modules.records.utils import get_endpoint_from_record
+from mock import patch
+
+from inspirehep.modules.records.utils import (
+    get_changed_authors,
+    get_endpoint_from_record,
+)
 
 
 def test_get_endpoint_from_record():
@@ -43,3 +48,42 @@ def test_get_endpoint_from_record_supports_relative_urls():
     result = get_endpoint_from_record(record)
 
     assert expected == result
+
+
+@patch('inspirehep.modules.records.utils.get_stored_authors')
+def test_get_changed_authors(get_stored_authors):
+    get_stored_authors.return_value = [
+        {'full_name': 'Smith, John', 'uuid': 'unchanged'},
+        {'full_name': 'Rohan, George', 'uuid': 'renamed'},
+        {'full_name': 'Removed, Author', 'uuid': 'removed'},
+    ]
+    record = {
+        'authors': [
+            {'full_name': 'Smith, John', 'uuid': 'unchanged'},
+            {'full_name': 'Rohan, G.', 'uuid': 'renamed'},
+            {'full_name': 'Rafelski, Johann'},
+        ],
+    }
+
+    expected = [
+        {'full_name': 'Rohan, G.', 'uuid': 'renamed'},
+        {'full_name': 'Rafelski, Johann'},
+    ]
+    result = get_changed_authors(record)
+
+    assert expected == result
+
+
+@patch('inspirehep.modules.records.utils.get_stored_authors')
+def test_get_changed_authors_only_compares_fields(get_stored_authors):
+    get_stored_authors.return_value = [
+        {'full_name': 'Smith, John', 'uuid': 'uuid'},
+    ]
+    record = {
+        'authors': [
+            {'full_name': 'Smith, John', 'uuid': 'uuid', 'signature_block': 'SNATHj'},
+        ],
+    }
+
+    assert get_changed_authors(record, fields=['full_name']) == []
+    assert get_changed_authors(record) == record['authors']
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from elasticsearch import ConnectionTimeout
+from mock import patch
+
+from inspirehep.modules.search.api import LiteratureSearch
+
+
+def _mget(index, doc_type, body, **kwargs):
+    return {
+        'docs': [
+            {'_id': uuid, 'found': True, '_source': {'uuid': uuid}}
+            if uuid != 'missing' else {'_id': uuid, 'found': False}
+            for uuid in body['ids']
+        ],
+    }
+
+
+@patch('inspirehep.modules.search.api.es')
+def test_mget_preserves_order_and_marks_missing_documents(es):
+    client = es._get_current_object.return_value
+    client.mget.side_effect = _mget
+
+    result = LiteratureSearch().mget(['b', 'missing', 'a', 'b'])
+
+    assert result == [{'uuid': 'b'}, None, {'uuid': 'a'}, {'uuid': 'b'}]
+    assert result.errors == []
+    assert client.mget.call_count == 1
+    assert client.mget.call_args[1]['body'] == {'ids': ['b', 'missing', 'a']}
+
+
+@patch('inspirehep.modules.search.api.es')
+def test_mget_fetches_documents_in_chunks(es):
+    client = es._get_current_object.return_value
+    client.mget.side_effect = _mget
+    uuids = [str(i) for i in range(5)]
+
+    result = LiteratureSearch().mget(uuids, chunk_size=2, _source=['uuid'])
+
+    assert result == [{'uuid': uuid} for uuid in uuids]
+    assert client.mget.call_count == 3
+    assert sorted(call[1]['body']['ids'] for call in client.mget.call_args_list) == [
+        ['0', '1'], ['2', '3'], ['4'],
+    ]
+    assert all(call[1]['_source'] == ['uuid'] for call in client.mget.call_args_list)
+
+
+@patch('inspirehep.modules.search.api.es')
+def test_mget_reports_the_chunks_that_failed(es):
+    error = ConnectionTimeout('TIMEOUT', 'timed out', None)
+
+    def mget(index, doc_type, body, **kwargs):
+        if '2' in body['ids']:
+            raise error
+        return _mget(index, doc_type, body, **kwargs)
+
+    client = es._get_current_object.return_value
+    client.mget.side_effect = mget
+
+    result = LiteratureSearch().mget(['0', '1', '2', '3'], chunk_size=2)
+
+    assert result == [{'uuid': '0'}, {'uuid': '1'}, None, None]
+    assert result.errors == [(['2', '3'], error)]
+
+
+@patch('inspirehep.modules.search.api.es')
+def test_mget_does_not_query_without_uuids(es):
+    result = LiteratureSearch().mget([])
+
+    assert result == []
+    assert not es._get_current_object.return_value.mget.called
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from flask import g
+from mock import patch
+
+import inspire_query_parser
+
+from inspirehep.modules.search.query_factory import (
+    PARSED_QUERIES_CACHE,
+    IQTemplate,
+    add_query_parse_timing,
+    normalize_query_string,
+    parse_query,
+)
+
+
+def setup_function(function):
+    PARSED_QUERIES_CACHE.clear()
+
+
+def test_normalize_query_string_collapses_whitespace():
+    assert normalize_query_string(u'  title   foo\tand a  bar ') == u'title foo and a bar'
+
+
+def test_normalize_query_string_keeps_the_whitespace_of_phrases():
+    query_string = u'title  "foo   bar"  or  t \'foo  bar\' or t /fo+  ba?r/'
+    expected = u'title "foo   bar" or t \'foo  bar\' or t /fo+  ba?r/'
+
+    assert normalize_query_string(query_string) == expected
+
+
+def test_normalize_query_string_keeps_the_whitespace_of_unclosed_phrases():
+    assert normalize_query_string(u'title   "foo   bar  ') == u'title "foo   bar  '
+
+
+def test_parse_query_parses_each_query_once():
+    expected = inspire_query_parser.parse_query('title foo')
+
+    with patch(
+        'inspirehep.modules.search.query_factory.inspire_query_parser.parse_query',
+        side_effect=inspire_query_parser.parse_query,
+    ) as mock_parse_query:
+        assert parse_query('title foo') == expected
+        assert parse_query('  title   foo ') == expected
+        assert mock_parse_query.call_count == 1
+
+
+def test_parse_query_returns_a_copy():
+    parse_query('title foo')['changed'] = True
+
+    assert 'changed' not in parse_query('title foo')
+
+
+def test_iq_template_fills_quoted_placeholders():
+    template = IQTemplate('cnum:"{}" and 980__a:proceedings')
+
+    expected = inspire_query_parser.parse_query('cnum:"C06-07-01" and 980__a:proceedings')
+    result = template.parse('C06-07-01')
+
+    assert expected == result
+
+
+def test_iq_template_fills_unquoted_placeholders_with_words():
+    template = IQTemplate('authors.affiliations.recid:{}')
+
+    expected = inspire_query_parser.parse_query('authors.affiliations.recid:902725')
+    result = template.parse(902725)
+
+    assert expected == result
+
+
+def test_iq_template_parses_unquoted_placeholders_with_several_words():
+    template = IQTemplate('affiliation:{}')
+
+    expected = inspire_query_parser.parse_query('affiliation:Oxford U.')
+    result = template.parse('Oxford U.')
+
+    assert expected == result
+
+
+@pytest.mark.parametrize(
+    'template,values',
+    [
+        ('date:{}', ['2017', '2018', '2017-01-01', '2017-13-45']),
+        ('date > {}', ['2017', '2018', '2017-01-01']),
+        ('topcite:{}', ['10', '20', '10+', '20+', '10->20']),
+        ('affiliation:{}', ['CER*', 'DES*', 'CERN', 'DESY']),
+        ('a {}', ['Ellis', 'Smith', 'Ellis, J', 'Smith, A', 'J.Ellis.1']),
+        ('a "{}"', ['Ellis, J', 'Smith, A', 'J.Ellis.1', 'A.Smith.2']),
+        ('exactauthor:{}', ['J.Ellis.1', 'A.Smith.2', 'Ellis, J', 'Smith, A']),
+        ('cnum:"{}"', ['C06-07-01', 'C17-09-21', 'and', 'or']),
+    ],
+)
+def test_iq_template_parses_like_the_filled_query_string(template, values):
+    template = IQTemplate(template)
+
+    for value in values:
+        expected = inspire_query_parser.parse_query(template.template.format(value))
+        result = template.parse(value)
+
+        assert expected == result
+
+
+def test_iq_template_parses_the_template_once_per_shape_of_values():
+    template = IQTemplate('series:"{}"')
+
+    with patch(
+        'inspirehep.modules.search.query_factory.inspire_query_parser.parse_query',
+        side_effect=inspire_query_parser.parse_query,
+    ) as mock_parse_query:
+        template.parse('ICHEP')
+        template.parse('Moriond')
+        template.parse('Lattice')
+
+        assert mock_parse_query.call_count == 2
+
+
+def test_iq_template_parses_values_of_a_shape_that_is_not_filled():
+    template = IQTemplate('date:{}')
+
+    with patch(
+        'inspirehep.modules.search.query_factory.inspire_query_parser.parse_query',
+        side_effect=inspire_query_parser.parse_query,
+    ) as mock_parse_query:
+        template.parse('2017')
+        template.parse('2018')
+
+        assert mock_parse_query.call_count == 3
+
+
+def test_add_query_parse_timing(request_context, app):
+    for name in ('iq_queries', 'iq_parsed', 'iq_parse_time'):
+        g.pop(name, None)
+
+    parse_query('title foo')
+    parse_query('title foo')
+
+    response = add_query_parse_timing(app.response_class())
+
+    assert g.iq_queries == 2
+    assert g.iq_parsed == 1
+    assert 'desc="2 queries, 1 parsed"' in response.headers['Server-Timing']
+
+
+def test_add_query_parse_timing_without_queries(request_context, app):
+    for name in ('iq_queries', 'iq_parsed', 'iq_parse_time'):
+        g.pop(name, None)
+
+    response = add_query_parse_timing(app.response_class())
+
+    assert 'Server-Timing' not in response.headers
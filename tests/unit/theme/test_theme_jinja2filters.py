@@ -96,8 +96,14 @@ def jinja_mock_env():
 def mock_replace_refs():
     def get_replace_refs_mock(title, control_numbers):
         control_numbers_map = {c[0]['$ref']: c[1] for c in control_numbers}
-        return lambda o, s: {'titles': [{'title': title}],
-                             'control_number': control_numbers_map[o['$ref']]}
+
+        def replace_ref(ref):
+            if ref is None:
+                return None
+            return {'titles': [{'title': title}],
+                    'control_number': control_numbers_map[ref['$ref']]}
+
+        return lambda o, s: [[replace_ref(ref) for ref in refs] for refs in o]
     return get_replace_refs_mock
 
 
@@ -1099,7 +1105,7 @@ def test_publication_info_with_pub_info_and_conf_info_not_found(r_r):
     conf_rec = {'$ref': 'http://x/y/976391'}
     parent_rec = {'$ref': 'http://x/y/706120'}
 
-    r_r.return_value = None
+    r_r.side_effect = lambda o, s: [[None, None] for refs in o]
 
     with_pub_info_and_conf_info = LiteratureRecord({
         'publication_info': [
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from mock import patch
+
+from inspirehep.utils.cache import TwoLevelCache
+
+
+def upper(keys):
+    return dict((key, key.upper()) for key in keys)
+
+
+def test_two_level_cache_computes_each_key_once():
+    computed = []
+
+    def compute(keys):
+        computed.extend(keys)
+        return upper(keys)
+
+    cache = TwoLevelCache('test', compute, maxsize=10)
+
+    assert cache.get_many(['a', 'b']) == {'a': 'A', 'b': 'B'}
+    assert cache.get_many(['b', 'c']) == {'b': 'B', 'c': 'C'}
+    assert sorted(computed) == ['a', 'b', 'c']
+
+    info = cache.info()
+    assert info['hits'] == 1
+    assert info['misses'] == 3
+    assert info['hit_rate'] == 0.25
+    assert info['size'] == 3
+
+
+def test_two_level_cache_evicts_least_recently_used_keys():
+    cache = TwoLevelCache('test', upper, maxsize=2)
+
+    cache.get_many(['a'])
+    cache.get_many(['b'])
+    cache.get_many(['a'])
+    cache.get_many(['c'])
+    cache.get_many(['a', 'b'])
+
+    info = cache.info()
+    assert info['size'] == 2
+    assert info['misses'] == 4
+
+
+def test_two_level_cache_does_not_cache_missing_values():
+    cache = TwoLevelCache('test', lambda keys: {}, maxsize=10)
+
+    assert cache.get('a') is None
+    assert cache.get('a', 'default') == 'default'
+    assert cache.info()['misses'] == 2
+
+
+@patch('inspirehep.utils.cache.time.time')
+def test_two_level_cache_expires_local_values(time):
+    cache = TwoLevelCache('test', upper, maxsize=10, local_timeout=60)
+
+    time.return_value = 0
+    cache.get('a')
+    time.return_value = 30
+    cache.get('a')
+    time.return_value = 90
+    cache.get('a')
+
+    assert cache.info()['misses'] == 2
+
+
+def test_two_level_cache_delete_many():
+    cache = TwoLevelCache('test', upper, maxsize=10)
+
+    cache.get_many(['a', 'b'])
+    cache.delete_many(['a'])
+    cache.get_many(['a', 'b'])
+
+    assert cache.info()['misses'] == 3
+
+
+@patch('inspirehep.utils.cache.current_cache')
+def test_two_level_cache_uses_the_shared_cache_when_configured(current_cache, app):
+    current_cache.get_many.side_effect = lambda *keys: [
+        'shared' if key == 'test::a' else None for key in keys]
+    cache = TwoLevelCache(
+        'test', upper, maxsize=10,
+        shared_config='TEST_SHARED_CACHE',
+        shared_timeout_config='TEST_SHARED_CACHE_TIMEOUT',
+    )
+
+    config = {'TEST_SHARED_CACHE': True, 'TEST_SHARED_CACHE_TIMEOUT': 60}
+    with patch.dict(app.config, config):
+        result = cache.get_many(['a', 'b'])
+
+    assert result == {'a': 'shared', 'b': 'B'}
+    current_cache.set_many.assert_called_with({'test::b': 'B'}, timeout=60)
+
+    info = cache.info()
+    assert info['shared_hits'] == 1
+    assert info['misses'] == 1
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+from mock import MagicMock, patch
+
+from inspirehep.utils.citations import get_and_format_citations
+
+
+def _hit(source):
+    hit = MagicMock()
+    hit.to_dict.return_value = source
+    return hit
+
+
+@patch('inspirehep.utils.citations.get_template_module')
+@patch('inspirehep.utils.citations.LiteratureSearch')
+@patch('inspirehep.utils.citations.citers_of')
+def test_get_and_format_citations_pages_past_the_result_window(
+        citers_of, literature_search, get_template_module):
+    citers_of.return_value = list(range(1, 10003))
+    search = literature_search.return_value.filter.return_value.params.return_value
+    search.scan.return_value = [
+        _hit({'control_number': recid, 'citation_count': recid})
+        for recid in range(1, 10003)
+    ]
+    search.__getitem__.return_value.execute.return_value.hits = [
+        _hit({'control_number': 1, 'citation_count': 1}),
+        _hit({'control_number': 2, 'citation_count': 2}),
+    ]
+    get_template_module.return_value.render_citation.side_effect = \
+        lambda citation: str(citation['control_number'])
+
+    expected = (10002, [['2', 2], ['1', 1]])
+    result = get_and_format_citations(
+        1, start=10000, length=10, sort='citation_count', reverse=True)
+
+    assert expected == result
+    literature_search.return_value.filter.assert_called_with(
+        'terms', control_number=[2, 1])
+    search.__getitem__.assert_called_with(slice(0, 2))
@@ -440,3 +440,28 @@ def test_get_citation_number_no_citation_count(g_e_r):
     result = Export(no_citation_count)._get_citation_number()
 
     assert expected == result
+
+
+@mock.patch('inspirehep.utils.export.time.strftime')
+@mock.patch('inspirehep.utils.export.get_es_record')
+def test_get_citation_number_from_source(g_e_r, strftime):
+    strftime.return_value = '02 Feb 1993'
+
+    from_source = {'control_number': 1, 'citation_count': 2}
+
+    expected = '2 citations counted in INSPIRE as of 02 Feb 1993'
+    result = Export(from_source)._get_citation_number()
+
+    assert expected == result
+    g_e_r.assert_not_called()
+
+
+@mock.patch('inspirehep.utils.export.get_es_record')
+def test_get_citation_number_from_es_without_citation_count(g_e_r):
+    uncited = {'control_number': 1}
+
+    expected = ''
+    result = Export(uncited, from_es=True)._get_citation_number()
+
+    assert expected == result
+    g_e_r.assert_not_called()
@@ -26,7 +26,11 @@ from __future__ import absolute_import, division, print_function
 
 import pytest
 
-from inspirehep.utils.stats import calculate_h_index, calculate_i10_index
+from inspirehep.utils.stats import (
+    calculate_h_index,
+    calculate_h_index_from_sorted,
+    calculate_i10_index,
+)
 
 
 @pytest.fixture
@@ -101,3 +105,31 @@ def test_calculate_i10_index_ignores_none_values(citations_with_none_values):
     result = calculate_i10_index(citations_with_none_values)
 
     assert expected == result
+
+
+def test_calculate_h_index_from_sorted():
+    citations_with_h_index_5 = [34, 12, 8, 7, 5, 3, 2]
+
+    expected = 5
+    result = calculate_h_index_from_sorted(citations_with_h_index_5)
+
+    assert expected == result
+
+
+def test_calculate_h_index_from_sorted_stops_after_the_h_index():
+    def citation_counts():
+        for count in [3, 3, 3, 1]:
+            yield count
+        raise AssertionError('Consumed past the h-index')
+
+    expected = 3
+    result = calculate_h_index_from_sorted(citation_counts())
+
+    assert expected == result
+
+
+def test_calculate_h_index_from_sorted_ignores_none_values():
+    expected = 1
+    result = calculate_h_index_from_sorted([2, None, None])
+
+    assert expected == result